@@ -1,24 +1,69 @@
-from fake_useragent import UserAgent
+from __future__ import annotations
+
 from http import HTTPStatus
-from dotenv import load_dotenv
-import requests
-from requests.exceptions import HTTPError
-from requests import Response
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+import glob
+import json
 import os
+import threading
 import time
 import logging
 
+from replay import ReplayStore
+from metrics import ScraperMetrics, endpoint_of
+from ledger import FailureLedger, classify, backoff_time, PERMANENT
+from pipeline import FetchError
+
+# requests, dotenv and fake_useragent are imported on first use: constructing a scraper
+# should stay cheap for short jobs and orchestrator-spawned workers
+if TYPE_CHECKING:
+    from requests import Response
+
+USER_AGENT_FILE = "../../data/cache/user_agent.txt"
+USER_AGENT_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+
+
+def get_user_agent(cache_file: str = USER_AGENT_FILE) -> str:
+    """
+    Returns a Chrome User-Agent string. `fake_useragent` loads its whole browser dataset on
+    import, so one string is picked and cached in `cache_file` for a week.
+
+    `SCRAPER_USER_AGENT` overrides it.
+    """
+    user_agent = os.getenv("SCRAPER_USER_AGENT")
+    if user_agent:
+        return user_agent
+
+    try:
+        if time.time() - os.path.getmtime(cache_file) < USER_AGENT_MAX_AGE:
+            with open(cache_file, mode="r") as f:
+                user_agent = f.read().strip()
+            if user_agent:
+                return user_agent
+    except OSError:
+        pass
+
+    from fake_useragent import UserAgent
+    user_agent = UserAgent().chrome
+    os.makedirs(os.path.dirname(cache_file) or ".", exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, mode="w") as f:
+        f.write(user_agent)
+    os.replace(tmp_file, cache_file)
+    return user_agent
+
+
 class APIScraper:
     def __init__(self, url):
         self.BASE_URL = url
 
-        ua = UserAgent()
         self.headers = {
             "Accept": "*/*",
             "Content-Type": "application/json",
             "Origin": self.BASE_URL,
             "Referer": self.BASE_URL,
-            "User-Agent": ua.chrome,
+            "User-Agent": get_user_agent(),
         }
 
         self.RETRY_CODES = [
@@ -34,11 +79,96 @@ class APIScraper:
         self.RETRY_TIME = 5.0  # seconds
         self.REQUEST_INTERVAL_TIME = 0.5  # seconds
 
+        # always loaded: subclasses read other keys (e.g. GAMALYTIC_API_KEY) from it, and
+        # variables already set in the environment are not overridden
+        from dotenv import load_dotenv
         load_dotenv("../../.env")
         self.STEAM_API_KEY = os.getenv("STEAM_API_KEY")
         if not self.STEAM_API_KEY:
             raise ValueError("Steam API key not found")
 
+        # offline testing/benchmarking, see `replay.py` and `mock_server.py`
+        self.replay = ReplayStore.from_env()
+        self.MOCK_URL = os.getenv("SCRAPER_MOCK_URL")
+
+        # per-endpoint request counts/latencies, see `metrics.py`
+        self.metrics = ScraperMetrics.from_env(type(self).__name__)
+
+        # ids that could not be retrieved, see `ledger.py` and `retry_failed`
+        self.failed_dir = "../../data/raw/failed/"
+        self.local = threading.local()  # per fetch thread state, see `pipeline.py`
+
+        # prefix of the shard and ledger names of a run over a work list, see `use_work_list`
+        self.run_tag = None
+
+        # optional `quota.QuotaLedger` shared with other processes using the same endpoint/key
+        self.quota = None
+
+    @property
+    def last_failure(self) -> dict | None:
+        """
+        `{"status", "error"}` of the last request of this thread that gave up.
+        """
+        return getattr(self.local, "last_failure", None)
+
+    @last_failure.setter
+    def last_failure(self, failure: dict | None) -> None:
+        self.local.last_failure = failure
+
+    def sleep(self, seconds: float, reason: str = "interval") -> None:
+        """
+        `time.sleep` that is accounted for in the scraper metrics, so that time spent
+        throttling ourselves can be told apart from time spent waiting on the network.
+        """
+        self.metrics.observe_sleep(seconds, reason)
+        time.sleep(seconds)
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        params: dict = None,
+        headers: dict = None,
+        body: dict = None,
+    ) -> Response:
+        """
+        Sends a single HTTP request. Every request made by the scrapers goes through here.
+
+        With `SCRAPER_REPLAY_MODE=replay` the response comes from the recorded fixtures,
+        with `SCRAPER_REPLAY_MODE=record` live responses are saved as fixtures, and with
+        `SCRAPER_MOCK_URL` set the request is sent to the mock server instead of the real host.
+        """
+        if self.replay and self.replay.mode == "replay":
+            return self.replay.load(method, url, params, body)
+
+        target_url = url
+        if self.MOCK_URL:
+            parts = urlsplit(url)
+            target_url = self.MOCK_URL.rstrip("/") + parts.path
+            headers = {**(headers or {}), "X-Replay-Host": parts.netloc}
+
+        if self.quota:
+            self.quota.acquire(lambda seconds: self.sleep(seconds, reason="quota"))
+
+        import requests
+
+        start = time.perf_counter()
+        try:
+            response = requests.request(method, target_url, params=params, headers=headers, json=body)
+        except Exception as e:
+            self.metrics.observe_request(url, type(e).__name__, time.perf_counter() - start)
+            raise
+        self.metrics.observe_request(
+            url, response.status_code, time.perf_counter() - start, len(response.content)
+        )
+        if self.quota and response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            retry_after = response.headers.get("Retry-After", "")
+            self.quota.block(float(retry_after) if retry_after.isdigit() else self.RETRY_TIME * 12)
+
+        if self.replay and self.replay.mode == "record":
+            self.replay.save(method, url, params, body, response)
+        return response
+
     def get_request(
         self,
         url: str,
@@ -47,21 +177,28 @@ class APIScraper:
         headers: dict = None,
         exit_on_fail: bool = True,
     ) -> Response | None:
+        from requests.exceptions import HTTPError
+
+        self.last_failure = None
         attempt_count = 0
         while attempt_count < max_attempts:
             attempt_count += 1
+            if attempt_count > 1:
+                self.metrics.observe_retry(url)
             try:
-                response = requests.get(url, params=params, headers=headers)
+                response = self.send("GET", url, params=params, headers=headers)
                 response.raise_for_status()
                 return response
             except HTTPError as e:
+                self.last_failure = {"status": e.response.status_code, "error": type(e).__name__}
                 if e in self.RETRY_CODES and attempt_count < max_attempts:
                     self.log.warning("Received server-side HTTPError. Retrying...")
                 else:
                     self.log.exception(f"Received HTTPError: {e}")
             except Exception as e:
+                self.last_failure = {"status": None, "error": type(e).__name__}
                 self.log.exception(f"Received nonHTTPError: {e}")
-            time.sleep(self.RETRY_TIME)
+            self.sleep(self.RETRY_TIME, reason="retry")
 
         if exit_on_fail:
             self.log.error(
@@ -83,21 +220,29 @@ class APIScraper:
         headers: dict = None,
         exit_on_fail: bool = False,
     ) -> Response | None:
+        from requests.exceptions import HTTPError
+
+        self.last_failure = None
         attempt_count = 0
         while attempt_count < max_attempts:
             attempt_count += 1
+            if attempt_count > 1:
+                self.metrics.observe_retry(url)
             try:
-                response = requests.get(url, json=body, params=params, headers=headers)
+                # sent as GET with a JSON body, as the HLTB search has always been requested
+                response = self.send("GET", url, params=params, headers=headers, body=body)
                 response.raise_for_status()
                 return response
             except HTTPError as e:
+                self.last_failure = {"status": e.response.status_code, "error": type(e).__name__}
                 if e in self.RETRY_CODES and attempt_count < max_attempts:
                     self.log.warning("Received server-side HTTPError. Retrying...")
                 else:
                     self.log.exception(f"Received HTTPError: {e}")
             except Exception as e:
+                self.last_failure = {"status": None, "error": type(e).__name__}
                 self.log.exception(f"Received nonHTTPError: {e}")
-            time.sleep(self.RETRY_TIME)
+            self.sleep(self.RETRY_TIME, reason="retry")
 
         if exit_on_fail:
             self.log.error(
@@ -110,5 +255,110 @@ class APIScraper:
 
         return None
 
+    def use_work_list(self, id_file: str) -> None:
+        """
+        Reads the ids from `id_file` (e.g. a `refresh_scheduler.py` work list) instead of the
+        full id file(s). The shards and failure ledgers of the run are prefixed with the name
+        of the work list, so they don't overwrite those of the same range of the full list.
+        """
+        if hasattr(self, "id_files"):
+            self.id_folder, self.id_files = os.path.dirname(id_file) + "/", [os.path.basename(id_file)]
+        else:
+            self.id_file = id_file
+        self.run_tag = os.path.splitext(os.path.basename(id_file))[0]
+
+    def shard(self, start: int, end: int) -> str:
+        """
+        Returns:
+            str: `{start}_{end}`, or `{run_tag}_{start}_{end}` for a work list
+        """
+        return f"{self.run_tag}_{start}_{end}" if self.run_tag else f"{start}_{end}"
+
+    def ledger(self, start: int, end: int, reset: bool = False) -> FailureLedger:
+        """
+        Args:
+            reset (bool): drop the failures of an earlier run, for a shard that is rewritten
+                from the start (otherwise `retry_failed` would fetch ids the new shard has)
+        """
+        ledger = FailureLedger(f"{self.failed_dir}{type(self).__name__}_{self.shard(start, end)}.jsonl")
+        if reset:
+            ledger.replace([])
+        return ledger
+
+    def fetch_or_raise(self, url: str, max_attempts: int, **kwargs) -> Response:
+        """
+        `get_request` for pipeline fetch functions: raises `FetchError` instead of returning None.
+        """
+        response = self.get_request(url, max_attempts, exit_on_fail=False, **kwargs)
+        if response is None:
+            raise FetchError(self.last_failure)
+        return response
+
+    def record_failure(
+        self, ledger: FailureLedger, app_id: int, url: str, error: str = None, failure: dict = None
+    ) -> None:
+        """
+        Records `app_id` in the ledger with the status/error of the last failed request
+        (or of `failure`, e.g. from `pipeline.failure_of`), or with `error` if the request
+        itself succeeded (e.g. "EmptyResponse").
+        """
+        host, path = endpoint_of(url)
+        failure = failure or self.last_failure or {"status": None, "error": "EmptyResponse"}
+        ledger.record(app_id, host + path, failure["status"], error or failure["error"])
+
+    def fetch_id(self, app_id: int):
+        """
+        Fetches the data of a single id, or returns None (with `self.last_failure` set if a
+        request failed). Needed by `retry_failed`.
+        """
+        raise NotImplementedError()
+
+    def format_line(self, app_id: int, data) -> str:
+        return json.dumps(data, ensure_ascii=False) + "\n"
+
+    def retry_failed(self, include_permanent: bool = False) -> None:
+        """
+        Re-fetches only the ids in this scraper's failure ledgers, backing off according to
+        the error class of each failure (see `ledger.BACKOFF`). Recovered data is appended to
+        `{data_file}_{start}_{end}_retry.jsonl` and the ledgers keep only what still fails.
+
+        Args:
+            include_permanent (bool): also retry ids that failed with a 4xx other than 429
+        """
+        prefix = f"{self.failed_dir}{type(self).__name__}_"
+        for ledger_file in sorted(glob.glob(f"{prefix}*.jsonl")):
+            shard = ledger_file[len(prefix):-len(".jsonl")]
+            ledger = FailureLedger(ledger_file)
+            entries = ledger.read()
+            output_file_name = f"{self.data_file}_{shard}_retry.jsonl"
+            self.log.info(f"Retrying {len(entries)} failed IDs from {ledger_file} into {output_file_name}")
+
+            remaining = []
+            consecutive_failures = {}
+            with open(output_file_name, mode="a") as output_file:
+                for entry in entries:
+                    if classify(entry["status"], entry["error"]) == PERMANENT and not include_permanent:
+                        remaining.append(entry)
+                        continue
+
+                    data = self.fetch_id(entry["app_id"])
+                    if data:
+                        output_file.write(self.format_line(entry["app_id"], data))
+                        consecutive_failures = {}
+                        self.sleep(self.REQUEST_INTERVAL_TIME)
+                        continue
+
+                    failure = self.last_failure or {"status": None, "error": "EmptyResponse"}
+                    remaining.append({**entry, **failure, "time": int(time.time())})
+                    error_class = classify(failure["status"], failure["error"])
+                    if error_class == PERMANENT:
+                        self.sleep(self.REQUEST_INTERVAL_TIME)
+                    else:
+                        consecutive_failures[error_class] = consecutive_failures.get(error_class, 0) + 1
+                        self.sleep(backoff_time(error_class, consecutive_failures[error_class]), reason="backoff")
+
+            ledger.replace(remaining)
+            self.log.info(f"Recovered {len(entries) - len(remaining)} IDs, {len(remaining)} still failing")
+
     def run_scraper(self):
         raise NotImplementedError()
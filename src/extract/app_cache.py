@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import time
+
+APP_CACHE_DB = "../../data/cache/app_classes.db"
+
+# how long a classification is trusted, in seconds
+DAY = 24 * 60 * 60
+TTL_GAME_OR_DLC = 30 * DAY  # still re-checked now and then in case it gets delisted
+TTL_HIDDEN = 7 * DAY  # unreleased/hidden apps often become visible
+TTL_OTHER = 180 * DAY  # soundtracks, demos, videos... practically never change
+
+
+class AppClassificationCache:
+    """
+    Persistent `IStoreBrowseService/GetItems` classification (type, visible) per app id,
+    so `SteamAppList.filter_app_list` only has to query new or stale ids.
+    """
+    def __init__(self, db_path: str = APP_CACHE_DB):
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS app_classes ("
+            + "appid INTEGER PRIMARY KEY, type INTEGER, visible INTEGER NOT NULL, last_checked REAL NOT NULL)"
+        )
+
+
+    def load(self) -> dict:
+        """
+        Returns:
+            dict: appid -> {"appid", "type", "visible", "last_checked"}
+        """
+        return {
+            appid: {"appid": appid, "type": app_type, "visible": bool(visible), "last_checked": last_checked}
+            for appid, app_type, visible, last_checked in self.conn.execute(
+                "SELECT appid, type, visible, last_checked FROM app_classes"
+            )
+        }
+
+
+    @staticmethod
+    def is_stale(entry: dict, now: float) -> bool:
+        if not entry["visible"]:
+            ttl = TTL_HIDDEN
+        elif entry["type"] in (0, 4):
+            ttl = TTL_GAME_OR_DLC
+        else:
+            ttl = TTL_OTHER
+        return now - entry["last_checked"] > ttl
+
+
+    def update(self, requested_ids: list[int], store_items: list[dict], now: float = None) -> None:
+        """
+        Stores the classification of a GetItems response. Requested ids missing from the
+        response are stored as not visible, so they are re-checked after `TTL_HIDDEN`.
+        """
+        now = now or time.time()
+        rows = {appid: (appid, None, 0, now) for appid in requested_ids}
+        for item in store_items:
+            rows[item["appid"]] = (item["appid"], item.get("type"), int(bool(item.get("visible"))), now)
+        self.conn.executemany("INSERT OR REPLACE INTO app_classes VALUES (?, ?, ?, ?)", rows.values())
+        self.conn.commit()
+
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+from collections import deque
+from typing import Callable, Iterator
+
+BATCH_SIZE_FILE = "../../data/cache/batch_sizes.json"
+
+
+class AdaptiveBatcher:
+    """
+    Finds the largest batch an endpoint accepts reliably: additive increase after every
+    complete response, multiplicative decrease after a failed request (AIMD).
+
+    Partial responses don't change the size. Only the missing ids are retried, split into
+    halves, so an id the endpoint never returns ends up alone and is given up after
+    `max_attempts`. The tuned size is saved under `name` in `state_file` and is the
+    starting size of the next run.
+    """
+    def __init__(
+        self,
+        name: str,
+        initial: int = 50,
+        minimum: int = 5,
+        maximum: int = 500,
+        increase: int = 5,
+        max_attempts: int = 3,
+        state_file: str = BATCH_SIZE_FILE,
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.max_attempts = max_attempts
+        self.state_file = state_file
+        self.log = logging.getLogger(__name__)
+
+        self.size = self.load().get(name, initial)
+        self.size = max(self.minimum, min(self.maximum, self.size))
+
+
+    def load(self) -> dict:
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, mode="r") as f:
+            return json.load(f)
+
+
+    def save(self) -> None:
+        state = self.load()
+        state[self.name] = self.size
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp_file = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_file, mode="w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+
+    def succeeded(self) -> None:
+        self.size = min(self.maximum, self.size + self.increase)
+
+
+    def failed(self) -> None:
+        self.size = max(self.minimum, self.size // 2)
+
+
+    def run(
+        self,
+        ids: list[int],
+        request: Callable[[list[int]], list[dict] | None],
+        key: Callable[[dict], int] = lambda item: item["appid"],
+    ) -> Iterator[tuple[list[dict], list[int]]]:
+        """
+        Requests every id in `ids` in adaptively sized batches.
+
+        Args:
+            ids (list): ids to request
+            request (callable): sends one batch, returns the items or None if the request failed
+            key (callable): id of a returned item
+
+        Yields:
+            list: items returned by one request
+            list: ids given up on after this request (failed/missing `max_attempts` times)
+        """
+        queue = deque(ids)
+        retry_queue = deque()  # (id, attempts) to retry before continuing with `queue`
+        while queue or retry_queue:
+            if retry_queue:
+                batch = [retry_queue.popleft() for _ in range(max(1, (len(retry_queue) + 1) // 2))]
+            else:
+                batch = [(queue.popleft(), 0) for _ in range(min(self.size, len(queue)))]
+            items = request([item_id for item_id, _ in batch])
+
+            given_up = []
+            if items is None:
+                self.log.warning(f"Request for {len(batch)} IDs failed, batch size {self.size} -> {max(self.minimum, self.size // 2)}")
+                self.failed()
+                if len(batch) == 1:
+                    # a single id can't be split any further, count it as an attempt
+                    failed = [(batch[0][0], batch[0][1] + 1)]
+                else:
+                    failed = batch
+            else:
+                returned = {key(item) for item in items}
+                failed = [(item_id, attempts + 1) for item_id, attempts in batch if item_id not in returned]
+                if failed:
+                    self.log.warning(
+                        f"Number of apps retrieved ({len(items)}) does not match number requested "
+                        + f"({len(batch)}), retrying {len(failed)} IDs"
+                    )
+                elif all(attempts == 0 for _, attempts in batch):
+                    self.succeeded()
+
+            for item_id, attempts in failed:
+                if attempts >= self.max_attempts:
+                    given_up.append(item_id)
+                else:
+                    retry_queue.append((item_id, attempts))
+
+            yield items or [], given_up
+        self.save()
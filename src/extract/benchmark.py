@@ -0,0 +1,174 @@
+"""
+Runs each scraper end to end against `mock_server.py` and reports throughput.
+
+Fixtures have to be recorded first, e.g. with a small live run:
+    SCRAPER_REPLAY_MODE=record SCRAPER_REPLAY_DIR=../../data/replay/ python gamalytic.py
+
+Then (from `src/extract`):
+    python benchmark.py --fixtures ../../data/replay/ --ids ../../data/raw/steam_ids/game_ids.txt \\
+        --limit 200 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import requests
+
+from mock_server import MockServer, MockServerConfig
+
+
+def setup_gamalytic(scraper, tmp, id_file):
+    scraper.id_file = id_file
+    scraper.data_file = os.path.join(tmp, "gamalytic")
+    return lambda limit: scraper.get_data(start=0, limit=limit)
+
+def setup_appdetails(scraper, tmp, id_file):
+    scraper.id_folder, scraper.id_files = os.path.dirname(id_file) + "/", [os.path.basename(id_file)]
+    scraper.data_file = os.path.join(tmp, "appdetails")
+    return lambda limit: scraper.get_appdetails(start=0, limit=limit)
+
+def setup_getitems(scraper, tmp, id_file):
+    scraper.id_folder, scraper.id_files = os.path.dirname(id_file) + "/", [os.path.basename(id_file)]
+    scraper.data_file = os.path.join(tmp, "getitems")
+    return lambda limit: scraper.get_getitems(start=0, limit=limit)
+
+def setup_app_list(scraper, tmp, id_file):
+    raw_id_file = os.path.join(tmp, "_ids_raw.txt")
+    scraper.raw_id_file = raw_id_file
+    scraper.game_id_file = os.path.join(tmp, "game_ids.txt")
+    scraper.dlc_id_file = os.path.join(tmp, "dlc_ids.txt")
+    def run(limit):
+        with open(id_file, mode="r") as src, open(raw_id_file, mode="w") as dst:
+            for i, line in enumerate(src):
+                if i >= limit:
+                    break
+                dst.write(line)
+        scraper.filter_app_list()
+    return run
+
+def setup_review_histories(scraper, tmp, id_file):
+    scraper.id_file = id_file
+    scraper.data_file = os.path.join(tmp, "review_history")
+    return lambda limit: scraper.get_data(start=0, limit=limit)
+
+def setup_review_stats(scraper, tmp, id_file):
+    scraper.id_file = id_file
+    scraper.data_all_file = os.path.join(tmp, "review_summary_all")
+    scraper.data_early_file = os.path.join(tmp, "review_summary_early")
+    scraper.getitems_directory = tmp
+    return lambda limit: scraper.get_data(start=0, limit=limit)
+
+def setup_charts(scraper, tmp, id_file):
+    scraper.id_file = os.path.join(tmp, "chart_ids.txt")
+    scraper.data_file = os.path.join(tmp, "ccu_history")
+    with open(id_file, mode="r") as src, open(scraper.id_file, mode="w") as dst:
+        for line in src:
+            dst.write(line.split("\t")[0].strip() + "\n")
+    return lambda limit: scraper.get_all_ccu_history(start=0, limit=limit)
+
+def setup_cattag(scraper, tmp, id_file):
+    scraper.tag_file = os.path.join(tmp, "tags.json")
+    scraper.category_file = os.path.join(tmp, "categories.json")
+    def run(limit):
+        scraper.get_tags()
+        scraper.get_categories()
+    return run
+
+def setup_hltb(scraper, tmp, id_file):
+    scraper.data_file = os.path.join(tmp, "game_data.jsonl")
+    scraper.id_file = os.path.join(tmp, "hltb_ids.txt")
+    def run(limit):
+        key = scraper.get_search_key()
+        scraper.get_hltb_ids(key, max_pages=max(1, limit // 20))
+        scraper.get_all_game_data()
+    return run
+
+# name -> (module, class name, setup function)
+SCENARIOS = {
+    "gamalytic": ("gamalytic", "GamalyticScraper", setup_gamalytic),
+    "appdetails": ("steam_appdetails", "SteamAppDetailsScraper", setup_appdetails),
+    "getitems": ("steam_getitems", "SteamGetItemsScraper", setup_getitems),
+    "app_list": ("steam_app_list", "SteamAppList", setup_app_list),
+    "review_histories": ("steam_reviewhistories", "SteamReviewHistoriesScraper", setup_review_histories),
+    "review_stats": ("steam_reviewstats", "SteamReviewStatisticsScraper", setup_review_stats),
+    "steam_charts": ("steam_charts", "SteamPlayerCharts", setup_charts),
+    "categories_tags": ("steam_cattag", "SteamCategoriesTags", setup_cattag),
+    "hltb": ("hltb", "HLTBScraper", setup_hltb),
+}
+
+
+def run_scenario(name: str, mock: MockServer, id_file: str, limit: int, interval: float, retry_time: float) -> dict:
+    module_name, class_name, setup = SCENARIOS[name]
+    scraper_class = getattr(__import__(module_name), class_name)
+
+    requests.get(f"{mock.url}/__reset__")
+    tmp = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    try:
+        scraper = scraper_class()
+        scraper.REQUEST_INTERVAL_TIME = interval
+        scraper.RETRY_TIME = retry_time
+        scraper.quota = None  # the mock server has its own --rate-limit
+        run = setup(scraper, tmp, id_file)
+
+        start = time.perf_counter()
+        completed = True
+        try:
+            run(limit)
+        except SystemExit:
+            # scrapers exit(1) when a request with exit_on_fail=True gives up
+            completed = False
+        wall_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    stats = requests.get(f"{mock.url}/__stats__").json()
+    failed = stats["injected_errors"] + stats["rate_limited"]
+    return {
+        "completed": completed,
+        "wall_time": wall_time,
+        "requests": stats["requests"],
+        "requests_per_sec": stats["requests"] / wall_time if wall_time else 0.0,
+        "bytes_per_sec": stats["bytes_sent"] / wall_time if wall_time else 0.0,
+        "retry_overhead": failed / stats["requests"] if stats["requests"] else 0.0,
+        "missing_fixtures": stats["missing_fixtures"],
+        "status_counts": stats["status_counts"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="../../data/replay/")
+    parser.add_argument("--ids", default="../../data/raw/steam_ids/game_ids.txt", help="id file in game_ids.txt format")
+    parser.add_argument("--scrapers", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--limit", type=int, default=100, help="ids per scraper")
+    parser.add_argument("--interval", type=float, default=0.0, help="override REQUEST_INTERVAL_TIME")
+    parser.add_argument("--retry-time", type=float, default=0.1, help="override RETRY_TIME")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(levelname)s | %(message)s")
+    log = logging.getLogger("benchmark")
+    log.setLevel(logging.INFO)
+
+    config = MockServerConfig(args.latency, args.jitter, args.error_rate, args.throttle_rate, args.rate_limit)
+    with MockServer(args.fixtures, config) as mock:
+        os.environ["SCRAPER_MOCK_URL"] = mock.url
+        os.environ.pop("SCRAPER_REPLAY_MODE", None)
+        os.environ.setdefault("STEAM_API_KEY", "benchmark")
+
+        log.info(f"{'scraper':<18}{'wall (s)':>10}{'requests':>10}{'req/s':>10}{'KiB/s':>10}{'retry %':>9}{'missing':>9}")
+        for name in args.scrapers:
+            result = run_scenario(name, mock, args.ids, args.limit, args.interval, args.retry_time)
+            log.info(
+                f"{name:<18}{result['wall_time']:>10.2f}{result['requests']:>10}"
+                + f"{result['requests_per_sec']:>10.1f}{result['bytes_per_sec'] / 1024:>10.1f}"
+                + f"{result['retry_overhead'] * 100:>8.1f}%{result['missing_fixtures']:>9}"
+                + ("" if result["completed"] else "  (aborted)")
+            )
@@ -0,0 +1,95 @@
+"""
+Checks that importing and constructing each scraper stays cheap, so orchestrators can spawn
+many short-lived workers. For every scraper, a fresh interpreter imports the module and
+constructs the scraper, and the check fails if
+    - it takes more than `--budget` ms longer than starting a bare interpreter, or
+    - any of the heavy modules (requests, bs4, fake_useragent) got imported.
+
+Run from `src/extract`:
+    python check_startup.py --budget 100
+
+The heavy-import part is also covered by `tests/test_startup.py`.
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from api_scraper import get_user_agent
+
+SCRAPERS = {
+    "gamalytic": "GamalyticScraper",
+    "steam_appdetails": "SteamAppDetailsScraper",
+    "steam_getitems": "SteamGetItemsScraper",
+    "steam_app_list": "SteamAppList",
+    "steam_reviewhistories": "SteamReviewHistoriesScraper",
+    "steam_reviewstats": "SteamReviewStatisticsScraper",
+    "steam_charts": "SteamPlayerCharts",
+    "steam_cattag": "SteamCategoriesTags",
+    "hltb": "HLTBScraper",
+}
+
+HEAVY_MODULES = ("requests", "bs4", "fake_useragent")
+
+PROBE = """
+import sys
+from {module} import {class_name}
+{class_name}()
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def time_interpreter(code: str, repeats: int) -> tuple[float, str]:
+    """
+    Returns:
+        float: best wall time (ms) of `python -c code` over `repeats` runs
+        str: stdout of the last run
+
+    Raises:
+        subprocess.CalledProcessError: if `code` fails
+    """
+    env = {**os.environ, "STEAM_API_KEY": os.getenv("STEAM_API_KEY", "startup-check")}
+    best = float("inf")
+    output = ""
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        best = min(best, (time.perf_counter() - start) * 1000)
+        output = result.stdout.strip()
+    return best, output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=100.0, help="ms on top of a bare interpreter")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    log = logging.getLogger("check_startup")
+
+    # the first construction fills the User-Agent cache, which is not what is being measured
+    get_user_agent()
+    baseline, _ = time_interpreter("pass", args.repeats)
+    log.info(f"Bare interpreter: {baseline:.1f} ms, budget: +{args.budget:.0f} ms")
+
+    failed = False
+    for module, class_name in SCRAPERS.items():
+        code = PROBE.format(module=module, class_name=class_name, heavy=HEAVY_MODULES)
+        try:
+            elapsed, heavy = time_interpreter(code, args.repeats)
+        except subprocess.CalledProcessError as e:
+            log.error(f"{class_name:<30}failed to import/construct:\n{e.stderr}")
+            failed = True
+            continue
+        overhead = elapsed - baseline
+        ok = overhead <= args.budget and not heavy
+        failed = failed or not ok
+        log.log(
+            logging.INFO if ok else logging.ERROR,
+            f"{class_name:<30}{overhead:>8.1f} ms" + (f"  imported: {heavy}" if heavy else ""),
+        )
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,299 @@
+"""
+Compacts the raw shards of a source into sorted, deduplicated segments.
+
+Reruns, retry passes, overlapping START/LIMIT ranges and append-mode reruns leave the same
+app in several shards. This keeps only the latest record per app, "latest" being the record
+from the most recently modified shard (and the last line within a shard), using an external
+sort: shards are read in sorted runs of at most `--run-mb` MB, the runs are k-way merged with
+`heapq.merge`, and memory stays bounded whatever the corpus size.
+
+The output goes to `{output_dir}/{folder}/{prefix}{first_appid}_{last_appid}.jsonl` segments,
+in the raw line format so the stage_1 loaders can read them, with an index
+`{prefix}index.tsv` of `appid<TAB>segment<TAB>byte offset` lines (see `CompactedIndex`).
+The new output is written to a temporary folder and only replaces the previous one once
+complete, and raw shards are not modified.
+
+From `src/extract`:
+    python compaction.py gamalytic ccu_history
+"""
+import argparse
+import bisect
+import heapq
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+from array import array
+from collections import deque
+
+from tab_lines import tab_key
+
+RAW_DIR = "../../data/raw/"
+COMPACT_DIR = "../../data/compacted/"
+
+
+def field_key(field: str):
+    def key(line: str) -> int | None:
+        value = json.loads(line).get(field)
+        return int(value) if value is not None else None
+    return key
+
+
+def appdetails_key(line: str) -> int | None:
+    # {"<appid>": {"success": ..., "data": {...}}}
+    data = json.loads(line)
+    return int(next(iter(data))) if data else None
+
+
+# source -> (folder in RAW_DIR, shard prefix, appid of a line)
+SOURCES = {
+    "gamalytic": ("gamalytic", "data_", field_key("steamId")),
+    "getitems": ("steam_apps", "getitems_", field_key("appid")),
+    "appdetails": ("steam_apps", "appdetails_", appdetails_key),
+    "review_summary_all": ("steam_apps", "review_summary_all_", field_key("id")),
+    "review_summary_early": ("steam_apps", "review_summary_early_", field_key("id")),
+    "review_history": ("steam_apps", "review_history_", field_key("id")),
+    "ccu_history": ("steam_charts", "ccu_history_", tab_key),
+}
+
+
+def write_run(records: list, run_dir: str, run_number: int) -> str:
+    records.sort()
+    run_file = os.path.join(run_dir, f"run_{run_number:06d}.tsv")
+    with open(run_file, mode="w") as f:
+        for key, mtime, file_index, line_number, line in records:
+            f.write(f"{key}\t{mtime!r}\t{file_index}\t{line_number}\t{line}")
+    return run_file
+
+
+def read_run(run_file: str):
+    with open(run_file, mode="r") as f:
+        for row in f:
+            key, mtime, file_index, line_number, line = row.split("\t", 4)
+            yield int(key), float(mtime), int(file_index), int(line_number), line
+
+
+def latest_per_key(records):
+    """
+    Yields the last record of every key of the (key, version...)-sorted `records`.
+    """
+    for _, group in itertools.groupby(records, key=lambda record: record[0]):
+        yield deque(group, maxlen=1)[0]
+
+
+class Compactor:
+    def __init__(
+        self,
+        raw_dir: str = RAW_DIR,
+        output_dir: str = COMPACT_DIR,
+        run_bytes: int = 256 * 2**20,
+        fan_in: int = 128,
+        segment_records: int = 50000,
+    ):
+        """
+        Args:
+            raw_dir (str): folder of the raw source folders
+            output_dir (str): folder the compacted source folders are written to
+            run_bytes (int): raw line bytes per sorted run, bounds the memory used
+            fan_in (int): maximum number of runs merged at once (open files)
+            segment_records (int): records per output segment
+        """
+        self.raw_dir = raw_dir
+        self.output_dir = output_dir
+        self.run_bytes = run_bytes
+        self.fan_in = fan_in
+        self.segment_records = segment_records
+        self.log = logging.getLogger(__name__)
+
+
+    def make_runs(self, folder: str, prefix: str, key, run_dir: str) -> tuple[list[str], int]:
+        """
+        Returns:
+            list: sorted run files
+            int: number of records read
+        """
+        source_dir = os.path.join(self.raw_dir, folder)
+        shards = sorted(f for f in os.listdir(source_dir) if f.startswith(prefix) and f.endswith(".jsonl"))
+        self.log.info(f"Compacting {len(shards)} {prefix}* shards from {source_dir}")
+
+        runs, records, size, total, skipped = [], [], 0, 0, 0
+        for file_index, shard in enumerate(shards):
+            shard_path = os.path.join(source_dir, shard)
+            mtime = os.path.getmtime(shard_path)
+            with open(shard_path, mode="r") as f:
+                for line_number, line in enumerate(f):
+                    if not line.strip():
+                        continue
+                    try:
+                        app_id = key(line)
+                    except (ValueError, StopIteration):
+                        app_id = None
+                    if app_id is None:
+                        skipped += 1
+                        continue
+
+                    records.append((app_id, mtime, file_index, line_number, line if line.endswith("\n") else line + "\n"))
+                    size += len(line)
+                    total += 1
+                    if size >= self.run_bytes:
+                        runs.append(write_run(records, run_dir, len(runs)))
+                        records, size = [], 0
+        if records:
+            runs.append(write_run(records, run_dir, len(runs)))
+
+        if skipped:
+            self.log.warning(f"Skipped {skipped} lines without an app id")
+        return runs, total
+
+
+    def merge_runs(self, runs: list[str], run_dir: str):
+        """
+        Merges `runs` down to at most `fan_in` runs, then returns the final merged stream.
+        """
+        level = 0
+        while len(runs) > self.fan_in:
+            merged_runs = []
+            for i in range(0, len(runs), self.fan_in):
+                group = runs[i : i + self.fan_in]
+                run_file = os.path.join(run_dir, f"merge_{level}_{i // self.fan_in:06d}.tsv")
+                with open(run_file, mode="w") as f:
+                    for key, mtime, file_index, line_number, line in latest_per_key(heapq.merge(*map(read_run, group))):
+                        f.write(f"{key}\t{mtime!r}\t{file_index}\t{line_number}\t{line}")
+                for old_run in group:
+                    os.remove(old_run)
+                merged_runs.append(run_file)
+            runs = merged_runs
+            level += 1
+        return latest_per_key(heapq.merge(*map(read_run, runs)))
+
+
+    def compact(self, source: str) -> dict:
+        """
+        Compacts `source` (a key of `SOURCES`).
+
+        Returns:
+            dict: records read, records written and number of segments
+        """
+        folder, prefix, key = SOURCES[source]
+        target_dir = os.path.join(self.output_dir, folder)
+        os.makedirs(target_dir, exist_ok=True)
+
+        run_dir = tempfile.mkdtemp(prefix=f"compact_{source}_", dir=self.output_dir)
+        try:
+            runs, total = self.make_runs(folder, prefix, key, run_dir)
+            new_dir = os.path.join(run_dir, "output")
+            os.makedirs(new_dir)
+            written, segments = self.write_segments(self.merge_runs(runs, run_dir), new_dir, prefix)
+            self.replace_output(new_dir, target_dir, prefix)
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+        self.log.info(
+            f"{source}: {total} records -> {written} unique apps in {segments} segments "
+            + f"({total - written} duplicates dropped)"
+        )
+        return {"records": total, "written": written, "segments": segments}
+
+
+    @staticmethod
+    def replace_output(new_dir: str, target_dir: str, prefix: str) -> None:
+        """
+        Moves the complete output in `new_dir` into `target_dir` (same file system, so only
+        renames), index last, then removes the previous segments the new index doesn't use.
+        """
+        index_name = f"{prefix}index.tsv"
+        new_files = set(os.listdir(new_dir))
+        for name in sorted(new_files - {index_name}):
+            os.replace(os.path.join(new_dir, name), os.path.join(target_dir, name))
+        os.replace(os.path.join(new_dir, index_name), os.path.join(target_dir, index_name))
+
+        for old_file in os.listdir(target_dir):
+            if old_file.startswith(prefix) and old_file not in new_files:
+                os.remove(os.path.join(target_dir, old_file))
+
+
+    def write_segments(self, records, target_dir: str, prefix: str) -> tuple[int, int]:
+        written, segments = 0, 0
+        segment, segment_keys = None, []
+        tmp_segment = os.path.join(target_dir, f"{prefix}segment.tmp")
+        index = open(os.path.join(target_dir, f"{prefix}index.tsv.tmp"), mode="w")
+        index_rows = []
+
+        def close_segment():
+            segment.close()
+            name = f"{prefix}{segment_keys[0]}_{segment_keys[-1]}.jsonl"
+            os.replace(tmp_segment, os.path.join(target_dir, name))
+            for app_id, offset in zip(segment_keys, index_rows):
+                index.write(f"{app_id}\t{name}\t{offset}\n")
+
+        for app_id, _, _, _, line in records:
+            if segment is None:
+                segment, segment_keys, index_rows = open(tmp_segment, mode="wb"), [], []
+            index_rows.append(segment.tell())
+            segment.write(line.encode())
+            segment_keys.append(app_id)
+            written += 1
+            if len(segment_keys) >= self.segment_records:
+                close_segment()
+                segment, segments = None, segments + 1
+
+        if segment is not None:
+            close_segment()
+            segments += 1
+        index.close()
+        os.replace(os.path.join(target_dir, f"{prefix}index.tsv.tmp"), os.path.join(target_dir, f"{prefix}index.tsv"))
+        return written, segments
+
+
+class CompactedIndex:
+    """
+    Point lookups of raw lines in a compacted source. The index is read once into sorted
+    arrays and every lookup is a binary search plus one seek.
+    """
+    def __init__(self, target_dir: str, prefix: str):
+        self.target_dir = target_dir
+        self.keys, self.offsets = array("q"), array("q")
+        self.segment_ids, self.segments = array("l"), []
+
+        with open(os.path.join(target_dir, f"{prefix}index.tsv"), mode="r") as index:
+            for row in index:
+                key, segment, offset = row.rstrip("\n").split("\t")
+                if not self.segments or self.segments[-1] != segment:
+                    self.segments.append(segment)
+                self.keys.append(int(key))
+                self.segment_ids.append(len(self.segments) - 1)
+                self.offsets.append(int(offset))
+
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+    def lookup(self, app_id: int) -> str | None:
+        """
+        Returns the raw line of `app_id`, or None if the source has no record of it.
+        """
+        i = bisect.bisect_left(self.keys, app_id)
+        if i == len(self.keys) or self.keys[i] != app_id:
+            return None
+        with open(os.path.join(self.target_dir, self.segments[self.segment_ids[i]]), mode="rb") as f:
+            f.seek(self.offsets[i])
+            return f.readline().decode()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", default=list(SOURCES), choices=list(SOURCES))
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--output-dir", default=COMPACT_DIR)
+    parser.add_argument("--run-mb", type=int, default=256, help="raw MB per sorted run")
+    parser.add_argument("--segment-records", type=int, default=50000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    compactor = Compactor(args.raw_dir, args.output_dir, args.run_mb * 2**20, segment_records=args.segment_records)
+    for source in args.sources:
+        compactor.compact(source)
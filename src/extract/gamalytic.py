@@ -1,7 +1,5 @@
 import logging
-import time
 from api_scraper import APIScraper
-import json
 import os
 
 class GamalyticScraper(APIScraper):
@@ -22,6 +20,20 @@ class GamalyticScraper(APIScraper):
         }
 
 
+    def fetch_id(self, app_id: int) -> dict | None:
+        url = f"{self.BASE_URL}{app_id}"
+        response = self.get_request(url, max_attempts=3, params=self.params, headers=self.headers, exit_on_fail=False)
+        if not response:
+            return None
+
+        try:
+            return response.json()
+        except Exception as e:
+            self.last_failure = {"status": response.status_code, "error": type(e).__name__}
+            self.log.exception(f"Failed to get JSON for {app_id}: {e}")
+            return None
+
+
     def get_data(self, start: int = 0, limit: int = 10000):
         """
         Fetches all data for a range of IDs.
@@ -46,25 +58,22 @@ class GamalyticScraper(APIScraper):
 
         self.log.info(f"Starting API scraping for {len(app_ids)} apps (from index {start} to {end})")
 
-        file_name = f"{self.data_file}_{start}_{end}.jsonl"
+        file_name = f"{self.data_file}_{self.shard(start, end)}.jsonl"
+        ledger = self.ledger(start, end, reset=True)
         self.log.info(f"Saving data to {file_name}")
         with open(file_name, mode="w") as output_file:
             for i, (app_id, app_name) in enumerate(app_ids):
                 if i % 100 == 0:
                     self.log.info(f"Processed {i} apps")
                 
-                url = f"{self.BASE_URL}{app_id}"
-                response = self.get_request(url, max_attempts=3, params=self.params, headers=self.headers, exit_on_fail=False)
-                if not response:
+                data = self.fetch_id(app_id)
+                if not data:
                     self.log.warning(f"No data returned for app_id: {app_id}")
+                    self.record_failure(ledger, app_id, f"{self.BASE_URL}{app_id}")
                     continue
 
-                try:
-                    output_file.write(json.dumps(response.json(), ensure_ascii=False) + "\n")
-                except Exception as e:
-                    self.log.exception(f"Failed to get and write JSON for {app_name}: {e}")
-
-                time.sleep(self.REQUEST_INTERVAL_TIME)
+                output_file.write(self.format_line(app_id, data))
+                self.sleep(self.REQUEST_INTERVAL_TIME)
 
         self.log.info(f"Finished scraping all data for {len(app_ids)} apps (from index {start} to {end})")
 
@@ -72,6 +81,7 @@ class GamalyticScraper(APIScraper):
 if __name__ == "__main__":
     START = 110000
     LIMIT = 30000
+    RETRY = False  # only re-fetch the IDs in the failure ledgers
     fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
 
     file_handler = logging.FileHandler(
@@ -90,4 +100,7 @@ if __name__ == "__main__":
     logger.addHandler(console_handler)
 
     steam_scraper = GamalyticScraper()
-    steam_scraper.get_data(start=START, limit=LIMIT)
+    if RETRY:
+        steam_scraper.retry_failed()
+    else:
+        steam_scraper.get_data(start=START, limit=LIMIT)
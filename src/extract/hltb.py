@@ -1,13 +1,26 @@
 import re
 import json
-import time
 import logging
 
-import requests
-from requests.exceptions import HTTPError
-from bs4 import BeautifulSoup
-
 from api_scraper import APIScraper
+from pipeline import Pipeline
+
+
+def parse_game_page(html: str) -> dict:
+    """
+    Extracts the JSON game data from the `__NEXT_DATA__` script of a `/game/` page.
+    Module-level so `Pipeline` can run it in a process pool.
+
+    Raises:
+        ValueError: if the page has no `__NEXT_DATA__` script
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+
+    json_script_tag = soup.find("script", id="__NEXT_DATA__")
+    if not json_script_tag:
+        raise ValueError("No <script> with `__NEXT_DATA__` id")
+    return json.loads(json_script_tag.string)
 
 
 class HLTBScraper(APIScraper):
@@ -38,6 +51,7 @@ class HLTBScraper(APIScraper):
         self.log.info("Scraping search key...")
         response = self.get_request(self.BASE_URL, max_attempts, headers=self.headers)
 
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.text, "html.parser")
         script_key_tag = soup.find(
             "script", src=re.compile(r"_next/static/chunks/pages/_app-.*\.js")
@@ -193,7 +207,7 @@ class HLTBScraper(APIScraper):
             if page % 10 == 0:
                 self.log.info(f"    Requested up to page {page}...")
 
-            time.sleep(self.REQUEST_INTERVAL_TIME)
+            self.sleep(self.REQUEST_INTERVAL_TIME)
             page += 1
 
         self.log.info(f"Successfully processed {page-1} pages")
@@ -211,40 +225,50 @@ class HLTBScraper(APIScraper):
         url_id = url + hltb_id
         self.log.debug(f"    Requesting data from {url_id}")
         response = self.get_request(url_id, max_attempts, headers=self.headers)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # gather JSON game data
-        json_script_tag = soup.find("script", id="__NEXT_DATA__")
-        if not json_script_tag:
+        try:
+            return parse_game_page(response.text)
+        except ValueError:
             self.log.error(
                 "    Fatal error in finding <script> with `__NEXT_DATA__` id"
             )
             exit(1)
 
-        json_data = json.loads(json_script_tag.string)
-        return json_data
-
-    def get_all_game_data(self) -> None:
+    def get_all_game_data(self, fetch_workers: int = 2, parse_processes: int = 2) -> None:
         """
         Using the ids recorded in `self.id_file`, record all JSON completion data in
         `self.data_file`.
+
+        Requests, BeautifulSoup parsing (in `parse_processes` processes) and writing
+        overlap, see `pipeline.py`. Pages that fail are logged and skipped.
+
+        Args:
+            fetch_workers (int): number of concurrent requests
+            parse_processes (int): number of parsing processes, 0 parses in a thread
         """
         self.log.info(
             f"Reading IDs from {self.id_file} and recording app JSON data into {self.data_file}"
         )
 
         game_url = self.BASE_URL + "/game/"
-        id_file = open(self.id_file, mode="r")
-        data_file = open(self.data_file, mode="w")
+        with open(self.id_file, mode="r") as id_file:
+            hltb_ids = [hltb_id.strip() for hltb_id in id_file if hltb_id.strip()]
+
+        with open(self.data_file, mode="w") as data_file:
+            def fetch(hltb_id: str) -> str:
+                self.log.debug(f"    Requesting data from {game_url + hltb_id}")
+                return self.fetch_or_raise(game_url + hltb_id, 3, headers=self.headers).text
 
-        for hltb_id in id_file:
-            game_data = self.get_game_data(game_url, hltb_id.strip())
-            json_txt = json.dumps(game_data) + "\n"
+            def write(hltb_id: str, game_data: dict) -> None:
+                data_file.write(json.dumps(game_data) + "\n")
 
-            data_file.write(json_txt)
+            def failed(hltb_id: str, error: Exception | None) -> None:
+                self.log.error(f"    Failed to retrieve game data for HLTB id {hltb_id}: {error}")
 
-        id_file.close()
-        data_file.close()
+            pipeline = Pipeline(
+                fetch, write, parse=parse_game_page, failed=failed, fetch_workers=fetch_workers,
+                parse_processes=parse_processes, interval=self.REQUEST_INTERVAL_TIME, sleep=self.sleep,
+            )
+            pipeline.run(hltb_ids)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+# (base, max) backoff in seconds per error class during retry passes
+BACKOFF = {
+    "rate_limited": (60.0, 900.0),
+    "server_error": (10.0, 300.0),
+    "network": (5.0, 120.0),
+    "bad_payload": (2.0, 30.0),
+}
+
+# client errors other than 429 (e.g. 404 for delisted apps) won't go away by retrying
+PERMANENT = "permanent"
+
+# error of a request that succeeded but holds no data for the app, e.g. appdetails
+# `{"<appid>": {"success": false}}` for a delisted or region-locked app; permanent as well
+UNSUCCESSFUL = "Unsuccessful"
+
+
+def classify(status: int | None, error: str | None) -> str:
+    """
+    Maps a ledger entry to the error class that decides its retry backoff.
+    """
+    if error == UNSUCCESSFUL:
+        return PERMANENT
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server_error"
+    if status is not None and 400 <= status < 500:
+        return PERMANENT
+    if error in (None, "EmptyResponse", "JSONDecodeError", "ValueError", "KeyError"):
+        return "bad_payload"
+    return "network"
+
+
+def backoff_time(error_class: str, consecutive_failures: int) -> float:
+    """
+    Exponential backoff for the `consecutive_failures`-th failure in a row of `error_class`.
+    """
+    base, maximum = BACKOFF.get(error_class, BACKOFF["network"])
+    return min(maximum, base * 2 ** max(consecutive_failures - 1, 0))
+
+
+class FailureLedger:
+    """
+    Dead-letter file of ids a scraper failed to retrieve, one JSON object per line with
+    `app_id`, `endpoint`, `status`, `error` and `time`.
+
+    Scrapers append to it as they go; `APIScraper.retry_failed` re-fetches only these ids
+    and rewrites the ledger with whatever still fails.
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+
+
+    def record(self, app_id: int, endpoint: str, status: int | None = None, error: str | None = None) -> None:
+        entry = {"app_id": app_id, "endpoint": endpoint, "status": status, "error": error, "time": int(time.time())}
+        with open(self.file_path, mode="a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+    def read(self) -> list[dict]:
+        """
+        Returns:
+            list: the latest entry for every failed id, in order of first failure
+        """
+        if not os.path.exists(self.file_path):
+            return []
+        entries = {}
+        with open(self.file_path, mode="r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["app_id"]] = entry
+        return list(entries.values())
+
+
+    def replace(self, entries: list[dict]) -> None:
+        """
+        Atomically rewrites the ledger with `entries`, removing it if there are none left.
+        """
+        if not entries:
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+            return
+        tmp_file = self.file_path + ".tmp"
+        with open(tmp_file, mode="w") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_file, self.file_path)
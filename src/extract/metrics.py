@@ -0,0 +1,192 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# app ids, page numbers, hex search keys... are collapsed so each endpoint is one series
+ID_SEGMENT = re.compile(r"^(\d+|p\.\d+|[0-9a-f]{16,})$")
+
+
+def endpoint_of(url: str) -> tuple[str, str]:
+    """
+    Returns:
+        str: host
+        str: path with id-like segments replaced by `{id}`
+    """
+    parts = urlsplit(url)
+    segments = ["{id}" if ID_SEGMENT.match(s) else s for s in parts.path.split("/")]
+    return parts.netloc, "/".join(segments) or "/"
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.status_counts = {}  # status code (or exception class name) -> count
+        self.retries = 0
+        self.bytes_received = 0
+        self.network_seconds = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.status_counts.values())
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "status_counts": dict(self.status_counts),
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "network_seconds": round(self.network_seconds, 3),
+            "latency_buckets": {
+                str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets)
+            },
+        }
+
+
+class ScraperMetrics:
+    """
+    Per host/endpoint request metrics of one scraper, plus time spent in our own sleeps.
+
+    If `output_file` is set the metrics are rewritten there at most every
+    `flush_interval` seconds (and once more at exit), as Prometheus text if the file ends
+    with `.prom` and as JSON otherwise.
+    """
+    def __init__(self, scraper: str, output_file: str = None, flush_interval: float = 30.0):
+        self.scraper = scraper
+        self.output_file = output_file
+        self.flush_interval = flush_interval
+
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # scrapers may fetch from several threads
+        self.endpoints = {}  # (host, endpoint) -> EndpointMetrics
+        self.sleep_seconds = {}  # reason -> seconds
+        self.started = time.time()
+        self.last_flush = time.monotonic()
+
+        if self.output_file:
+            os.makedirs(os.path.dirname(self.output_file) or ".", exist_ok=True)
+            atexit.register(self.flush)
+
+
+    @classmethod
+    def from_env(cls, scraper: str) -> "ScraperMetrics":
+        """
+        `SCRAPER_METRICS_DIR` enables writing `{dir}/{scraper}.{SCRAPER_METRICS_FORMAT}`
+        ("prom" by default, or "json"); `SCRAPER_METRICS_INTERVAL` sets the flush interval.
+        """
+        metrics_dir = os.getenv("SCRAPER_METRICS_DIR")
+        output_file = None
+        if metrics_dir:
+            output_file = os.path.join(metrics_dir, f"{scraper}.{os.getenv('SCRAPER_METRICS_FORMAT', 'prom')}")
+        return cls(scraper, output_file, float(os.getenv("SCRAPER_METRICS_INTERVAL", "30")))
+
+
+    def get(self, url: str) -> EndpointMetrics:
+        key = endpoint_of(url)
+        if key not in self.endpoints:
+            self.endpoints[key] = EndpointMetrics()
+        return self.endpoints[key]
+
+
+    def observe_request(self, url: str, status, latency: float, size: int = 0) -> None:
+        """
+        Args:
+            url (str): requested URL
+            status (int | str): HTTP status code, or the exception class name if no response came back
+            latency (float): seconds spent waiting on the network
+            size (int): response body size in bytes
+        """
+        with self.lock:
+            endpoint = self.get(url)
+            endpoint.status_counts[status] = endpoint.status_counts.get(status, 0) + 1
+            endpoint.bytes_received += size
+            endpoint.network_seconds += latency
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    endpoint.latency_buckets[i] += 1
+                    break
+        self.maybe_flush()
+
+
+    def observe_retry(self, url: str) -> None:
+        with self.lock:
+            self.get(url).retries += 1
+
+
+    def observe_sleep(self, seconds: float, reason: str) -> None:
+        with self.lock:
+            self.sleep_seconds[reason] = self.sleep_seconds.get(reason, 0.0) + seconds
+
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "scraper": self.scraper,
+                "started": self.started,
+                "updated": time.time(),
+                "sleep_seconds": {k: round(v, 3) for k, v in self.sleep_seconds.items()},
+                "endpoints": [
+                    {"host": host, "endpoint": path, **metrics.as_dict()}
+                    for (host, path), metrics in sorted(self.endpoints.items())
+                ],
+            }
+
+
+    def to_prometheus(self) -> str:
+        data = self.as_dict()
+        scraper = data["scraper"]
+        lines = [
+            "# TYPE scraper_requests_total counter",
+            "# TYPE scraper_retries_total counter",
+            "# TYPE scraper_response_bytes_total counter",
+            "# TYPE scraper_network_seconds_total counter",
+            "# TYPE scraper_request_duration_seconds histogram",
+            "# TYPE scraper_sleep_seconds_total counter",
+        ]
+        for endpoint in data["endpoints"]:
+            labels = f'scraper="{scraper}",host="{endpoint["host"]}",endpoint="{endpoint["endpoint"]}"'
+            for status, count in endpoint["status_counts"].items():
+                lines.append(f'scraper_requests_total{{{labels},status="{status}"}} {count}')
+            lines.append(f"scraper_retries_total{{{labels}}} {endpoint['retries']}")
+            lines.append(f"scraper_response_bytes_total{{{labels}}} {endpoint['bytes_received']}")
+            lines.append(f"scraper_network_seconds_total{{{labels}}} {endpoint['network_seconds']}")
+
+            cumulative = 0
+            for bound, count in endpoint["latency_buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == "inf" else bound
+                lines.append(f'scraper_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"scraper_request_duration_seconds_sum{{{labels}}} {endpoint['network_seconds']}")
+            lines.append(f"scraper_request_duration_seconds_count{{{labels}}} {endpoint['requests']}")
+
+        for reason, seconds in data["sleep_seconds"].items():
+            lines.append(f'scraper_sleep_seconds_total{{scraper="{scraper}",reason="{reason}"}} {seconds}')
+        return "\n".join(lines) + "\n"
+
+
+    def maybe_flush(self) -> None:
+        if self.output_file and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+
+    def flush(self) -> None:
+        if not self.output_file:
+            return
+        with self.flush_lock:
+            self.last_flush = time.monotonic()
+            if self.output_file.endswith(".prom"):
+                content = self.to_prometheus()
+            else:
+                content = json.dumps(self.as_dict(), indent=2)
+
+            # write-then-rename so a dashboard never reads a half-written file
+            tmp_file = self.output_file + ".tmp"
+            with open(tmp_file, mode="w") as f:
+                f.write(content)
+            os.replace(tmp_file, self.output_file)
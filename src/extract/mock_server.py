@@ -0,0 +1,234 @@
+"""
+Local HTTP server that answers scraper requests from recorded fixtures (see `replay.py`),
+with configurable latency, injected 429/5xx errors and a per-host rate limit.
+
+Point the scrapers at it with `SCRAPER_MOCK_URL=http://127.0.0.1:{port}`; they send the
+original host in the `X-Replay-Host` header.
+
+Usage:
+    python mock_server.py --fixtures ../../data/replay/ --latency 0.05 --error-rate 0.02 --rate-limit 20
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+from replay import ReplayStore, request_key
+
+
+class MockServerConfig:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        rate_limit: float = None,
+        burst: int = 10,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            latency (float): seconds added to every response
+            jitter (float): extra uniform random latency, in seconds
+            error_rate (float): probability of answering with a random 5xx
+            throttle_rate (float): probability of answering with 429
+            rate_limit (float): requests/second allowed per host (None: unlimited),
+                                excess requests get 429
+            burst (int): token bucket size for `rate_limit`
+            seed (int): random seed for the injected errors
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.random = random.Random(seed)
+
+
+class MockServerStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.status_counts = {}
+            self.injected_errors = 0
+            self.rate_limited = 0
+            self.missing_fixtures = 0
+
+    def record(self, status: int, size: int, injected: bool = False, rate_limited: bool = False, missing: bool = False):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += size
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.injected_errors += injected
+            self.rate_limited += rate_limited
+            self.missing_fixtures += missing
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "status_counts": dict(self.status_counts),
+                "injected_errors": self.injected_errors,
+                "rate_limited": self.rate_limited,
+                "missing_fixtures": self.missing_fixtures,
+            }
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    # set on the subclass created by `MockServer`
+    store: ReplayStore = None
+    config: MockServerConfig = None
+    stats: MockServerStats = None
+    buckets: dict = None
+    buckets_lock: threading.Lock = None
+
+    ERROR_CODES = [
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    ]
+
+    def log_message(self, format, *args):
+        logging.getLogger(__name__).debug(format % args)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def reply(self, status: int, content: bytes = b"", content_type: str = "text/plain", **stats_flags):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+        if not self.path.startswith("/__"):
+            self.stats.record(status, len(content), **stats_flags)
+
+    def handle_request(self, method: str):
+        parts = urlsplit(self.path)
+        if parts.path == "/__stats__":
+            return self.reply(HTTPStatus.OK, json.dumps(self.stats.as_dict()).encode(), "application/json")
+        if parts.path == "/__reset__":
+            self.stats.reset()
+            return self.reply(HTTPStatus.OK)
+
+        host = self.headers.get("X-Replay-Host", "")
+        config = self.config
+
+        delay = config.latency + config.random.uniform(0, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if config.rate_limit:
+            with self.buckets_lock:
+                bucket = self.buckets.setdefault(host, TokenBucket(config.rate_limit, config.burst))
+            if not bucket.take():
+                return self.reply(HTTPStatus.TOO_MANY_REQUESTS, rate_limited=True)
+
+        roll = config.random.random()
+        if roll < config.throttle_rate:
+            return self.reply(HTTPStatus.TOO_MANY_REQUESTS, injected=True)
+        if roll < config.throttle_rate + config.error_rate:
+            return self.reply(config.random.choice(self.ERROR_CODES), injected=True)
+
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = json.loads(self.rfile.read(length))
+
+        key = request_key(method, f"//{host}{parts.path}", dict(parse_qsl(parts.query, keep_blank_values=True)), body)
+        recorded = self.store.lookup(key)
+        if recorded is None:
+            return self.reply(HTTPStatus.NOT_FOUND, missing=True)
+
+        metadata, content = recorded
+        self.reply(metadata["status"], content, metadata["headers"].get("Content-Type") or "application/octet-stream")
+
+
+class MockServer:
+    """
+    Threaded mock server; use as a context manager to run it in the background.
+    """
+    def __init__(self, fixture_dir: str, config: MockServerConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.stats = MockServerStats()
+        handler = type("Handler", (MockRequestHandler,), {
+            "store": ReplayStore(fixture_dir, "replay"),
+            "config": config or MockServerConfig(),
+            "stats": self.stats,
+            "buckets": {},
+            "buckets_lock": threading.Lock(),
+        })
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "MockServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="../../data/replay/")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None)
+    parser.add_argument("--burst", type=int, default=10)
+    args = parser.parse_args()
+
+    config = MockServerConfig(
+        args.latency, args.jitter, args.error_rate, args.throttle_rate, args.rate_limit, args.burst
+    )
+    mock = MockServer(args.fixtures, config, port=args.port)
+    logging.getLogger(__name__).info(f"Serving {args.fixtures} on {mock.url}")
+    mock.server.serve_forever()
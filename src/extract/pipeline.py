@@ -0,0 +1,224 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable
+
+# end-of-stream marker passed between the stages
+DONE = object()
+
+
+class FetchError(Exception):
+    """
+    Raised by a fetch function when the request gave up, with the `APIScraper.last_failure`
+    of the fetching thread (the writer thread can't read it from the scraper).
+    """
+    def __init__(self, failure: dict | None):
+        self.failure = failure or {"status": None, "error": "EmptyResponse"}
+        super().__init__(f"status={self.failure['status']}, error={self.failure['error']}")
+
+
+def failure_of(error: Exception | None) -> dict:
+    """
+    Returns:
+        dict: `{"status", "error"}` ledger fields of an error passed to `Pipeline.failed`
+    """
+    if isinstance(error, FetchError):
+        return error.failure
+    if error is None:
+        return {"status": None, "error": "EmptyResponse"}
+    return {"status": None, "error": type(error).__name__}
+
+
+class RateLimiter:
+    """
+    Spaces request starts at least `interval` seconds apart over all fetch threads.
+    """
+    def __init__(self, interval: float, sleep: Callable[[float], None] = time.sleep):
+        self.interval = interval
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            self.sleep(start - now)
+
+
+class Pipeline:
+    """
+    Runs fetch -> parse -> write as overlapping stages connected by bounded queues:
+        - fetch in `fetch_workers` threads (network bound), paced by a shared `RateLimiter`
+        - parse in a pool of `parse_processes` processes when CPU bound (BeautifulSoup), or
+          inline in a parse thread when 0; `parse` then has to be a module-level function
+        - write in the calling thread, the single writer, in input order if `ordered`
+
+    At most `queue_size` items are in flight between reading the input and writing, so a
+    slow stage holds back the others instead of buffering everything in memory.
+
+    `fetch` may return None or raise for an item, `parse` may return None or raise; the
+    item is then passed to `failed(item, error)` (error is None for empty results) in the
+    writer thread instead of `write(item, parsed)`.
+    """
+    def __init__(
+        self,
+        fetch: Callable,
+        write: Callable,
+        parse: Callable = None,
+        failed: Callable = None,
+        fetch_workers: int = 2,
+        parse_processes: int = 0,
+        queue_size: int = 32,
+        interval: float = 0.0,
+        sleep: Callable[[float], None] = time.sleep,
+        ordered: bool = True,
+    ):
+        self.fetch = fetch
+        self.parse = parse
+        self.write = write
+        self.failed = failed or (lambda item, error: None)
+        self.fetch_workers = fetch_workers
+        self.parse_processes = parse_processes
+        self.queue_size = queue_size
+        self.limiter = RateLimiter(interval, sleep)
+        self.ordered = ordered
+
+        self.log = logging.getLogger(__name__)
+        self.stats_lock = threading.Lock()
+
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self.stats_lock:
+            self.stats[f"{stage}_seconds"] += seconds
+
+
+    def feed(self, items: Iterable, input_queue: queue.Queue, in_flight: threading.Semaphore) -> None:
+        for index, item in enumerate(items):
+            in_flight.acquire()
+            if self.stopped.is_set():
+                break
+            input_queue.put((index, item))
+        for _ in range(self.fetch_workers):
+            input_queue.put(DONE)
+
+
+    def fetch_worker(self, input_queue: queue.Queue, fetched_queue: queue.Queue) -> None:
+        while True:
+            entry = input_queue.get()
+            if entry is DONE:
+                fetched_queue.put(DONE)
+                return
+            index, item = entry
+            self.limiter.wait()
+            start = time.perf_counter()
+            try:
+                raw = self.fetch(item)
+            except Exception as e:
+                raw = e
+            self.add_time("fetch", time.perf_counter() - start)
+            fetched_queue.put((index, item, raw))
+
+
+    def parse_worker(self, fetched_queue: queue.Queue, parsed_queue: queue.Queue, executor) -> None:
+        remaining = self.fetch_workers
+        while remaining:
+            entry = fetched_queue.get()
+            if entry is DONE:
+                remaining -= 1
+                continue
+
+            index, item, raw = entry
+            if raw is None or isinstance(raw, Exception) or self.parse is None:
+                outcome = raw
+            elif executor:
+                outcome = executor.submit(self.parse, raw)
+            else:
+                outcome = Future()
+                start = time.perf_counter()
+                try:
+                    outcome.set_result(self.parse(raw))
+                except Exception as e:
+                    outcome.set_exception(e)
+                self.add_time("parse", time.perf_counter() - start)
+            parsed_queue.put((index, item, outcome))
+        parsed_queue.put(DONE)
+
+
+    def handle(self, item, outcome) -> None:
+        if isinstance(outcome, Future):
+            try:
+                outcome = outcome.result()
+            except Exception as e:
+                outcome = e
+
+        start = time.perf_counter()
+        if outcome is None or isinstance(outcome, Exception):
+            self.stats["failed"] += 1
+            self.failed(item, outcome)
+        else:
+            self.stats["written"] += 1
+            self.write(item, outcome)
+        self.add_time("write", time.perf_counter() - start)
+
+
+    def run(self, items: Iterable) -> dict:
+        """
+        Processes every item in `items` and returns the stage statistics.
+        """
+        self.stats = {"written": 0, "failed": 0, "fetch_seconds": 0.0, "parse_seconds": 0.0, "write_seconds": 0.0}
+        self.stopped = threading.Event()
+        input_queue = queue.Queue(self.queue_size)
+        fetched_queue = queue.Queue(self.queue_size)
+        parsed_queue = queue.Queue(self.queue_size)
+        in_flight = threading.Semaphore(self.queue_size)
+        executor = ProcessPoolExecutor(self.parse_processes) if self.parse_processes > 0 else None
+
+        threads = [threading.Thread(target=self.feed, args=(items, input_queue, in_flight), daemon=True)]
+        threads += [
+            threading.Thread(target=self.fetch_worker, args=(input_queue, fetched_queue), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        threads.append(threading.Thread(target=self.parse_worker, args=(fetched_queue, parsed_queue, executor), daemon=True))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        pending = {}  # index -> outcome, waiting for earlier items when `ordered`
+        next_index = 0
+        try:
+            while True:
+                entry = parsed_queue.get()
+                if entry is DONE:
+                    break
+                index, item, outcome = entry
+                if not self.ordered:
+                    self.handle(item, outcome)
+                    in_flight.release()
+                    continue
+
+                pending[index] = (item, outcome)
+                while next_index in pending:
+                    self.handle(*pending.pop(next_index))
+                    in_flight.release()
+                    next_index += 1
+        finally:
+            # on a writer error the daemon threads are left behind, the feeder stops reading
+            self.stopped.set()
+            in_flight.release()
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+        self.stats["wall_seconds"] = time.perf_counter() - start
+        self.log.info(
+            f"Pipeline finished: {self.stats['written']} written, {self.stats['failed']} failed in "
+            + f"{self.stats['wall_seconds']:.1f}s (fetch {self.stats['fetch_seconds']:.1f}s, "
+            + f"parse {self.stats['parse_seconds']:.1f}s, write {self.stats['write_seconds']:.1f}s)"
+        )
+        return self.stats
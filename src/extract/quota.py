@@ -0,0 +1,136 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+QUOTA_DB = "../../data/cache/quota.db"
+
+# Steam's appdetails limits: 200 requests per 5 minutes, 100k per day
+APPDETAILS_WINDOWS = ((5 * 60, 200), (24 * 60 * 60, 100000))
+
+
+class QuotaLedger:
+    """
+    Rolling-window request quota shared by every process using the same endpoint and key.
+
+    Each request is a row in a small SQLite database, so shards, retry passes and restarts
+    all see the same windows. `acquire` blocks until a request fits in every window and
+    spaces requests evenly, so the budget is spent at the rate it refills instead of in
+    bursts that end in 429s.
+    """
+    def __init__(self, endpoint: str, key: str = "", windows=APPDETAILS_WINDOWS, db_path: str = QUOTA_DB):
+        """
+        Args:
+            endpoint (str): name of the rate-limited endpoint
+            key (str): API key the limits apply to, only a hash of it is stored
+            windows (tuple): (window length in seconds, max requests) pairs
+            db_path (str): ledger database, shared between processes
+        """
+        self.scope = f"{endpoint}|{hashlib.sha1(key.encode()).hexdigest()[:12]}"
+        self.windows = sorted(windows)
+        self.db_path = db_path
+        # tightest sustained rate over all windows
+        self.min_interval = max(length / limit for length, limit in self.windows)
+        self.conn = None
+
+
+    def connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS requests (scope TEXT NOT NULL, time REAL NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ix_requests_scope_time ON requests (scope, time)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS blocks (scope TEXT PRIMARY KEY, until REAL NOT NULL)")
+        return self.conn
+
+
+    def wait_time(self, conn: sqlite3.Connection, now: float) -> float:
+        """
+        Seconds until the next request fits, 0.0 if it can be sent now.
+        """
+        wait = 0.0
+        row = conn.execute("SELECT until FROM blocks WHERE scope = ?", (self.scope,)).fetchone()
+        if row:
+            wait = max(wait, row[0] - now)
+
+        last = conn.execute("SELECT MAX(time) FROM requests WHERE scope = ?", (self.scope,)).fetchone()[0]
+        if last is not None:
+            wait = max(wait, last + self.min_interval - now)
+
+        for length, limit in self.windows:
+            # the window reopens when its `limit`-th most recent request falls out of it
+            row = conn.execute(
+                "SELECT time FROM requests WHERE scope = ? AND time > ? ORDER BY time DESC LIMIT 1 OFFSET ?",
+                (self.scope, now - length, limit - 1),
+            ).fetchone()
+            if row:
+                wait = max(wait, row[0] + length - now)
+        return wait
+
+
+    def acquire(self, sleep=time.sleep) -> float:
+        """
+        Blocks until a request is allowed and records it.
+
+        Args:
+            sleep (callable): used to wait, e.g. `APIScraper.sleep` to account for it in the metrics
+
+        Returns:
+            float: seconds spent waiting
+        """
+        conn = self.connect()
+        waited = 0.0
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                wait = self.wait_time(conn, now)
+                if wait <= 0:
+                    conn.execute("INSERT INTO requests (scope, time) VALUES (?, ?)", (self.scope, now))
+                    conn.execute(
+                        "DELETE FROM requests WHERE scope = ? AND time < ?",
+                        (self.scope, now - self.windows[-1][0]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if wait <= 0:
+                return waited
+            sleep(wait)
+            waited += wait
+
+
+    def block(self, seconds: float) -> None:
+        """
+        Pauses every process using this quota for `seconds`, e.g. after an unexpected 429.
+        """
+        conn = self.connect()
+        conn.execute(
+            "INSERT INTO blocks (scope, until) VALUES (?, ?) "
+            + "ON CONFLICT (scope) DO UPDATE SET until = MAX(until, excluded.until)",
+            (self.scope, time.time() + seconds),
+        )
+
+
+    def usage(self) -> dict:
+        """
+        Returns:
+            dict: window length (s) -> requests made in the current window
+        """
+        conn = self.connect()
+        now = time.time()
+        return {
+            length: conn.execute(
+                "SELECT COUNT(*) FROM requests WHERE scope = ? AND time > ?", (self.scope, now - length)
+            ).fetchone()[0]
+            for length, _ in self.windows
+        }
+
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
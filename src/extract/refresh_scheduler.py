@@ -0,0 +1,171 @@
+"""
+Decides which apps each scraper should refresh today, based on how popular they are.
+
+Every app gets a tier from data already scraped (total reviews from the review summaries,
+recent peak CCU from steamcharts, Gamalytic revenue), and each tier has a refresh period.
+An app is due when `(day + crc32(appid)) % period == 0`, which spreads each tier evenly over
+its period without keeping any state between runs.
+
+The work lists are written in the format of the id files they are derived from, so a scraper
+only needs to be pointed at them with `use_work_list`, which also names its shards and failure
+ledgers after the work list instead of overwriting the full-catalog ones, e.g. (from `src/extract`):
+    python refresh_scheduler.py --date 2024-11-02
+    scraper.use_work_list("../../data/work/gamalytic_2024-11-02.txt")  # data_gamalytic_2024-11-02_{start}_{end}.jsonl
+or through the work queue:
+    python work_queue.py enqueue gamalytic --id-file ../../data/work/gamalytic_2024-11-02.txt
+"""
+import argparse
+import json
+import logging
+import os
+import zlib
+from datetime import date, datetime
+
+from tab_lines import tab_key, tab_value
+
+RAW_DIR = "../../data/raw/"
+WORK_DIR = "../../data/work/"
+
+# an app is in the first tier for which it reaches any of the thresholds
+TIERS = (
+    ("hot", {"reviews": 20000, "ccu": 1000, "revenue": 10_000_000}),
+    ("warm", {"reviews": 500, "ccu": 50, "revenue": 200_000}),
+)
+COLD = "cold"
+NEW = "new"  # games without any signal yet, e.g. newly listed
+
+# refresh period in days per tier
+TIER_DAYS = {NEW: 1, "hot": 1, "warm": 7, COLD: 30}
+
+CCU_WINDOW = 30 * 24 * 60 * 60 * 1000  # ms, recent peak window of the CCU history
+
+# stage -> id files (relative to RAW_DIR) the work list is taken from
+STAGES = {
+    "gamalytic": ["steam_ids/game_ids.txt"],
+    "review_stats": ["steam_ids/game_ids.txt"],
+    "review_histories": ["steam_ids/game_ids.txt"],
+    "appdetails": ["steam_ids/game_ids.txt", "steam_ids/dlc_ids.txt"],
+    "getitems": ["steam_ids/game_ids.txt", "steam_ids/dlc_ids.txt"],
+    "steam_charts": ["steam_charts/chart_ids.txt"],
+}
+
+
+def iter_jsonl(folder: str, prefix: str):
+    if not os.path.isdir(folder):
+        return
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.startswith(prefix) and file_name.endswith(".jsonl"):
+            with open(os.path.join(folder, file_name), mode="r") as f:
+                for line in f:
+                    if line.strip():
+                        yield line
+
+
+class RefreshScheduler:
+    def __init__(self, raw_dir: str = RAW_DIR, work_dir: str = WORK_DIR):
+        self.raw_dir = raw_dir
+        self.work_dir = work_dir
+        self.log = logging.getLogger(__name__)
+
+
+    def read_signals(self) -> dict:
+        """
+        Returns:
+            dict: appid -> {"reviews", "ccu", "revenue"} (only the signals found), keeping the
+                maximum when an app appears in several files
+        """
+        signals = {}
+
+        def update(app_id: int, name: str, value) -> None:
+            if value is not None:
+                app_signals = signals.setdefault(app_id, {})
+                app_signals[name] = max(value, app_signals.get(name, value))
+
+        for line in iter_jsonl(os.path.join(self.raw_dir, "steam_apps"), "review_summary_all_"):
+            data = json.loads(line)
+            if "id" in data:
+                update(data["id"], "reviews", data.get("query_summary", {}).get("total_reviews"))
+
+        for line in iter_jsonl(os.path.join(self.raw_dir, "steam_charts"), "ccu_history_"):
+            points = tab_value(line)
+            if points:
+                last_time = points[-1][0]
+                update(tab_key(line), "ccu", max(p[1] or 0 for p in points if p[0] >= last_time - CCU_WINDOW))
+
+        for line in iter_jsonl(os.path.join(self.raw_dir, "gamalytic"), "data_"):
+            data = json.loads(line)
+            if "steamId" in data:
+                update(int(data["steamId"]), "revenue", data.get("revenue"))
+
+        self.log.info(f"Read popularity signals for {len(signals)} apps")
+        return signals
+
+
+    @staticmethod
+    def tier_of(app_signals: dict | None, is_game: bool = True) -> str:
+        if not app_signals:
+            return NEW if is_game else COLD
+        for tier, thresholds in TIERS:
+            if any(app_signals.get(name, 0) >= threshold for name, threshold in thresholds.items()):
+                return tier
+        return COLD
+
+
+    @staticmethod
+    def is_due(app_id: int, tier: str, day: date) -> bool:
+        period = TIER_DAYS[tier]
+        return (day.toordinal() + zlib.crc32(str(app_id).encode())) % period == 0
+
+
+    def read_ids(self, id_file: str) -> list[tuple[int, str]]:
+        """
+        Returns:
+            list: (appid, original line) for every id in `id_file`
+        """
+        ids = []
+        with open(os.path.join(self.raw_dir, id_file), mode="r") as f:
+            for line in f:
+                if line.strip():
+                    ids.append((int(line.split("\t")[0]), line))
+        return ids
+
+
+    def schedule(self, day: date = None, stages: list[str] = None) -> dict:
+        """
+        Writes `{work_dir}/{stage}_{day}.txt` for every stage.
+
+        Returns:
+            dict: stage -> {tier: number of due apps}
+        """
+        day = day or date.today()
+        signals = self.read_signals()
+        os.makedirs(self.work_dir, exist_ok=True)
+
+        summary = {}
+        for stage in stages or STAGES:
+            counts = {tier: 0 for tier in TIER_DAYS}
+            work_file = os.path.join(self.work_dir, f"{stage}_{day.isoformat()}.txt")
+            with open(work_file, mode="w") as f:
+                for id_file in STAGES[stage]:
+                    is_game = not id_file.endswith("dlc_ids.txt")
+                    for app_id, line in self.read_ids(id_file):
+                        tier = self.tier_of(signals.get(app_id), is_game)
+                        if self.is_due(app_id, tier, day):
+                            counts[tier] += 1
+                            f.write(line if line.endswith("\n") else line + "\n")
+
+            summary[stage] = counts
+            self.log.info(f"{stage}: {sum(counts.values())} apps due ({counts}) -> {work_file}")
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--date", default=None, help="YYYY-MM-DD, defaults to today")
+    parser.add_argument("--stages", nargs="*", default=list(STAGES), choices=list(STAGES))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    day = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else date.today()
+    RefreshScheduler().schedule(day, args.stages)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from requests import Response
+
+# query parameters that carry credentials: left out of keys and fixtures, so recordings
+# replay under any key and can be shared without leaking it
+CREDENTIAL_PARAMS = {"key", "api_key", "access_token"}
+
+
+def public_params(params: dict = None) -> dict:
+    return {k: v for k, v in (params or {}).items() if k not in CREDENTIAL_PARAMS}
+
+
+def request_key(method: str, url: str, params: dict = None, body: dict = None) -> str:
+    """
+    Identifies a request independently of scheme, header values, credentials and parameter
+    order, so the scraper and the mock server compute the same key for the same request.
+    """
+    parts = urlsplit(url)
+    normalized = {
+        "method": method.upper(),
+        "url": f"{parts.netloc}{parts.path}",
+        # requests drops None-valued params, so they are not part of the key either
+        "params": sorted((str(k), str(v)) for k, v in public_params(params).items() if v is not None),
+        "body": body,
+    }
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class ReplayStore:
+    """
+    Directory of recorded HTTP responses, one `{key}.json` (metadata) and one
+    `{key}.body` (raw content) per request.
+
+    Used by `APIScraper` to record live traffic or to answer requests offline, and by
+    `mock_server.py` to serve the same fixtures over HTTP.
+    """
+    def __init__(self, directory: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.directory = directory
+        self.mode = mode
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    @classmethod
+    def from_env(cls) -> "ReplayStore | None":
+        """
+        Configured with `SCRAPER_REPLAY_MODE` ("record", "replay" or unset) and
+        `SCRAPER_REPLAY_DIR` (default `../../data/replay/`).
+        """
+        mode = os.getenv("SCRAPER_REPLAY_MODE")
+        if not mode:
+            return None
+        return cls(os.getenv("SCRAPER_REPLAY_DIR", "../../data/replay/"), mode)
+
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+
+    def save(self, method: str, url: str, params: dict, body: dict, response: Response) -> None:
+        key = request_key(method, url, params, body)
+        metadata = {
+            "method": method.upper(),
+            "url": url,
+            "params": public_params(params),
+            "body": body,
+            "status": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+        }
+        with open(self.path(key) + ".body", mode="wb") as f:
+            f.write(response.content)
+        with open(self.path(key) + ".json", mode="w") as f:
+            json.dump(metadata, f, indent=2)
+
+
+    def lookup(self, key: str) -> tuple[dict, bytes] | None:
+        """
+        Returns:
+            dict: recorded metadata
+            bytes: recorded body
+            (or None if the request was never recorded)
+        """
+        if not os.path.exists(self.path(key) + ".json"):
+            return None
+        with open(self.path(key) + ".json", mode="r") as f:
+            metadata = json.load(f)
+        with open(self.path(key) + ".body", mode="rb") as f:
+            content = f.read()
+        return metadata, content
+
+
+    def load(self, method: str, url: str, params: dict = None, body: dict = None) -> Response:
+        """
+        Builds a `requests.Response` from the recording. Unrecorded requests get a 404,
+        which the scrapers already handle as a failed request.
+        """
+        recorded = self.lookup(request_key(method, url, params, body))
+        from requests import Response
+        from requests.structures import CaseInsensitiveDict
+
+        response = Response()
+        response.url = url
+        response.encoding = "utf-8"
+        if recorded is None:
+            response.status_code = 404
+            response._content = b""
+            response.reason = "Not recorded"
+            return response
+
+        metadata, content = recorded
+        response.status_code = metadata["status"]
+        response.reason = "Replayed"
+        response.headers = CaseInsensitiveDict(metadata["headers"])
+        response._content = content
+        return response
@@ -0,0 +1,247 @@
+"""
+Keeps the history of repeated scrapes of a source as field-level diffs.
+
+The first scrape of an app is stored in full, and every later scrape only stores the
+fields that changed since the previous one. A full copy (keyframe) is stored again every
+`keyframe_interval` changes, so rebuilding a record "as of" any date never replays more
+than that many diffs. Scrapes without any change store nothing.
+
+Diffs are `{"set": [[path, value], ...], "unset": [path, ...]}`, `path` being the list of
+keys down to the changed value; nested objects are diffed key by key, lists are compared as
+a whole.
+
+From `src/extract`, after a refresh (ideally of the `compaction.py` output, which has one
+record per app):
+    python snapshots.py appdetails --date 2024-11-02
+    python snapshots.py getitems --date 2024-11-02 --dir ../../data/compacted/
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+from datetime import date
+
+from compaction import SOURCES, appdetails_key
+from tab_lines import tab_key, tab_value
+
+SNAPSHOT_DIR = "../../data/snapshots/"
+RAW_DIR = "../../data/raw/"
+
+# marks a missing key in `diff`, `None` being a valid JSON value
+MISSING = object()
+
+
+def diff(old, new, path: tuple = ()) -> dict:
+    """
+    Returns:
+        dict: `{"set", "unset"}` changes turning `old` into `new`
+    """
+    changes = {"set": [], "unset": []}
+
+    def walk(old, new, path):
+        if isinstance(old, dict) and isinstance(new, dict):
+            for key, value in new.items():
+                walk(old.get(key, MISSING), value, path + (key,))
+            for key in old.keys() - new.keys():
+                changes["unset"].append(list(path + (key,)))
+        elif old is MISSING or old != new:
+            changes["set"].append([list(path), new])
+
+    walk(old, new, path)
+    return changes
+
+
+def apply(record, changes: dict):
+    """
+    Returns:
+        a copy of `record` with the `diff` changes applied
+    """
+    record = json.loads(json.dumps(record))
+    for path, value in changes["set"]:
+        if not path:
+            record = value
+            continue
+        parent = record
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        parent[path[-1]] = value
+    for path in changes["unset"]:
+        parent = record
+        for key in path[:-1]:
+            parent = parent[key]
+        del parent[path[-1]]
+    return record
+
+
+def touches(changes: dict, prefix: list) -> bool:
+    paths = [path for path, _ in changes["set"]] + changes["unset"]
+    # a change of a parent (e.g. the whole record) also changes the fields under it
+    return any(path[: len(prefix)] == prefix or prefix[: len(path)] == path for path in paths)
+
+
+class SnapshotStore:
+    def __init__(self, db_path: str, keyframe_interval: int = 8):
+        """
+        Args:
+            db_path (str): SQLite file of one source, e.g. `../../data/snapshots/appdetails.db`
+            keyframe_interval (int): diffs between two full copies of a record
+        """
+        self.keyframe_interval = keyframe_interval
+        self.log = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        # `full` is set on keyframes, `delta` on every version but the first
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                appid INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                full TEXT,
+                delta TEXT,
+                PRIMARY KEY (appid, day)
+            );
+        """)
+
+
+    def versions(self, app_id: int, day: str = None):
+        """
+        Yields the (day, full, delta) rows of `app_id` up to `day`, from its last keyframe on.
+        """
+        day = day or "9999-12-31"
+        keyframe = self.conn.execute(
+            "SELECT MAX(day) FROM snapshots WHERE appid = ? AND day <= ? AND full IS NOT NULL", (app_id, day)
+        ).fetchone()[0]
+        if keyframe is None:
+            return
+        yield from self.conn.execute(
+            "SELECT day, full, delta FROM snapshots WHERE appid = ? AND day >= ? AND day <= ? ORDER BY day",
+            (app_id, keyframe, day),
+        )
+
+
+    def as_of(self, app_id: int, day: str | date = None):
+        """
+        Returns:
+            the record of `app_id` as last scraped on or before `day` (default: latest),
+            None if it wasn't scraped yet
+        """
+        day = day.isoformat() if isinstance(day, date) else day
+        record, found = None, False
+        for _, full, delta in self.versions(app_id, day):
+            if full is not None:
+                record, found = json.loads(full), True
+            else:
+                record = apply(record, json.loads(delta))
+        return record if found else None
+
+
+    def put(self, app_id: int, day: str | date, record) -> str:
+        """
+        Stores the scrape of `app_id` on `day`. Scraping an app twice on the same day keeps the
+        later record; days before the latest stored one are ignored.
+
+        Returns:
+            str: "full", "delta", "unchanged" or "ignored"
+        """
+        day = day.isoformat() if isinstance(day, date) else day
+        latest = self.conn.execute("SELECT MAX(day) FROM snapshots WHERE appid = ?", (app_id,)).fetchone()[0]
+        if latest is not None and day < latest:
+            return "ignored"
+        if latest == day:
+            self.conn.execute("DELETE FROM snapshots WHERE appid = ? AND day = ?", (app_id, day))
+
+        rows = list(self.versions(app_id))
+        if not rows:
+            self.conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, NULL)", (app_id, day, json.dumps(record)))
+            return "full"
+
+        previous = self.as_of(app_id)
+        changes = diff(previous, record)
+        if not changes["set"] and not changes["unset"]:
+            return "unchanged"
+
+        # `rows` is the last keyframe and the diffs stored since
+        full = json.dumps(record) if len(rows) > self.keyframe_interval else None
+        self.conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?)", (app_id, day, full, json.dumps(changes)))
+        return "delta" if full is None else "full"
+
+
+    def changes(self, app_id: int, path: list = None) -> list[tuple[str, dict]]:
+        """
+        Returns:
+            list: (day, changes) of every scrape that changed `path` (e.g.
+                `["data", "price_overview"]`) or anything under it, all changes if None
+        """
+        return [
+            (day, json.loads(delta))
+            for day, delta in self.conn.execute(
+                "SELECT day, delta FROM snapshots WHERE appid = ? AND delta IS NOT NULL ORDER BY day", (app_id,)
+            )
+            if path is None or touches(json.loads(delta), path)
+        ]
+
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
+
+
+def parse_record(line: str, key) -> tuple[int, object]:
+    """
+    Returns:
+        int: appid of a raw `line`
+        the record stored for it (`data` of appdetails lines, the points of CCU histories)
+    """
+    app_id = key(line)
+    if key is tab_key:
+        return app_id, tab_value(line)
+    record = json.loads(line)
+    if key is appdetails_key:
+        return app_id, record[str(app_id)]
+    return app_id, record
+
+
+def ingest(store: SnapshotStore, source: str, day: str | date, source_dir: str = RAW_DIR) -> dict:
+    """
+    Stores every record of the `source` shards in `source_dir` as scraped on `day`.
+
+    Returns:
+        dict: number of records per `SnapshotStore.put` outcome
+    """
+    folder, prefix, key = SOURCES[source]
+    folder_path = os.path.join(source_dir, folder)
+    counts = {"full": 0, "delta": 0, "unchanged": 0, "ignored": 0}
+    for file_name in sorted(os.listdir(folder_path)):
+        if not (file_name.startswith(prefix) and file_name.endswith(".jsonl")):
+            continue
+        with open(os.path.join(folder_path, file_name), mode="r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                app_id, record = parse_record(line, key)
+                if app_id is not None:
+                    counts[store.put(app_id, day, record)] += 1
+        store.commit()
+
+    store.log.info(f"{source} on {day}: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", choices=list(SOURCES))
+    parser.add_argument("--date", default=None, help="YYYY-MM-DD the shards were scraped, defaults to today")
+    parser.add_argument("--dir", default=RAW_DIR, help="folder of the source folders")
+    parser.add_argument("--keyframe-interval", type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    store = SnapshotStore(os.path.join(SNAPSHOT_DIR, f"{args.source}.db"), args.keyframe_interval)
+    ingest(store, args.source, args.date or date.today().isoformat(), args.dir)
+    store.close()
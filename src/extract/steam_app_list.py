@@ -1,7 +1,10 @@
 import logging
-import time
 from api_scraper import APIScraper
+from app_cache import AppClassificationCache, APP_CACHE_DB
+from steam_getitems import GETITEMS_DATA_REQUEST, get_store_items
+from batching import AdaptiveBatcher
 import json
+import time
 
 class SteamAppList(APIScraper):
     """
@@ -22,6 +25,8 @@ class SteamAppList(APIScraper):
         self.item_URL = "https://api.steampowered.com/IStoreBrowseService/GetItems/v1"
         self.game_id_file = "../../data/raw/steam_ids/game_ids.txt"
         self.dlc_id_file =  "../../data/raw/steam_ids/dlc_ids.txt"
+        self.app_cache_file = APP_CACHE_DB
+        self.items_data_file = "../../data/raw/steam_apps/getitems"
 
         self.query = {"key": self.STEAM_API_KEY}
         self.filter_query = {
@@ -34,6 +39,7 @@ class SteamAppList(APIScraper):
         }
 
         self.REQUEST_INTERVAL_TIME = 1.0
+        self.ITEMS_REQUEST_INTERVAL_TIME = 2.0  # same pacing as `SteamGetItemsScraper`
 
 
     def get_app_list(self) -> None:
@@ -75,7 +81,7 @@ class SteamAppList(APIScraper):
                 self.log.warning(f"Item ID {item["appid"]} (name={name}) is not visible")
                 continue
             
-            if "type" not in item:
+            if item.get("type") is None:
                 self.log.warning(f"Visible app {item["appid"]} (name={name}) does not have `type` field")
                 continue
             
@@ -87,7 +93,37 @@ class SteamAppList(APIScraper):
                 self.log.debug(f"Filtered out {item["appid"]} (name={name})")
 
 
-    def filter_app_list(self, batch_size: int = 100) -> None:
+    def read_raw_ids(self) -> list:
+        app_ids = []
+        with open(self.raw_id_file, "r") as f:
+            for app in f:
+                data = app.split("\t")
+                app_ids.append((int(data[0]), data[1].strip()))
+        self.log.info(f"Finished reading {len(app_ids)} app IDs from {self.raw_id_file}")
+        return app_ids
+
+
+    def write_id_files(self, app_ids: list, cache: AppClassificationCache) -> None:
+        """
+        Classifies every id in raw file order from `cache`, in which every id has to have an
+        entry, and writes `self.game_id_file` and `self.dlc_id_file`.
+        """
+        classified = cache.load()
+        names = {app[0]: (app[1] if len(app) == 2 else "") for app in app_ids}
+        game_ids, dlc_ids = [], []
+        self.process_batch([classified[app[0]] for app in app_ids], names, game_ids, dlc_ids)
+
+        self.log.info(f"Processed all apps: #Games={len(game_ids)}, #DLC={len(dlc_ids)}")
+        with open(self.game_id_file, mode="w") as f:
+            for app in game_ids:
+                f.write(f"{app[0]}\t{app[1]}\n")
+
+        with open(self.dlc_id_file, mode="w") as f:
+            for app in dlc_ids:
+                f.write(f"{app[0]}\t{app[1]}\n")
+
+
+    def filter_app_list(self, batch_size: int = 100, use_cache: bool = True) -> None:
         """
         Using IDs from `self.raw_id_file`, filter games (type=0) and DLC (type=4) items and record
         them into `self.game_id_file` and `self.dlc_id_file`.
@@ -97,50 +133,102 @@ class SteamAppList(APIScraper):
 
         This API endpoint requires a single query parameter, `input_json`.
 
+        Classifications are cached in `self.app_cache_file` (see `app_cache.py`), so only
+        new ids and ids whose cache entry is stale are requested.
+
         Args:
-            batch_size (int): number of app ids per request
+            batch_size (int): initial number of app ids per request, if no tuned size is saved
+            use_cache (bool): if False, every id is requested again (the cache is still updated)
         """
         self.log.info("Beginning filtering process")
-        app_ids = []
-        with open(self.raw_id_file, "r") as f:
-            for app in f:
-                data = app.split("\t")
-                app_ids.append((int(data[0]), data[1].strip()))
-        self.log.info(f"Finished reading {len(app_ids)} app IDs from {self.raw_id_file}")
+        app_ids = self.read_raw_ids()
+
+        cache = AppClassificationCache(self.app_cache_file)
+        now = time.time()
+        classified = cache.load()
+        to_query = list({
+            app[0]: app for app in app_ids
+            if not use_cache or app[0] not in classified or cache.is_stale(classified[app[0]], now)
+        }.values())
+        self.log.info(f"{len(app_ids) - len(to_query)} app IDs classified from cache, {len(to_query)} to request")
+
+        batcher = AdaptiveBatcher("filter_app_list", initial=batch_size)
+        batches = batcher.run(
+            [app[0] for app in to_query],
+            lambda app_ids: get_store_items(self, self.item_URL, self.filter_query, app_ids),
+        )
+        processed = 0
+        for store_items, given_up in batches:
+            # ids given up on are cached as hidden, so they are retried once that goes stale
+            cache.update([item["appid"] for item in store_items] + given_up, store_items)
+            processed += len(store_items) + len(given_up)
+            self.log.info(f"Processed {processed}/{len(to_query)} apps (batch size {batcher.size})")
+            self.sleep(self.REQUEST_INTERVAL_TIME)
 
-        total_apps = len(app_ids)
-        game_ids, dlc_ids = [], []
+        self.write_id_files(app_ids, cache)
+        cache.close()
+
+
+    def filter_and_get_items(self, batch_size: int = 50, shard_size: int = 10000) -> None:
+        """
+        Fused version of `filter_app_list` and `SteamGetItemsScraper.get_getitems`: the filter
+        requests ask for the full GetItems `data_request`, so the same responses classify the ids
+        and provide the getitems records, halving the requests of this stage.
 
-        for i in range(0, total_apps, batch_size):
-            if i % 1000 == 0:
-                self.log.info(f"Processed {i} apps")
+        Only ids that can be games/DLC are requested, i.e. ids the classification cache
+        doesn't know or has as game/DLC; fresh non-game entries (soundtracks, demos...) are skipped.
+        Visible games/DLC are written to `{self.items_data_file}_{start}_{end}.jsonl` shards of
+        `shard_size` records, `start`/`end` being record indices as in `get_getitems`.
 
-            batch = app_ids[i : i + batch_size]
-            self.filter_query["ids"] = [{"appid": app[0]} for app in batch]
-            names_batch = {app[0]: (app[1] if len(app) == 2 else "") for app in batch}
+        Args:
+            batch_size (int): initial number of app ids per request, if no tuned size is saved
+            shard_size (int): number of records per getitems shard
+        """
+        self.log.info("Beginning fused filtering and GetItems retrieval")
+        app_ids = self.read_raw_ids()
+
+        cache = AppClassificationCache(self.app_cache_file)
+        now = time.time()
+        classified = cache.load()
+        to_query = list({
+            app[0]: app for app in app_ids
+            if app[0] not in classified
+            or cache.is_stale(classified[app[0]], now)
+            or (classified[app[0]]["visible"] and classified[app[0]]["type"] in (0, 4))
+        }.values())
+        self.log.info(f"{len(app_ids) - len(to_query)} app IDs skipped as cached non-games, {len(to_query)} to request")
+
+        query = {**self.filter_query, "data_request": GETITEMS_DATA_REQUEST}
+        batcher = AdaptiveBatcher("getitems", initial=batch_size)
+        batches = batcher.run(
+            [app[0] for app in to_query],
+            lambda app_ids: get_store_items(self, self.item_URL, query, app_ids),
+        )
+        shard, shard_start, processed = [], 0, 0
+        for store_items, given_up in batches:
+            cache.update([item["appid"] for item in store_items] + given_up, store_items)
+            processed += len(store_items) + len(given_up)
+            self.log.info(f"Processed {processed}/{len(to_query)} apps (batch size {batcher.size})")
 
-            response = self.get_request(self.item_URL, 3, params={"input_json": json.dumps(self.filter_query)})
-            self.log.debug(f"Successfully retrieved data from {response.url}")
-            store_items = response.json().get("response", {}).get("store_items", [])
+            shard.extend(item for item in store_items if item.get("visible") and item.get("type") in (0, 4))
+            if len(shard) >= shard_size:
+                self.write_items_shard(shard[:shard_size], shard_start)
+                shard, shard_start = shard[shard_size:], shard_start + shard_size
 
-            if len(store_items) != len(batch):
-                self.log.warning(
-                    f"Number of apps retrieved ({len(store_items)}) does "
-                    + f"not match number requested ({len(batch)}) "
-                    + f"in range {i}, {i+batch_size}"
-                )
+            self.sleep(self.ITEMS_REQUEST_INTERVAL_TIME)
 
-            self.process_batch(store_items, names_batch, game_ids, dlc_ids)
-            time.sleep(self.REQUEST_INTERVAL_TIME)
-        
-        self.log.info(f"Processed all apps: #Games={len(game_ids)}, #DLC={len(dlc_ids)}")
-        with open(self.game_id_file, mode="w") as f:
-            for app in game_ids:
-                f.write(f"{app[0]}\t{app[1]}\n")
+        if shard:
+            self.write_items_shard(shard, shard_start)
+        self.write_id_files(app_ids, cache)
+        cache.close()
 
-        with open(self.dlc_id_file, mode="w") as f:
-            for app in dlc_ids:
-                f.write(f"{app[0]}\t{app[1]}\n")
+
+    def write_items_shard(self, items: list, start: int) -> None:
+        file_name = f"{self.items_data_file}_{start}_{start + len(items) - 1}.jsonl"
+        self.log.info(f"Saving {len(items)} GetItems records to {file_name}")
+        with open(file_name, mode="w") as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
 
 
 if __name__ == "__main__":
@@ -159,7 +247,12 @@ if __name__ == "__main__":
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
 
+    FUSED = False  # also writes the getitems shards, instead of running steam_getitems.py afterwards
+
     steamapp_scraper = SteamAppList()
     # steamapp_scraper.get_app_list()
-    steamapp_scraper.filter_app_list()
+    if FUSED:
+        steamapp_scraper.filter_and_get_items()
+    else:
+        steamapp_scraper.filter_app_list()
 
@@ -1,7 +1,7 @@
 import logging
-import time
 from api_scraper import APIScraper
-import json
+from ledger import UNSUCCESSFUL
+from quota import QuotaLedger, APPDETAILS_WINDOWS
 
 class SteamAppDetailsScraper(APIScraper):
     def __init__(self):
@@ -9,7 +9,10 @@ class SteamAppDetailsScraper(APIScraper):
         self.id_folder = "../../data/raw/steam_ids/"
         self.id_files = ["game_ids.txt", "dlc_ids.txt"]
         self.data_file = "../../data/raw/steam_apps/appdetails"
-        self.REQUEST_INTERVAL_TIME = 1.5 # rate limited by 200 req / 5 min (max 100k per day)
+        # rate limited by 200 req / 5 min (max 100k per day), shared by every shard and
+        # retry pass through the quota ledger instead of a fixed sleep per process
+        self.REQUEST_INTERVAL_TIME = 0.0
+        self.quota = QuotaLedger("appdetails", self.STEAM_API_KEY, APPDETAILS_WINDOWS)
 
         self.log = logging.getLogger(__name__)
 
@@ -18,6 +21,8 @@ class SteamAppDetailsScraper(APIScraper):
         """
         Fetches the JSON from the appdetails API. Note that
         the API does not accept multiple app_ids anymore.
+
+        `{"<appid>": {"success": false}}` counts as a failure with the `UNSUCCESSFUL` error.
         """
         query = {
             "cc": "US",
@@ -34,10 +39,19 @@ class SteamAppDetailsScraper(APIScraper):
         try:
             result = response.json()
         except Exception as e:
+            self.last_failure = {"status": response.status_code, "error": type(e).__name__}
             self.log.exception(f"Weird JSON with response for ID {app_id}. Response text: {response.text} Skipping...: {e}")
 
+        if isinstance(result, dict) and not all(entry.get("success") for entry in result.values()):
+            self.last_failure = {"status": response.status_code, "error": UNSUCCESSFUL}
+            self.log.warning(f"Unsuccessful appdetails response for {app_id}")
+            return None
         return result
 
+
+    def fetch_id(self, app_id: int) -> dict | None:
+        return self.fetch_app(app_id)
+
     
     def get_appdetails(self, start=0, limit=10000) -> None:
         """
@@ -55,7 +69,8 @@ class SteamAppDetailsScraper(APIScraper):
         app_ids_names = app_ids_names[start : start + limit]
 
         end = start + len(app_ids_names) - 1
-        output_file_name = f"{self.data_file}_{start}_{end}.jsonl"
+        output_file_name = f"{self.data_file}_{self.shard(start, end)}.jsonl"
+        ledger = self.ledger(start, end, reset=True)
 
         self.log.info(
             "Beginning retrieval of /appdetail/ "\
@@ -73,10 +88,11 @@ class SteamAppDetailsScraper(APIScraper):
                 
                 if not app_details:
                     self.log.warning(f"No data returned for app_id: {app_id} (name={name})")
+                    self.record_failure(ledger, app_id, self.BASE_URL)
                     continue
                 
-                output_file.write(json.dumps(app_details, ensure_ascii=False) + "\n")
-                time.sleep(self.REQUEST_INTERVAL_TIME)
+                output_file.write(self.format_line(app_id, app_details))
+                self.sleep(self.REQUEST_INTERVAL_TIME)
 
         self.log.info(f"Finished scraping app details for {len(app_ids_names)} apps")
 
@@ -85,6 +101,7 @@ class SteamAppDetailsScraper(APIScraper):
 if __name__ == "__main__":
     START = 130000
     LIMIT = 40000
+    RETRY = False  # only re-fetch the IDs in the failure ledgers
     fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
 
     file_handler = logging.FileHandler(
@@ -103,4 +120,7 @@ if __name__ == "__main__":
     logger.addHandler(console_handler)
 
     steam_scraper = SteamAppDetailsScraper()
-    steam_scraper.get_appdetails(start=START, limit=LIMIT)
+    if RETRY:
+        steam_scraper.retry_failed()
+    else:
+        steam_scraper.get_appdetails(start=START, limit=LIMIT)
@@ -1,7 +1,12 @@
+import json
 import logging
 from api_scraper import APIScraper
-import time
-from bs4 import BeautifulSoup
+from pipeline import Pipeline, failure_of
+
+
+def parse_ccu_history(content: bytes) -> list | None:
+    return json.loads(content) or None
+
 
 class SteamPlayerCharts(APIScraper):
     """
@@ -42,6 +47,7 @@ class SteamPlayerCharts(APIScraper):
             self.log.warning(f"Failed to retrieve data. We are likely at the last page on page #{pagenum}.")
             return []
 
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(response.content, 'html.parser')
         table = soup.find("tbody")
 
@@ -84,7 +90,7 @@ class SteamPlayerCharts(APIScraper):
             steam_ids.extend(ids_from_page)
             page_num += 1
 
-            time.sleep(self.REQUEST_INTERVAL_TIME * 2)
+            self.sleep(self.REQUEST_INTERVAL_TIME * 2)
         
         self.log.info(f"Scraping finished. Writing {len(steam_ids)} Steam IDs to file.")
         with open(self.id_file, mode="w") as f:
@@ -105,12 +111,38 @@ class SteamPlayerCharts(APIScraper):
         """
         url = f"{self.BASE_URL}app/{id}/{self.end_path}"
         response = self.get_request(url, 1, headers=self.headers, exit_on_fail=False)
-        return response.json() if response else None
+        if not response:
+            return None
+
+        try:
+            return response.json()
+        except Exception as e:
+            self.last_failure = {"status": response.status_code, "error": type(e).__name__}
+            self.log.exception(f"Failed to get JSON for {id}: {e}")
+            return None
+
+
+    def fetch_id(self, app_id: int) -> list | None:
+        return self.get_ccu_history_id(app_id)
+
+
+    def format_line(self, app_id: int, data: list) -> str:
+        return f"{app_id}\t{json.dumps(data)}\n"
 
 
-    def get_all_ccu_history(self, start: int = 0, limit: int = 25000) -> None:
+    def get_all_ccu_history(self, start: int = 0, limit: int = 25000, fetch_workers: int = 2, append: bool = None) -> None:
         """
         Records all historical data in `self.data_file` for each `id` in `self.id_file`
+
+        Requests, parsing and writing overlap (see `pipeline.py`), with request starts still
+        spaced `self.REQUEST_INTERVAL_TIME` apart.
+
+        Args:
+            start (int): index of the first id in `self.id_file`
+            limit (int): number of ids
+            fetch_workers (int): number of concurrent requests
+            append (bool): append to an existing shard instead of starting it over
+                (default: unless `start` is 0)
         """
         self.log.info(f"Reading from {self.id_file}")
         app_ids = []
@@ -120,7 +152,12 @@ class SteamPlayerCharts(APIScraper):
         app_ids = app_ids[start : start + limit]
 
         end = start + len(app_ids) - 1
-        output_file_name = f"{self.data_file}_{start}_{end}.jsonl"
+        output_file_name = f"{self.data_file}_{self.shard(start, end)}.jsonl"
+        # if start is 0, then begin writing from the beginning
+        if append is None:
+            append = start != 0
+        file_mode = "a" if append else "w"
+        ledger = self.ledger(start, end, reset=file_mode == "w")
 
         self.log.info(
             "Beginning retrieval of /appdetail/ "\
@@ -128,31 +165,35 @@ class SteamPlayerCharts(APIScraper):
             + f"to {end} (inclusive) into {output_file_name}"
         )
 
-        # if start is 0, then begin writing from the beginning
-        file_mode = "w" if start == 0 else "a"
-        with open(output_file_name, mode=file_mode) as output_data:            
-            i, count = 0, 0
-            for app_id in app_ids:
-                i += 1
-                if i % 100 == 0:
-                    self.log.info(f"Retrieved status / data for {i} games")
-
-                ccu_data = self.get_ccu_history_id(app_id)
-                if not ccu_data or len(ccu_data) == 0:
-                    self.log.warning(
-                        f"Failed to find CCU history for id={app_id}"
-                    )
-                    continue
-                count += 1
-                output_data.write(f"{app_id}\t{ccu_data}\n")
-                time.sleep(self.REQUEST_INTERVAL_TIME)
-
-        self.log.info(f"Finished recording the CCU history for {count} games.")
+        with open(output_file_name, mode=file_mode) as output_data:
+            def fetch(app_id: int) -> bytes:
+                url = f"{self.BASE_URL}app/{app_id}/{self.end_path}"
+                return self.fetch_or_raise(url, 1, headers=self.headers).content
+
+            def write(app_id: int, ccu_data: list) -> None:
+                output_data.write(self.format_line(app_id, ccu_data))
+                done = pipeline.stats["written"] + pipeline.stats["failed"]
+                if done % 100 == 0:
+                    self.log.info(f"Retrieved status / data for {done} games")
+
+            def failed(app_id: int, error: Exception | None) -> None:
+                self.log.warning(f"Failed to find CCU history for id={app_id}")
+                url = f"{self.BASE_URL}app/{app_id}/{self.end_path}"
+                self.record_failure(ledger, app_id, url, failure=failure_of(error))
+
+            pipeline = Pipeline(
+                fetch, write, parse=parse_ccu_history, failed=failed, fetch_workers=fetch_workers,
+                interval=self.REQUEST_INTERVAL_TIME, sleep=self.sleep,
+            )
+            stats = pipeline.run(app_ids)
+
+        self.log.info(f"Finished recording the CCU history for {stats['written']} games.")
 
 
 if __name__ == "__main__":
     START = 0
     LIMIT = 5000
+    RETRY = False  # only re-fetch the IDs in the failure ledgers
     fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
 
     file_handler = logging.FileHandler(
@@ -172,4 +213,7 @@ if __name__ == "__main__":
 
     steamcharts_scraper = SteamPlayerCharts()
     # steamcharts_scraper.get_all_charted_ids()
-    steamcharts_scraper.get_all_ccu_history(start=START, limit=LIMIT)
+    if RETRY:
+        steamcharts_scraper.retry_failed()
+    else:
+        steamcharts_scraper.get_all_ccu_history(start=START, limit=LIMIT)
@@ -1,8 +1,39 @@
 import logging
-import time
 from api_scraper import APIScraper
+from batching import AdaptiveBatcher
 import json
 
+# everything we store from `IStoreBrowseService/GetItems`, also used by `SteamAppList.filter_and_get_items`
+GETITEMS_DATA_REQUEST = {
+    "include_release": True,
+    "include_platforms": True,
+    "include_all_purchase_options": True,
+    "include_ratings": True,
+    "include_tag_count": "20",
+    "include_basic_info": True,
+    "include_supported_languages": True,
+}
+
+
+def get_store_items(scraper: APIScraper, url: str, query: dict, app_ids: list[int]) -> list | None:
+    """
+    Sends one GetItems request for `app_ids`.
+
+    Returns:
+        list: the `store_items` of the response, None if the request failed
+    """
+    query = {**query, "ids": [{"appid": app_id} for app_id in app_ids]}
+    response = scraper.get_request(url, 3, params={"input_json": json.dumps(query)}, exit_on_fail=False)
+    if response is None:
+        return None
+    scraper.log.debug(f"Successfully retrieved data from {response.url}")
+    try:
+        return response.json().get("response", {}).get("store_items", [])
+    except Exception as e:
+        scraper.last_failure = {"status": response.status_code, "error": type(e).__name__}
+        scraper.log.exception(f"Failed to get JSON for GetItems batch: {e}")
+        return None
+
 
 class SteamGetItemsScraper(APIScraper):
     def __init__(self):
@@ -20,15 +51,7 @@ class SteamGetItemsScraper(APIScraper):
                 "country_code": "US",
                 "steam_realm": "1",
             },
-            "data_request": {
-                "include_release": True,
-                "include_platforms": True,
-                "include_all_purchase_options": True,
-                "include_ratings": True,
-                "include_tag_count": "20",
-                "include_basic_info": True,
-                "include_supported_languages": True,
-            },
+            "data_request": GETITEMS_DATA_REQUEST,
         }
 
         self.log = logging.getLogger(__name__)
@@ -46,6 +69,11 @@ class SteamGetItemsScraper(APIScraper):
             file_handle.write(json.dumps(item, ensure_ascii=False) + "\n")
 
 
+    def fetch_id(self, app_id: int) -> dict | None:
+        store_items = get_store_items(self, self.BASE_URL, self.filter_query, [app_id])
+        return store_items[0] if store_items else None
+
+
     def get_getitems(
         self, start: int = 0, limit: int = 10000, batch_size: int = 50
     ) -> None:
@@ -56,7 +84,8 @@ class SteamGetItemsScraper(APIScraper):
         Args:
             start (int): The starting index in the id_file to begin scraping from.
             limit (int): The number of app_ids to scrape.
-            batch_size (int): The number of app_ids to send in each batch request.
+            batch_size (int): Initial number of app_ids per request, if no tuned size is saved
+                (see `batching.AdaptiveBatcher`).
         """
         # Read in data
         self.log.info(f"Reading app IDs from {self.id_folder}{self.id_files}")
@@ -74,30 +103,23 @@ class SteamGetItemsScraper(APIScraper):
         self.log.info(f"Starting API scraping for {total_apps} apps (from index {start} to {end})")
 
         # Begin app data retrieval
-        file_name = f"{self.data_file}_{start}_{end}.jsonl"
+        file_name = f"{self.data_file}_{self.shard(start, end)}.jsonl"
+        ledger = self.ledger(start, end, reset=True)
+        batcher = AdaptiveBatcher("getitems", initial=batch_size)
         self.log.info(f"Saving data to {file_name}")
         with open(file_name, mode="w") as output_file:
-            for i in range(0, total_apps, batch_size):
-                batch = app_ids_names[i : i + batch_size]
-                self.filter_query["ids"] = [{"appid": app[0]} for app in batch]
-
-                response = self.get_request(
-                    self.BASE_URL, 3, params={"input_json": json.dumps(self.filter_query)}
-                )
-                self.log.debug(f"Successfully retrieved data from {response.url}")
-                store_items = response.json().get("response", {}).get("store_items", [])
-
-                if len(store_items) != len(batch):
-                    self.log.warning(
-                        f"Number of apps retrieved ({len(store_items)}) does "
-                        + f"not match number requested ({len(batch)}) "
-                        + f"in range {i}, {i+batch_size}"
-                    )
-
+            batches = batcher.run(
+                [app[0] for app in app_ids_names],
+                lambda app_ids: get_store_items(self, self.BASE_URL, self.filter_query, app_ids),
+            )
+            for i, (store_items, given_up) in enumerate(batches):
                 self.process_batch(output_file, store_items)
-                self.log.info(f"Processed batch {i // batch_size + 1}: {len(batch)} app IDs")
+                for app_id in given_up:
+                    self.log.warning(f"No data returned for app_id: {app_id}")
+                    self.record_failure(ledger, app_id, self.BASE_URL)
+                self.log.info(f"Processed batch {i + 1}: {len(store_items)} apps (batch size {batcher.size})")
 
-                time.sleep(self.REQUEST_INTERVAL_TIME)
+                self.sleep(self.REQUEST_INTERVAL_TIME)
             
         self.log.info(f"Finished scraping app details for {len(app_ids_names)} apps (from index {start} to {end})")
 
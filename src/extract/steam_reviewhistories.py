@@ -1,7 +1,5 @@
 import logging
-import time
 from api_scraper import APIScraper
-import json
 import os
 
 class SteamReviewHistoriesScraper(APIScraper):
@@ -17,6 +15,22 @@ class SteamReviewHistoriesScraper(APIScraper):
         }
 
 
+    def fetch_id(self, app_id: int) -> dict | None:
+        url = f"{self.BASE_URL}{app_id}"
+        response = self.get_request(url, max_attempts=3, params=self.params, exit_on_fail=False)
+        if not response:
+            return None
+
+        try:
+            json_data = response.json()
+            json_data["id"] = app_id  # the histogram response doesn't say which app it is for
+            return json_data
+        except Exception as e:
+            self.last_failure = {"status": response.status_code, "error": type(e).__name__}
+            self.log.exception(f"Failed to get JSON for {app_id}: {e}")
+            return None
+
+
     def get_data(self, start: int = 0, limit: int = 10000):
         """
         Fetches all data for a range of IDs.
@@ -41,25 +55,22 @@ class SteamReviewHistoriesScraper(APIScraper):
 
         self.log.info(f"Starting API scraping for {len(app_ids)} apps (from index {start} to {end})")
 
-        file_name = f"{self.data_file}_{start}_{end}.jsonl"
+        file_name = f"{self.data_file}_{self.shard(start, end)}.jsonl"
+        ledger = self.ledger(start, end, reset=True)
         self.log.info(f"Saving data to {file_name}")
         with open(file_name, mode="w") as output_file:
             for i, (app_id, app_name) in enumerate(app_ids):
                 if i % 100 == 0:
                     self.log.info(f"Processed {i} apps")
                 
-                url = f"{self.BASE_URL}{app_id}"
-                response = self.get_request(url, max_attempts=3, params=self.params, exit_on_fail=False)
-                if not response:
+                data = self.fetch_id(app_id)
+                if not data:
                     self.log.warning(f"No data returned for app_id: {app_id}")
+                    self.record_failure(ledger, app_id, f"{self.BASE_URL}{app_id}")
                     continue
 
-                try:
-                    output_file.write(json.dumps(response.json(), ensure_ascii=False) + "\n")
-                except Exception as e:
-                    self.log.exception(f"Failed to get and write JSON for {app_name}: {e}")
-
-                time.sleep(self.REQUEST_INTERVAL_TIME)
+                output_file.write(self.format_line(app_id, data))
+                self.sleep(self.REQUEST_INTERVAL_TIME)
 
         self.log.info(f"Finished scraping all data for {len(app_ids)} apps (from index {start} to {end})")
 
@@ -67,6 +78,7 @@ class SteamReviewHistoriesScraper(APIScraper):
 if __name__ == "__main__":
     START = 110000
     LIMIT = 60000
+    RETRY = False  # only re-fetch the IDs in the failure ledgers
     fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
 
     file_handler = logging.FileHandler(
@@ -85,4 +97,7 @@ if __name__ == "__main__":
     logger.addHandler(console_handler)
 
     steam_scraper = SteamReviewHistoriesScraper()
-    steam_scraper.get_data(start=START, limit=LIMIT)
+    if RETRY:
+        steam_scraper.retry_failed()
+    else:
+        steam_scraper.get_data(start=START, limit=LIMIT)
@@ -1,5 +1,4 @@
 import logging
-import time
 from api_scraper import APIScraper
 import json
 from copy import deepcopy
@@ -110,10 +109,10 @@ class SteamReviewStatisticsScraper(APIScraper):
 
         release_dates = self.get_releasedates()
 
-        file_all_name = f"{self.data_all_file}_{start}_{end}.jsonl"
+        file_all_name = f"{self.data_all_file}_{self.shard(start, end)}.jsonl"
         self.log.info(f"Saving data to {file_all_name} for all-time data")
 
-        file_early_name = f"{self.data_early_file}_{start}_{end}.jsonl"
+        file_early_name = f"{self.data_early_file}_{self.shard(start, end)}.jsonl"
         self.log.info(f"Saving data to {file_early_name} for data two weeks after release")
         with open(file_all_name, mode="w") as output_all_file, \
              open(file_early_name, mode="w") as output_early_file:
@@ -126,7 +125,7 @@ class SteamReviewStatisticsScraper(APIScraper):
                 # get data for all time
                 query_parameters = deepcopy(self.params)
                 self.submit_and_write_request(url, query_parameters, app_id, app_name, output_all_file)
-                time.sleep(self.REQUEST_INTERVAL_TIME)
+                self.sleep(self.REQUEST_INTERVAL_TIME)
 
                 if app_id not in release_dates:
                     continue
@@ -138,7 +137,7 @@ class SteamReviewStatisticsScraper(APIScraper):
                 query_parameters["start_date"] = time_start
                 query_parameters["end_date"] = time_end
                 self.submit_and_write_request(url, query_parameters, app_id, app_name, output_early_file)
-                time.sleep(self.REQUEST_INTERVAL_TIME)
+                self.sleep(self.REQUEST_INTERVAL_TIME)
 
 
         self.log.info(f"Finished scraping all data for {len(app_ids)} apps (from index {start} to {end})")
@@ -0,0 +1,21 @@
+"""
+Parsing of the tab-separated shards (`ccu_history_*.jsonl` from `steam_charts.py`), one
+"<appid>\t<data>" line per app.
+"""
+import ast
+import json
+
+
+def tab_key(line: str) -> int | None:
+    # "<appid>\t<data>"
+    app_id = line.split("\t", 1)[0]
+    return int(app_id) if app_id.isdigit() else None
+
+
+def tab_value(line: str):
+    # "<appid>\t<data>", JSON, or the Python repr written by older `steam_charts.py` shards
+    data = line.split("\t", 1)[1]
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        return ast.literal_eval(data)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the extract modules import each other as top-level modules (run from `src/extract`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
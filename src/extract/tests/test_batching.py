@@ -0,0 +1,43 @@
+from batching import AdaptiveBatcher
+
+
+def batcher(tmp_path, **kwargs) -> AdaptiveBatcher:
+    return AdaptiveBatcher("getitems", state_file=str(tmp_path / "batch_sizes.json"), **kwargs)
+
+
+def test_size_grows_additively_and_halves_on_failure(tmp_path):
+    tuner = batcher(tmp_path, initial=10, minimum=2, maximum=16, increase=4)
+    sizes = []
+
+    def request(ids):
+        sizes.append(tuner.size)
+        return None if len(sizes) == 3 else [{"appid": app_id} for app_id in ids]
+
+    results = list(tuner.run(list(range(40)), request))
+    # +4 per complete response up to the maximum, halved by the failed third request
+    assert sizes[:4] == [10, 14, 16, 8]
+    assert sorted(item["appid"] for items, _ in results for item in items) == list(range(40))
+    assert all(given_up == [] for _, given_up in results)
+
+
+def test_missing_ids_are_retried_alone_and_given_up(tmp_path):
+    tuner = batcher(tmp_path, initial=10, max_attempts=3)
+    requested = []
+
+    def request(ids):
+        requested.append(ids)
+        return [{"appid": app_id} for app_id in ids if app_id != 3]
+
+    results = list(tuner.run(list(range(6)), request))
+    assert requested == [[0, 1, 2, 3, 4, 5], [3], [3]]
+    assert sorted(item["appid"] for items, _ in results for item in items) == [0, 1, 2, 4, 5]
+    assert [given_up for _, given_up in results] == [[], [], [3]]
+    assert tuner.size == 10  # partial responses don't change the size
+
+
+def test_tuned_size_is_the_next_starting_size(tmp_path):
+    tuner = batcher(tmp_path, initial=10, increase=5)
+    list(tuner.run(list(range(10)), lambda ids: [{"appid": app_id} for app_id in ids]))
+    assert tuner.size == 15
+    assert batcher(tmp_path, initial=10).size == 15
+    assert AdaptiveBatcher("appdetails", state_file=str(tmp_path / "batch_sizes.json"), initial=10).size == 10
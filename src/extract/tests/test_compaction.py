@@ -0,0 +1,79 @@
+import json
+import os
+
+import pytest
+
+from compaction import CompactedIndex, Compactor
+
+
+def write_shard(folder, name: str, records: list, mtime: int) -> None:
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / name
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    os.utime(path, (mtime, mtime))
+
+
+def compacted_lines(folder, prefix: str = "data_") -> list:
+    return [
+        json.loads(line)
+        for name in sorted(os.listdir(folder)) if name.startswith(prefix) and name.endswith(".jsonl")
+        for line in (folder / name).read_text().splitlines()
+    ]
+
+
+@pytest.fixture
+def raw(tmp_path):
+    raw = tmp_path / "raw"
+    # the rerun sorts first by name, but is the newest shard
+    write_shard(raw / "gamalytic", "data_0_99.jsonl", [{"steamId": i, "v": "old"} for i in range(0, 60, 2)], 1_000)
+    write_shard(raw / "gamalytic", "data_0_99_retry.jsonl", [{"steamId": 4, "v": "retry"}], 2_000)
+    rerun = [{"steamId": 4, "v": "first"}, {"steamId": 4, "v": "rerun"}, {"steamId": 7, "v": "rerun"}]
+    write_shard(raw / "gamalytic", "data_000_rerun.jsonl", rerun, 3_000)
+    return raw
+
+
+def test_keeps_the_latest_record_per_app_in_key_order(tmp_path, raw):
+    # tiny runs and fan-in force several merge levels
+    compactor = Compactor(str(raw), str(tmp_path / "out"), run_bytes=64, fan_in=2, segment_records=8)
+    assert compactor.compact("gamalytic") == {"records": 34, "written": 31, "segments": 4}
+
+    records = compacted_lines(tmp_path / "out" / "gamalytic")
+    assert [record["steamId"] for record in records] == sorted([7] + list(range(0, 60, 2)))
+    assert {record["steamId"]: record["v"] for record in records}[4] == "rerun"
+    assert not [name for name in os.listdir(tmp_path / "out") if name.startswith("compact_")]
+
+
+def test_index_lookups(tmp_path, raw):
+    Compactor(str(raw), str(tmp_path / "out"), segment_records=8).compact("gamalytic")
+    index = CompactedIndex(str(tmp_path / "out" / "gamalytic"), "data_")
+    assert len(index) == 31
+    assert json.loads(index.lookup(7)) == {"steamId": 7, "v": "rerun"}
+    assert json.loads(index.lookup(58)) == {"steamId": 58, "v": "old"}
+    assert index.lookup(9) is None and index.lookup(-1) is None and index.lookup(1000) is None
+
+
+def test_failed_run_keeps_the_previous_output(tmp_path, raw, monkeypatch):
+    compactor = Compactor(str(raw), str(tmp_path / "out"), segment_records=8)
+    compactor.compact("gamalytic")
+    before = compacted_lines(tmp_path / "out" / "gamalytic")
+
+    write_shard(raw / "gamalytic", "data_100_199.jsonl", [{"steamId": 100, "v": "new"}], 4_000)
+    def disk_full(*args):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(Compactor, "replace_output", staticmethod(disk_full))
+    with pytest.raises(OSError):
+        compactor.compact("gamalytic")
+
+    assert compacted_lines(tmp_path / "out" / "gamalytic") == before
+    assert json.loads(CompactedIndex(str(tmp_path / "out" / "gamalytic"), "data_").lookup(4))["v"] == "rerun"
+
+
+def test_replaces_previous_segments(tmp_path, raw):
+    compactor = Compactor(str(raw), str(tmp_path / "out"), segment_records=8)
+    compactor.compact("gamalytic")
+    for name in os.listdir(raw / "gamalytic"):
+        os.remove(raw / "gamalytic" / name)
+    write_shard(raw / "gamalytic", "data_0_9.jsonl", [{"steamId": 3, "v": "only"}], 5_000)
+    compactor.compact("gamalytic")
+
+    assert sorted(os.listdir(tmp_path / "out" / "gamalytic")) == ["data_3_3.jsonl", "data_index.tsv"]
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from pipeline import FetchError, Pipeline, failure_of
+
+
+def test_writes_in_input_order():
+    def fetch(item):
+        time.sleep(0.002 * (item % 3))  # later items often finish first
+        return item
+
+    written = []
+    stats = Pipeline(fetch, lambda item, parsed: written.append(parsed), parse=lambda raw: raw * 10,
+                     fetch_workers=4, queue_size=4).run(range(30))
+    assert written == [item * 10 for item in range(30)]
+    assert stats["written"] == 30 and stats["failed"] == 0
+
+
+def test_routes_failures_to_failed():
+    def fetch(item):
+        if item == 1:
+            return None
+        if item == 2:
+            raise FetchError({"status": 404, "error": "HTTPError"})
+        return item
+
+    def parse(raw):
+        if raw == 3:
+            raise ValueError("bad payload")
+        return raw
+
+    written, failed = [], {}
+    stats = Pipeline(fetch, lambda item, parsed: written.append(item), parse=parse,
+                     failed=lambda item, error: failed.setdefault(item, failure_of(error))).run(range(5))
+    assert written == [0, 4]
+    assert failed == {
+        1: {"status": None, "error": "EmptyResponse"},
+        2: {"status": 404, "error": "HTTPError"},
+        3: {"status": None, "error": "ValueError"},
+    }
+    assert stats["written"] == 2 and stats["failed"] == 3
+
+
+def test_writer_error_propagates():
+    def write(item, parsed):
+        if item == 5:
+            raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        Pipeline(lambda item: item, write, queue_size=2).run(range(100))
@@ -0,0 +1,53 @@
+import types
+
+import pytest
+
+import quota
+from quota import QuotaLedger
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(quota, "time", types.SimpleNamespace(time=clock.time, sleep=clock.sleep))
+    return clock
+
+
+def test_requests_are_spaced_at_the_tightest_rate(tmp_path, clock):
+    # 10 per 10 s sustains one per second, 3 per 1 s allows bursts the spacing prevents
+    ledger = QuotaLedger("appdetails", "key", ((1, 3), (10, 10)), str(tmp_path / "quota.db"))
+    waits = [ledger.acquire(clock.sleep) for _ in range(4)]
+    assert waits == [0.0, 1.0, 1.0, 1.0]
+    assert ledger.usage() == {1: 1, 10: 4}
+
+
+def test_ledgers_of_the_same_key_share_the_quota(tmp_path, clock):
+    db_path = str(tmp_path / "quota.db")
+    first = QuotaLedger("appdetails", "key", ((10, 2),), db_path)
+    second = QuotaLedger("appdetails", "key", ((10, 2),), db_path)
+    other_key = QuotaLedger("appdetails", "other key", ((10, 2),), db_path)
+
+    first.acquire(clock.sleep)
+    assert second.acquire(clock.sleep) == 5.0  # min interval of 10 s / 2
+    assert other_key.acquire(clock.sleep) == 0.0
+    assert first.acquire(clock.sleep) == 5.0
+    assert first.usage() == {10: 2}
+
+
+def test_block_pauses_every_process(tmp_path, clock):
+    db_path = str(tmp_path / "quota.db")
+    QuotaLedger("appdetails", "key", ((10, 100),), db_path).block(30)
+    assert QuotaLedger("appdetails", "key", ((10, 100),), db_path).acquire(clock.sleep) == 30.0
@@ -0,0 +1,56 @@
+import json
+from datetime import date, timedelta
+
+from refresh_scheduler import COLD, NEW, RefreshScheduler, TIER_DAYS
+
+
+def write_lines(path, lines: list) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(line + "\n" for line in lines))
+
+
+def test_tier_is_the_first_with_any_threshold_reached():
+    assert RefreshScheduler.tier_of({"reviews": 25000}) == "hot"
+    assert RefreshScheduler.tier_of({"reviews": 10, "ccu": 60}) == "warm"
+    assert RefreshScheduler.tier_of({"reviews": 10, "revenue": 1000}) == COLD
+    assert RefreshScheduler.tier_of(None) == NEW
+    assert RefreshScheduler.tier_of(None, is_game=False) == COLD
+
+
+def test_each_app_is_due_once_per_period():
+    for tier, period in TIER_DAYS.items():
+        days = [date(2024, 11, 2) + timedelta(days=i) for i in range(3 * period)]
+        for app_id in (10, 570, 1_234_567):
+            due = [day for day in days if RefreshScheduler.is_due(app_id, tier, day)]
+            assert len(due) == 3
+            assert all((b - a).days == period for a, b in zip(due, due[1:]))
+
+
+def test_signals_keep_the_maximum_and_read_older_ccu_lines(tmp_path):
+    raw = tmp_path / "raw"
+    write_lines(raw / "steam_apps" / "review_summary_all_0_9.jsonl", [
+        json.dumps({"id": 10, "query_summary": {"total_reviews": 300}}),
+        json.dumps({"id": 10, "query_summary": {"total_reviews": 700}}),
+    ])
+    day = 24 * 60 * 60 * 1000
+    write_lines(raw / "steam_charts" / "ccu_history_0_9.jsonl", [
+        f"20\t{json.dumps([[0, 5000], [40 * day, 30], [50 * day, None]])}",
+        f"30\t{[[0, 80], [day, None]]}",  # Python repr written by older shards
+    ])
+    write_lines(raw / "gamalytic" / "data_0_9.jsonl", [json.dumps({"steamId": "40", "revenue": 500.0})])
+
+    signals = RefreshScheduler(str(raw), str(tmp_path / "work")).read_signals()
+    assert signals == {10: {"reviews": 700}, 20: {"ccu": 30}, 30: {"ccu": 80}, 40: {"revenue": 500.0}}
+
+
+def test_work_lists_keep_the_id_file_lines(tmp_path):
+    raw, work = tmp_path / "raw", tmp_path / "work"
+    ids = [f"{app_id}\tGame {app_id}" for app_id in range(100)]
+    write_lines(raw / "steam_ids" / "game_ids.txt", ids)
+    write_lines(raw / "steam_ids" / "dlc_ids.txt", [])
+
+    day = date(2024, 11, 2)
+    summary = RefreshScheduler(str(raw), str(work)).schedule(day, ["gamalytic"])
+    # no signals: every game is new and refreshed daily
+    assert summary == {"gamalytic": {NEW: 100, "hot": 0, "warm": 0, COLD: 0}}
+    assert (work / "gamalytic_2024-11-02.txt").read_text().splitlines() == ids
@@ -0,0 +1,49 @@
+import json
+
+from requests import Response
+
+from replay import ReplayStore, request_key
+
+URL = "https://api.steampowered.com/ISteamUserStats/GetNumberOfCurrentPlayers/v1/"
+
+
+def recorded_response() -> Response:
+    response = Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = "application/json"
+    response._content = b'{"response": {"player_count": 42}}'
+    return response
+
+
+def test_recordings_replay_under_another_key(tmp_path):
+    ReplayStore(str(tmp_path), "record").save(
+        "GET", URL, {"appid": 10, "key": "real-key"}, None, recorded_response()
+    )
+
+    response = ReplayStore(str(tmp_path)).load("GET", URL, {"key": "benchmark", "appid": 10})
+    assert response.status_code == 200
+    assert response.json() == {"response": {"player_count": 42}}
+    assert ReplayStore(str(tmp_path)).load("GET", URL, {"key": "benchmark", "appid": 20}).status_code == 404
+
+
+def test_fixtures_do_not_contain_the_key(tmp_path):
+    params = {"appid": 10, "key": "real-key"}
+    ReplayStore(str(tmp_path), "record").save("GET", URL, params, None, recorded_response())
+
+    metadata = json.loads((tmp_path / (request_key("GET", URL, params) + ".json")).read_text())
+    assert metadata["params"] == {"appid": 10}
+    assert "real-key" not in "".join(path.read_text() for path in tmp_path.iterdir())
+
+
+def test_hltb_search_is_replayed_as_get_with_a_body(tmp_path, monkeypatch):
+    monkeypatch.setenv("STEAM_API_KEY", "test-key")
+    monkeypatch.setenv("SCRAPER_USER_AGENT", "test-agent")
+    monkeypatch.setenv("SCRAPER_REPLAY_MODE", "replay")
+    monkeypatch.setenv("SCRAPER_REPLAY_DIR", str(tmp_path))
+    from api_scraper import APIScraper
+
+    url, body = "https://howlongtobeat.com/api/search/abc123", {"searchTerms": ["portal"], "searchPage": 1}
+    ReplayStore(str(tmp_path), "record").save("GET", url, None, body, recorded_response())
+
+    response = APIScraper("https://howlongtobeat.com/").post_request(url, 1, body)
+    assert response is not None and response.json() == {"response": {"player_count": 42}}
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from snapshots import SnapshotStore, apply, diff, ingest
+
+CASES = [
+    ({"a": 1, "b": {"c": 2, "d": 3}}, {"a": 1, "b": {"c": 5}, "e": None}),
+    ({"a": {"b": 1}}, {"a": [1, 2]}),
+    ({"a": [1, 2]}, {"a": {"b": None}}),
+    ({"a": None}, {}),
+    ([1, 2], {"a": 1}),
+    ({"a": 1}, {"a": 1}),
+]
+
+
+@pytest.mark.parametrize("old, new", CASES)
+def test_apply_of_diff_rebuilds_the_new_record(old, new):
+    assert apply(old, diff(old, new)) == new
+
+
+def test_diff_is_field_level():
+    assert diff({"a": 1, "b": {"c": 2, "d": 3}}, {"a": 1, "b": {"c": 5}, "e": None}) == {
+        "set": [[["b", "c"], 5], [["e"], None]],
+        "unset": [["b", "d"]],
+    }
+
+
+def test_records_are_rebuilt_as_of_any_day(tmp_path):
+    store = SnapshotStore(str(tmp_path / "appdetails.db"), keyframe_interval=2)
+    days = ["2024-11-01", "2024-11-02", "2024-11-03", "2024-11-04", "2024-11-05"]
+    prices = [999, 999, 499, 999, 199]
+    outcomes = [store.put(10, day, {"name": "A", "price": price}) for day, price in zip(days, prices)]
+    assert outcomes == ["full", "unchanged", "delta", "delta", "full"]
+
+    assert store.as_of(10, "2024-10-31") is None
+    for day, price in zip(days, prices):
+        assert store.as_of(10, day) == {"name": "A", "price": price}
+    assert [day for day, _ in store.changes(10, ["price"])] == ["2024-11-03", "2024-11-04", "2024-11-05"]
+    assert store.changes(10, ["name"]) == []
+
+    assert store.put(10, "2024-11-02", {"name": "B"}) == "ignored"
+    assert store.put(10, "2024-11-05", {"name": "A", "price": 299}) == "full"  # same day: later scrape wins
+    assert store.as_of(10) == {"name": "A", "price": 299}
+    store.close()
+
+
+def test_ingest_reads_appdetails_and_ccu_shards(tmp_path):
+    raw = tmp_path / "raw"
+    (raw / "steam_apps").mkdir(parents=True)
+    (raw / "steam_charts").mkdir()
+    (raw / "steam_apps" / "appdetails_0_9.jsonl").write_text(
+        json.dumps({"10": {"success": True, "data": {"name": "A"}}}) + "\n"
+    )
+    (raw / "steam_charts" / "ccu_history_0_9.jsonl").write_text(f"10\t{[[1000, 5], [2000, None]]}\n")
+
+    store = SnapshotStore(str(tmp_path / "appdetails.db"))
+    assert ingest(store, "appdetails", "2024-11-02", str(raw))["full"] == 1
+    assert store.as_of(10) == {"success": True, "data": {"name": "A"}}
+
+    store = SnapshotStore(str(tmp_path / "ccu_history.db"))
+    assert ingest(store, "ccu_history", "2024-11-02", str(raw))["full"] == 1
+    assert store.as_of(10) == [[1000, 5], [2000, None]]
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+EXTRACT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import os, sys
+from gamalytic import GamalyticScraper
+scraper = GamalyticScraper()
+print(",".join(m for m in ("requests", "bs4", "fake_useragent") if m in sys.modules))
+print(scraper.GAMALYTIC_API_KEY)
+"""
+
+
+def test_scraper_construction_loads_env_without_heavy_imports(tmp_path):
+    # scrapers read `../../.env` relative to the working directory
+    work_dir = tmp_path / "src" / "extract"
+    work_dir.mkdir(parents=True)
+    (tmp_path / ".env").write_text("GAMALYTIC_API_KEY=from-dotenv\n")
+
+    env = {
+        key: value for key, value in os.environ.items()
+        if key not in ("GAMALYTIC_API_KEY", "SCRAPER_METRICS_DIR", "SCRAPER_REPLAY_MODE")
+    }
+    env.update({"STEAM_API_KEY": "already-set", "SCRAPER_USER_AGENT": "test-agent", "PYTHONPATH": EXTRACT_DIR})
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=work_dir, env=env, capture_output=True, text=True, check=True
+    )
+    heavy, api_key = result.stdout.splitlines()
+    assert heavy == ""
+    assert api_key == "from-dotenv"
@@ -0,0 +1,73 @@
+import time
+
+import work_queue
+from work_queue import WorkQueue, make_scraper, run_worker
+
+
+def statuses(queue: WorkQueue) -> list:
+    return queue.connect().execute('SELECT start, status, attempts FROM work_items ORDER BY start').fetchall()
+
+
+def test_enqueue_and_complete_are_idempotent(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"))
+    assert queue.enqueue("gamalytic", 25, 10) == 3
+    assert queue.enqueue("gamalytic", 25, 10) == 0
+    assert queue.enqueue("gamalytic", 25, 10, "work/gamalytic_2024-11-02.txt") == 3
+
+    item = queue.claim("gamalytic", "w1")
+    queue.complete(item)
+    queue.complete(item)
+    assert queue.status() == {"gamalytic": {"done": 1, "pending": 5}}
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.1)
+    queue.enqueue("gamalytic", 10, 10)
+    first = queue.claim("gamalytic", "w1")
+    assert queue.claim("gamalytic", "w2") is None
+
+    time.sleep(0.2)
+    second = queue.claim("gamalytic", "w2")
+    assert (second.id, second.attempts) == (first.id, 2)
+    assert not queue.heartbeat(first)
+    assert queue.heartbeat(second)
+
+    # the first worker's failure doesn't touch the item it lost
+    queue.fail(first, "too late")
+    assert statuses(queue) == [(0, "leased", 2)]
+
+
+def test_run_worker_aborts_items_whose_lease_is_lost(tmp_path, monkeypatch):
+    def run(start, limit):
+        time.sleep(1.0 if start == 0 else 0.0)
+        if start == 2:
+            raise RuntimeError("scraper crashed")
+    monkeypatch.setattr(work_queue, "make_scraper", lambda stage, id_file: (None, run))
+
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=0.3, max_attempts=1)
+    queue.enqueue("gamalytic", 3, 1)
+    heartbeat = queue.heartbeat
+    def steal_first(item):
+        if item.start == 0:
+            queue.connect().execute("UPDATE work_items SET lease = 'other worker' WHERE id = ?", (item.id,))
+        return heartbeat(item)
+    monkeypatch.setattr(queue, "heartbeat", steal_first)
+
+    assert run_worker(queue, "gamalytic", "w1") == 1
+    assert statuses(queue) == [(0, "leased", 1), (1, "done", 1), (2, "failed", 1)]
+
+
+def test_work_list_items_get_their_own_shards(tmp_path, monkeypatch):
+    monkeypatch.setenv("STEAM_API_KEY", "test-key")
+    monkeypatch.setenv("GAMALYTIC_API_KEY", "test-key")
+    monkeypatch.setenv("SCRAPER_USER_AGENT", "test-agent")
+
+    scraper, _ = make_scraper("gamalytic", "../../data/work/gamalytic_2024-11-02.txt")
+    assert scraper.id_file == "../../data/work/gamalytic_2024-11-02.txt"
+    assert scraper.shard(0, 99) == "gamalytic_2024-11-02_0_99"
+    scraper.failed_dir = f"{tmp_path}/"
+    assert scraper.ledger(0, 99).file_path.endswith("GamalyticScraper_gamalytic_2024-11-02_0_99.jsonl")
+
+    scraper, _ = make_scraper("getitems", "../../data/work/getitems_2024-11-02.txt")
+    assert (scraper.id_folder, scraper.id_files) == ("../../data/work/", ["getitems_2024-11-02.txt"])
+    assert make_scraper("gamalytic")[0].shard(0, 99) == "0_99"
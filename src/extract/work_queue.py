@@ -0,0 +1,329 @@
+"""
+Durable work queue of (stage, START, LIMIT) ranges, so any number of scraper processes, on
+one or more machines sharing `--db`, can drain a stage without manual range bookkeeping.
+
+Workers claim an item with a lease and run it in a child process, extending the lease while
+it runs; items whose lease expires (crashed or killed worker) are handed out again, and a
+worker that finds its lease lost (e.g. it was suspended past it) aborts the item instead of
+completing it. Completing an item twice is harmless. Keep the database on a local disk or a volume with working file locks (SQLite
+locking is unreliable on some network filesystems).
+
+Items of an `--id-file` work list write their shards and failure ledgers under the name of
+the work list (see `APIScraper.use_work_list`), so they never replace those of the full list.
+
+From `src/extract`:
+    python work_queue.py enqueue gamalytic --batch 1000
+    python work_queue.py enqueue gamalytic --id-file ../../data/work/gamalytic_2024-11-02.txt
+    python work_queue.py work gamalytic          # as many times, on as many machines, as wanted
+    python work_queue.py status
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+WORK_QUEUE_DB = "../../data/cache/work_queue.db"
+
+# stage -> (module, scraper class, method taking `start` and `limit`), same names as `refresh_scheduler.STAGES`
+STAGES = {
+    "gamalytic": ("gamalytic", "GamalyticScraper", "get_data"),
+    "appdetails": ("steam_appdetails", "SteamAppDetailsScraper", "get_appdetails"),
+    "getitems": ("steam_getitems", "SteamGetItemsScraper", "get_getitems"),
+    "review_stats": ("steam_reviewstats", "SteamReviewStatisticsScraper", "get_data"),
+    "review_histories": ("steam_reviewhistories", "SteamReviewHistoriesScraper", "get_data"),
+    "steam_charts": ("steam_charts", "SteamPlayerCharts", "get_all_ccu_history"),
+}
+
+# extra arguments of the stage methods for queue items: a re-claimed item runs its whole range
+# again, so its shard is started over instead of appended to
+ITEM_OPTIONS = {
+    "steam_charts": {"append": False},
+}
+
+
+@dataclass
+class WorkItem:
+    id: int
+    stage: str
+    start: int
+    limit: int
+    id_file: str | None
+    lease: str
+    attempts: int
+
+
+class WorkQueue:
+    def __init__(self, db_path: str = WORK_QUEUE_DB, lease_seconds: float = 600.0, max_attempts: int = 3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.local = threading.local()  # sqlite connections can't be shared between threads
+        self.log = logging.getLogger(__name__)
+
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.connect().executescript("""
+            CREATE TABLE IF NOT EXISTS work_items (
+                id INTEGER PRIMARY KEY,
+                stage TEXT NOT NULL,
+                start INTEGER NOT NULL,
+                "limit" INTEGER NOT NULL,
+                id_file TEXT NOT NULL DEFAULT '',
+                status TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | failed
+                lease TEXT,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                completed REAL,
+                UNIQUE (stage, id_file, start, "limit")
+            );
+            CREATE INDEX IF NOT EXISTS ix_work_items_stage_status ON work_items (stage, status, start);
+        """)
+
+
+    def connect(self) -> sqlite3.Connection:
+        if not hasattr(self.local, "conn"):
+            self.local.conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            self.local.conn.execute("PRAGMA journal_mode=WAL")
+        return self.local.conn
+
+
+    def transaction(self, statements) -> None:
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+    def enqueue(self, stage: str, total: int, batch_size: int, id_file: str = None) -> int:
+        """
+        Adds the ranges `[start, start + batch_size)` covering `total` ids; ranges already in
+        the queue (in any state) are left untouched, so enqueueing twice is harmless.
+
+        Returns:
+            int: number of new items
+        """
+        rows = [(stage, start, batch_size, id_file or "") for start in range(0, total, batch_size)]
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                'INSERT OR IGNORE INTO work_items (stage, start, "limit", id_file) VALUES (?, ?, ?, ?)', rows
+            )
+            return conn.total_changes - before
+        added = self.transaction(insert)
+        self.log.info(f"Enqueued {added} new {stage} items of {batch_size} IDs ({len(rows) - added} already queued)")
+        return added
+
+
+    def requeue_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "UPDATE work_items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            + "lease = NULL, error = 'lease expired' WHERE status = 'leased' AND lease_expires < ?",
+            (self.max_attempts, now),
+        )
+
+
+    def claim(self, stage: str, worker: str) -> WorkItem | None:
+        """
+        Leases the next pending item of `stage`, or returns None when there is none left.
+        """
+        def claim_next(conn):
+            now = time.time()
+            self.requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, start, \"limit\", id_file, attempts FROM work_items "
+                + "WHERE stage = ? AND status = 'pending' ORDER BY start LIMIT 1",
+                (stage,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            item_id, start, limit, id_file, attempts = row
+            lease = uuid.uuid4().hex
+            conn.execute(
+                "UPDATE work_items SET status = 'leased', lease = ?, worker = ?, lease_expires = ?, "
+                + "attempts = attempts + 1 WHERE id = ?",
+                (lease, worker, now + self.lease_seconds, item_id),
+            )
+            return WorkItem(item_id, stage, start, limit, id_file or None, lease, attempts + 1)
+        return self.transaction(claim_next)
+
+
+    def heartbeat(self, item: WorkItem) -> bool:
+        """
+        Extends the lease of `item`.
+
+        Returns:
+            bool: False if the lease was lost (expired and handed out again)
+        """
+        cursor = self.connect().execute(
+            "UPDATE work_items SET lease_expires = ? WHERE id = ? AND lease = ? AND status = 'leased'",
+            (time.time() + self.lease_seconds, item.id, item.lease),
+        )
+        return cursor.rowcount == 1
+
+
+    def complete(self, item: WorkItem) -> None:
+        """
+        Marks `item` done, even if its lease was lost meanwhile: the work was done either way.
+        """
+        self.connect().execute(
+            "UPDATE work_items SET status = 'done', lease = NULL, error = NULL, completed = ? "
+            + "WHERE id = ? AND status != 'done'",
+            (time.time(), item.id),
+        )
+
+
+    def fail(self, item: WorkItem, error: str) -> None:
+        """
+        Puts `item` back in the queue, or marks it failed after `max_attempts`.
+        """
+        self.connect().execute(
+            "UPDATE work_items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            + "lease = NULL, error = ? WHERE id = ? AND lease = ? AND status = 'leased'",
+            (self.max_attempts, error, item.id, item.lease),
+        )
+
+
+    def status(self) -> dict:
+        """
+        Returns:
+            dict: stage -> {status: number of items}
+        """
+        self.transaction(lambda conn: self.requeue_expired(conn, time.time()))
+        counts = {}
+        for stage, status, count in self.connect().execute(
+            "SELECT stage, status, COUNT(*) FROM work_items GROUP BY stage, status ORDER BY stage"
+        ):
+            counts.setdefault(stage, {})[status] = count
+        return counts
+
+
+def make_scraper(stage: str, id_file: str = None):
+    module_name, class_name, method_name = STAGES[stage]
+    scraper = getattr(__import__(module_name), class_name)()
+    if id_file:
+        scraper.use_work_list(id_file)
+    return scraper, getattr(scraper, method_name)
+
+
+def count_ids(scraper) -> int:
+    if hasattr(scraper, "id_files"):
+        id_files = [scraper.id_folder + file_name for file_name in scraper.id_files]
+    else:
+        id_files = [scraper.id_file]
+
+    total = 0
+    for id_file in id_files:
+        with open(id_file, mode="r") as f:
+            total += sum(1 for line in f if line.strip())
+    return total
+
+
+def run_item(stage: str, id_file: str | None, start: int, limit: int) -> None:
+    """
+    Runs one item, in the child process started by `run_worker`.
+    """
+    try:
+        scraper, run = make_scraper(stage, id_file)
+        run(start=start, limit=limit, **ITEM_OPTIONS.get(stage, {}))
+    except Exception as e:
+        logging.getLogger(__name__).exception(f"{stage} START={start} LIMIT={limit} failed: {e!r}")
+        exit(1)
+
+
+def run_worker(work_queue: WorkQueue, stage: str, worker: str = None) -> int:
+    """
+    Claims and runs items of `stage` until none are left.
+
+    Returns:
+        int: number of completed items
+    """
+    log = logging.getLogger(__name__)
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    while (item := work_queue.claim(stage, worker)) is not None:
+        log.info(f"[{worker}] Claimed {stage} START={item.start} LIMIT={item.limit} (attempt {item.attempts})")
+
+        # a child process can be stopped at any point if the lease is lost, a thread can't
+        process = multiprocessing.Process(
+            target=run_item, args=(stage, item.id_file, item.start, item.limit), name=f"{stage}-{item.id}"
+        )
+        process.start()
+        lost = False
+        process.join(work_queue.lease_seconds / 3)
+        while process.exitcode is None:
+            if not work_queue.heartbeat(item):
+                log.warning(f"[{worker}] Lost the lease on item {item.id}, aborting it")
+                process.terminate()
+                process.join()
+                lost = True
+                break
+            process.join(work_queue.lease_seconds / 3)
+
+        if lost:
+            continue  # no longer ours to complete or fail
+        if process.exitcode == 0:
+            work_queue.complete(item)
+            completed += 1
+        else:
+            # the scrapers exit(1) when a request with exit_on_fail=True gives up, `run_item`
+            # when the scraper raised
+            log.error(f"[{worker}] Item {item.id} failed with exit code {process.exitcode}")
+            work_queue.fail(item, f"exit code {process.exitcode}")
+
+    log.info(f"[{worker}] No {stage} items left, completed {completed}")
+    return completed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=WORK_QUEUE_DB)
+    parser.add_argument("--lease", type=float, default=600.0, help="lease length in seconds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue")
+    enqueue_parser.add_argument("stage", choices=list(STAGES))
+    enqueue_parser.add_argument("--batch", type=int, default=1000, help="LIMIT of each item")
+    enqueue_parser.add_argument("--total", type=int, default=None, help="defaults to the number of ids in the id file")
+    enqueue_parser.add_argument("--id-file", default=None, help="e.g. a `refresh_scheduler.py` work list")
+
+    work_parser = commands.add_parser("work")
+    work_parser.add_argument("stage", choices=list(STAGES))
+
+    commands.add_parser("status")
+    args = parser.parse_args()
+
+    fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(fmt)
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(console_handler)
+    if args.command == "work":
+        file_handler = logging.FileHandler(f"../../logs/work_queue_{args.stage}_{os.getpid()}.log", mode="w")
+        file_handler.setFormatter(fmt)
+        logger.addHandler(file_handler)
+
+    work_queue = WorkQueue(args.db, lease_seconds=args.lease)
+    if args.command == "enqueue":
+        total = args.total
+        if total is None:
+            total = count_ids(make_scraper(args.stage, args.id_file)[0])
+        work_queue.enqueue(args.stage, total, args.batch, args.id_file)
+    elif args.command == "work":
+        run_worker(work_queue, args.stage)
+    else:
+        for stage, counts in work_queue.status().items():
+            logger.info(f"{stage:<18}" + "  ".join(f"{status}={count}" for status, count in sorted(counts.items())))
@@ -0,0 +1,378 @@
+"""
+Runs an extract/transform entry point under profiling without editing its `__main__` block.
+
+Run it from the directory the script normally runs from, e.g.
+    cd src/extract && python ../profiling.py --phases --cprofile hltb.py
+    python src/profiling.py --stage stage_1 --sample --tracemalloc 60 src/transform/stage_1/main.py
+
+Every output goes to `{output_dir}/{stage}.shard{shard}.{kind}`:
+    .prof               cProfile stats of every thread (`--cprofile`), open with `python -m pstats` or snakeviz
+    .folded             sampled stacks (`--sample`) in collapsed format, for flamegraph.pl/speedscope
+    .tracemalloc.txt    top-N allocation sites every `--tracemalloc` seconds and at exit
+    .phases.json        time spent in fetch/parse/serialize/write/commit/sleep (`--phases`)
+"""
+import argparse
+import builtins
+import cProfile
+import json
+import logging
+import os
+import pstats
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# files whose writes count as the write phase: the scrapers' output, but not their failure
+# ledgers (`ledger.py`); logs, metrics and caches are outside these anyway
+WRITE_DIRS = [os.path.join(REPO_DIR, "data", "raw")]
+EXCLUDED_WRITE_DIRS = [os.path.join(REPO_DIR, "data", "raw", "failed")]
+
+
+def is_within(path: str, directories: list[str]) -> bool:
+    return any(os.path.commonpath([path, directory]) == directory for directory in directories)
+
+
+class TimedFile:
+    """
+    File opened for writing whose `write`, `writelines` and `flush` count as the write phase.
+    Everything else goes to the file itself.
+    """
+    def __init__(self, file, timers: "PhaseTimers"):
+        self.file = file
+        self.write = timers.timed("write", file.write)
+        self.writelines = timers.timed("write", file.writelines)
+        self.flush = timers.timed("write", file.flush)
+
+
+    def __getattr__(self, name: str):
+        return getattr(self.file, name)
+
+
+    def __iter__(self):
+        return iter(self.file)
+
+
+    def __enter__(self):
+        self.file.__enter__()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        return self.file.__exit__(*exc_info)
+
+
+class PhaseTimers:
+    """
+    Times the pipeline phases by wrapping the library calls that implement them, and the
+    writes to output files (under `write_dirs`) opened for writing through `open`.
+
+    Calls are only attributed to the outermost phase, e.g. the `json.loads` inside
+    `Response.json` counts as a single parse and the flush inside `Session.commit` as commit.
+    """
+    def __init__(self, write_dirs: list[str] = None, excluded_write_dirs: list[str] = None):
+        self.write_dirs = [os.path.abspath(d) for d in (WRITE_DIRS if write_dirs is None else write_dirs)]
+        self.excluded_write_dirs = [
+            os.path.abspath(d) for d in (EXCLUDED_WRITE_DIRS if excluded_write_dirs is None else excluded_write_dirs)
+        ]
+        self.totals = {}  # phase -> [calls, seconds]
+        self.lock = threading.Lock()  # the scrapers fetch/parse on several threads
+        self.patches = []  # (owner, attribute name, original)
+        self.local = threading.local()
+        self.start = None
+
+
+    def timed(self, phase: str, function):
+        timers = self
+
+        def timed(*args, **kwargs):
+            if getattr(timers.local, "phase", None) is not None:
+                return function(*args, **kwargs)
+            timers.local.phase = phase
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                timers.local.phase = None
+                with timers.lock:
+                    totals = timers.totals.setdefault(phase, [0, 0.0])
+                    totals[0] += 1
+                    totals[1] += elapsed
+
+        return timed
+
+
+    def wrap(self, phase: str, owner, name: str) -> None:
+        original = getattr(owner, name)
+        setattr(owner, name, self.timed(phase, original))
+        self.patches.append((owner, name, original))
+
+
+    def wrap_open(self) -> None:
+        # file objects are C types whose methods can't be patched, so `open` hands out proxies
+        original = builtins.open
+        timers = self
+
+        def open_timed(file, mode="r", *args, **kwargs):
+            opened = original(file, mode, *args, **kwargs)
+            if set(mode) & set("wax+") and timers.is_output(file):
+                return TimedFile(opened, timers)
+            return opened
+
+        builtins.open = open_timed
+        self.patches.append((builtins, "open", original))
+
+
+    def is_output(self, file) -> bool:
+        if isinstance(file, int):
+            return False
+        path = os.path.abspath(os.fsdecode(file))
+        return is_within(path, self.write_dirs) and not is_within(path, self.excluded_write_dirs)
+
+
+    def install(self) -> None:
+        self.start = time.perf_counter()
+        self.wrap("parse", json, "loads")
+        self.wrap("serialize", json, "dumps")
+        self.wrap("sleep", time, "sleep")
+        self.wrap_open()
+
+        # only patch the libraries that are installed, the stages use different subsets
+        try:
+            import requests
+            self.wrap("fetch", requests.Session, "request")
+            self.wrap("parse", requests.Response, "json")
+        except ImportError:
+            pass
+        try:
+            import bs4
+            self.wrap("parse", bs4.BeautifulSoup, "__init__")
+        except ImportError:
+            pass
+        try:
+            from sqlalchemy.orm import Session
+            self.wrap("write", Session, "flush")
+            self.wrap("write", Session, "execute")
+            self.wrap("commit", Session, "commit")
+        except ImportError:
+            pass
+
+
+    def uninstall(self) -> None:
+        for owner, name, original in reversed(self.patches):
+            setattr(owner, name, original)
+        self.patches = []
+
+
+    def as_dict(self) -> dict:
+        wall_time = time.perf_counter() - self.start
+        with self.lock:
+            totals = {phase: list(total) for phase, total in self.totals.items()}
+        phases = {
+            phase: {"calls": calls, "seconds": round(seconds, 4), "share": round(seconds / wall_time, 4)}
+            for phase, (calls, seconds) in sorted(totals.items(), key=lambda item: -item[1][1])
+        }
+        other = wall_time - sum(seconds for _, seconds in totals.values())
+        return {"wall_seconds": round(wall_time, 4), "phases": phases, "other_seconds": round(other, 4)}
+
+
+class ThreadProfiles:
+    """
+    cProfile of the main thread and of every thread started while enabled (the fetch/parse/write
+    threads of `pipeline.py`). Since Python 3.12 one `cProfile.Profile` sees every thread;
+    before that each thread gets its own through `threading.setprofile`, merged when dumped.
+    """
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.thread_profilers = []
+        self.lock = threading.Lock()
+
+
+    def start_thread(self, *args) -> None:
+        # first profile event of a new thread: replace this hook with the thread's profiler
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        with self.lock:
+            self.thread_profilers.append(profiler)
+        profiler.enable()
+
+
+    def enable(self) -> None:
+        if sys.version_info < (3, 12):
+            threading.setprofile(self.start_thread)
+        self.profiler.enable()
+
+
+    def disable(self) -> None:
+        self.profiler.disable()
+        threading.setprofile(None)
+
+
+    def dump_stats(self, file_path: str) -> None:
+        stats = pstats.Stats(self.profiler)
+        with self.lock:
+            for profiler in self.thread_profilers:
+                stats.add(profiler)
+        stats.dump_stats(file_path)
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the Python stack of every thread (but its own) every `interval` seconds and counts
+    the collapsed stacks, rooted at the thread name so the fetch threads of `pipeline.py` show
+    up next to the main thread. Cheaper than cProfile on long scrapes, and shows where waiting
+    happens.
+    """
+    def __init__(self, interval: float):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.counts = {}
+        self.stopped = threading.Event()
+
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+    def write(self, file_path: str) -> None:
+        with open(file_path, mode="w") as f:
+            for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+
+
+class AllocationSnapshots(threading.Thread):
+    """
+    Appends the top `top_n` allocation sites (by size) to `file_path` every `interval` seconds.
+    """
+    def __init__(self, file_path: str, interval: float, top_n: int):
+        super().__init__(daemon=True)
+        self.file_path = file_path
+        self.interval = interval
+        self.top_n = top_n
+        self.start_time = time.perf_counter()
+        self.stopped = threading.Event()
+
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.snapshot()
+
+
+    def snapshot(self, label: str = None) -> None:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        elapsed = time.perf_counter() - self.start_time
+        with open(self.file_path, mode="a") as f:
+            f.write(
+                f"=== {label or 'snapshot'} at {elapsed:.1f}s: "
+                + f"current={current / 2**20:.1f} MiB peak={peak / 2**20:.1f} MiB\n"
+            )
+            for stat in snapshot.statistics("lineno")[:self.top_n]:
+                f.write(f"{stat}\n")
+            f.write("\n")
+
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+        self.snapshot("final")
+
+
+def run_script(script: str, script_args: list[str]) -> None:
+    """
+    Runs `script` as `__main__`, with the same `sys.argv`/`sys.path[0]` as `python script ...`.
+    """
+    sys.argv = [script, *script_args]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stage", default=None, help="output name, defaults to the script name")
+    parser.add_argument("--shard", default="0", help="shard/worker id, e.g. the START of the run")
+    parser.add_argument("--output-dir", default=None, help="defaults to `logs/profiles` of the repository")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--cprofile", action="store_true", help="deterministic profile to .prof")
+    mode.add_argument("--sample", action="store_true", help="sample stacks to .folded")
+    parser.add_argument("--sample-interval", type=float, default=0.005, help="seconds")
+    parser.add_argument("--tracemalloc", type=float, default=None, metavar="SECONDS", help="snapshot interval")
+    parser.add_argument("--top", type=int, default=25, help="allocation sites per snapshot")
+    parser.add_argument("--phases", action="store_true", help="per-phase timers to .phases.json")
+    parser.add_argument(
+        "--write-dir", action="append", default=None,
+        help="folder whose file writes count as the write phase (repeatable), defaults to `data/raw` "
+        + "without `data/raw/failed`",
+    )
+    parser.add_argument("script")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    log = logging.getLogger("profiling")
+
+    stage = args.stage or os.path.splitext(os.path.basename(args.script))[0]
+    output_dir = args.output_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs", "profiles")
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = os.path.join(output_dir, f"{stage}.shard{args.shard}")
+
+    phases = PhaseTimers(args.write_dir, [] if args.write_dir else None) if args.phases else None
+    profiler = ThreadProfiles() if args.cprofile else None
+    sampler = StackSampler(args.sample_interval) if args.sample else None
+    allocations = None
+    if args.tracemalloc:
+        if os.path.exists(f"{prefix}.tracemalloc.txt"):
+            os.remove(f"{prefix}.tracemalloc.txt")
+        tracemalloc.start()
+        allocations = AllocationSnapshots(f"{prefix}.tracemalloc.txt", args.tracemalloc, args.top)
+        allocations.start()
+
+    if phases:
+        phases.install()
+    if sampler:
+        sampler.start()
+    if profiler:
+        profiler.enable()
+    try:
+        run_script(args.script, args.script_args)
+    finally:
+        # also write the profiles when the script gives up with exit(1)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(f"{prefix}.prof")
+        if sampler:
+            sampler.stop()
+            sampler.write(f"{prefix}.folded")
+        if phases:
+            phases.uninstall()
+            with open(f"{prefix}.phases.json", mode="w") as f:
+                json.dump(phases.as_dict(), f, indent=2)
+        if allocations:
+            allocations.stop()
+            tracemalloc.stop()
+        log.info(f"Profiles written to {prefix}.*")
@@ -0,0 +1,230 @@
+"""
+Builds a sparse game x attribute one-hot matrix from the stage_1 tables:
+    - `steam_tag:{tagid}` from GetItems tags (`steam_item_tags`)
+    - `tag:`, `genre:`, `feature:`, `language:{value}` from Gamalytic (`gamalytics_attributes`)
+
+The rows are streamed in steam id order straight into CSR arrays (`indptr`, `indices`, all
+values 1), so memory grows with the number of non-zeros only, unlike a dense `get_dummies`.
+
+Columns are append-only: the vocabulary is seeded from `tags.json`/`categories.json`
+(written by `SteamCategoriesTags`) so the official tags/categories keep the same column in
+every build, and values seen for the first time are added at the end. Appending new games
+therefore never moves existing rows or columns.
+
+Usage (from `src/transform/stage_1`):
+    python -m analysis.feature_matrix --output ./data/transformed/feature_matrix/
+    python -m analysis.feature_matrix --output ./data/transformed/feature_matrix/ --append
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+from array import array
+from itertools import groupby
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.db import ENGINE
+from models.gamalytics import GamalyticsAttributes, GamalyticsAttributeValue
+from models.steam import SteamItemTag
+
+TAG_FILE = "./data/raw/steam_ids/tags.json"
+CATEGORY_FILE = "./data/raw/steam_ids/categories.json"
+ARRAYS = ("ids", "indptr", "indices")
+STREAM_CHUNK_SIZE = 10000
+
+
+def seed_columns(tag_file: str = None, category_file: str = None) -> list[str]:
+    """
+    Returns:
+        list: `steam_tag:`/`tag:` columns of every official tag and `feature:` columns of every
+            category, in official id order
+    """
+    columns = []
+    if tag_file and os.path.exists(tag_file):
+        with open(tag_file, "r") as f:
+            tags = sorted(json.load(f).get("tags", []), key=lambda tag: int(tag["tagid"]))
+        columns += [f"steam_tag:{int(tag['tagid'])}" for tag in tags]
+        columns += [f"tag:{tag['name']}" for tag in tags]
+    if category_file and os.path.exists(category_file):
+        with open(category_file, "r") as f:
+            categories = json.load(f).get("response", {}).get("categories", [])
+        categories = sorted(categories, key=lambda category: int(category["categoryid"]))
+        columns += [f"feature:{category['display_name']}" for category in categories]
+    return list(dict.fromkeys(columns))
+
+
+def stream_labels(session):
+    """
+    Yields (steamId, column label) of every game attribute, ordered by steamId.
+    """
+    options = {"yield_per": STREAM_CHUNK_SIZE}
+    steam_tags = (
+        (appid, f"steam_tag:{tagid}")
+        for appid, tagid in session.execute(
+            select(SteamItemTag.appid, SteamItemTag.tagid).order_by(SteamItemTag.appid), execution_options=options
+        )
+    )
+    gamalytic = (
+        (steam_id, f"{attribute_type}:{value}")
+        for steam_id, attribute_type, value in session.execute(
+            select(GamalyticsAttributes.steamId, GamalyticsAttributeValue.attributeType, GamalyticsAttributeValue.value)
+            .join(GamalyticsAttributeValue, GamalyticsAttributes.attributeKey == GamalyticsAttributeValue.attributeKey)
+            .order_by(GamalyticsAttributes.steamId),
+            execution_options=options,
+        )
+    )
+    yield from heapq.merge(steam_tags, gamalytic, key=lambda pair: pair[0])
+
+
+class FeatureMatrix:
+    def __init__(self, columns: list[str], ids=None, indptr=None, indices=None):
+        """
+        Args:
+            columns (list): column labels, e.g. from `seed_columns`
+            ids, indptr, indices: CSR arrays of existing rows (default: no rows)
+        """
+        self.columns = list(columns)
+        self.column_index = {label: i for i, label in enumerate(self.columns)}
+        self.ids = np.zeros(0, dtype=np.int64) if ids is None else ids
+        self.indptr = np.zeros(1, dtype=np.int64) if indptr is None else indptr
+        self.indices = np.zeros(0, dtype=np.int32) if indices is None else indices
+        self.log = logging.getLogger(__name__)
+        self.index_rows()
+
+
+    def index_rows(self) -> None:
+        # row index by steamId: rows are in append order, so look ids up through a sorted copy
+        self.row_order = np.argsort(self.ids, kind="stable")
+        self.sorted_ids = self.ids[self.row_order]
+
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.ids), len(self.columns)
+
+
+    def column_of(self, label: str) -> int:
+        """
+        Returns the column of `label`, adding it at the end if it is new.
+        """
+        column = self.column_index.get(label)
+        if column is None:
+            column = len(self.columns)
+            self.columns.append(label)
+            self.column_index[label] = column
+        return column
+
+
+    def append(self, labels) -> int:
+        """
+        Adds a row for every game of `labels` that isn't in the matrix yet.
+
+        Args:
+            labels: (steamId, column label) pairs grouped by steamId, e.g. `stream_labels`
+
+        Returns:
+            int: number of added rows
+        """
+        known = set(self.ids.tolist())
+        new_ids, row_lengths, new_indices = array("q"), array("q"), array("i")
+        skipped = 0
+        for steam_id, group in groupby(labels, key=lambda pair: pair[0]):
+            if steam_id in known:
+                skipped += 1
+                continue
+            known.add(steam_id)
+            row = sorted({self.column_of(label) for _, label in group})
+            new_ids.append(steam_id)
+            row_lengths.append(len(row))
+            new_indices.extend(row)
+
+        if new_ids:
+            self.ids = np.concatenate((self.ids, np.frombuffer(new_ids, dtype=np.int64)))
+            self.indptr = np.concatenate((self.indptr, self.indptr[-1] + np.cumsum(np.frombuffer(row_lengths, dtype=np.int64))))
+            self.indices = np.concatenate((self.indices, np.frombuffer(new_indices, dtype=np.int32)))
+            self.index_rows()
+        if skipped:
+            self.log.info(f"Skipped {skipped} games already in the matrix")
+        self.log.info(f"Appended {len(new_ids)} games, matrix is now {self.shape[0]} x {self.shape[1]}")
+        return len(new_ids)
+
+
+    def rows_of(self, steam_ids) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: row of each steam id, -1 for games not in the matrix
+        """
+        steam_ids = np.atleast_1d(np.asarray(steam_ids, dtype=np.int64))
+        if len(self.sorted_ids) == 0:
+            return np.full(len(steam_ids), -1)
+        positions = np.searchsorted(self.sorted_ids, steam_ids)
+        positions[positions == len(self.sorted_ids)] = 0
+        return np.where(self.sorted_ids[positions] == steam_ids, self.row_order[positions], -1)
+
+
+    def labels_of(self, steam_id: int) -> list[str]:
+        row = self.rows_of(steam_id)[0]
+        if row < 0:
+            return []
+        return [self.columns[i] for i in self.indices[self.indptr[row] : self.indptr[row + 1]]]
+
+
+    def column_counts(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: number of games with each column
+        """
+        return np.bincount(self.indices, minlength=len(self.columns))
+
+
+    def to_csr(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the matrix as CSR arrays, e.g. for
+        `scipy.sparse.csr_matrix((data, indices, indptr), shape=matrix.shape)`.
+
+        Returns:
+            np.ndarray: data (all ones)
+            np.ndarray: column indices
+            np.ndarray: row pointers
+        """
+        data = np.ones(len(self.indices), dtype=np.float32)
+        return data, np.asarray(self.indices), np.asarray(self.indptr)
+
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "columns.json"), "w") as f:
+            json.dump(self.columns, f, indent=0)
+
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "FeatureMatrix":
+        with open(os.path.join(directory, "columns.json"), "r") as f:
+            columns = json.load(f)
+        mode = "r" if mmap else None
+        return cls(columns, *(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="folder of the matrix arrays and `columns.json`")
+    parser.add_argument("--append", action="store_true", help="only add the games missing from an existing matrix")
+    parser.add_argument("--tag-file", default=TAG_FILE)
+    parser.add_argument("--category-file", default=CATEGORY_FILE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    if args.append and os.path.exists(os.path.join(args.output, "columns.json")):
+        matrix = FeatureMatrix.load(args.output, mmap=False)
+    else:
+        matrix = FeatureMatrix(seed_columns(args.tag_file, args.category_file))
+    with Session(ENGINE) as session:
+        matrix.append(stream_labels(session))
+    matrix.save(args.output)
@@ -0,0 +1,214 @@
+"""
+Matches HLTB games (`hltb_games`) to Steam apps and writes the `hltb_steam_matches` table.
+
+Games whose HLTB page has `profile_steam` keep it. The others are matched by name against
+the Steam `game_ids.txt` names:
+    - names are normalized (case, accents, punctuation, trademarks, "&", roman numerals)
+    - an inverted index maps every character trigram of a normalized name to the Steam
+      names containing it; trigrams shared by more than `max_posting` names (" th", "the",
+      ...) are too unselective and are skipped for candidate generation (blocking)
+    - the candidates sharing the most trigrams are scored by trigram Jaccard similarity,
+      and near-equal scores are broken by the closest release year
+
+Usage (from `src/transform/stage_1`):
+    python -m analysis.hltb_matching --ids ./data/raw/steam_ids/game_ids.txt
+"""
+import argparse
+import logging
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from models.db import BASE, ENGINE
+from models.gamalytics import GamalyticsMain
+from models.hltb import HLTBGame, HLTBSteamMatch
+from models.steam import SteamItem
+
+GAME_ID_FILE = "./data/raw/steam_ids/game_ids.txt"
+
+ROMAN_NUMERALS = {"ii": "2", "iii": "3", "iv": "4", "v": "5", "vi": "6", "vii": "7", "viii": "8", "ix": "9", "x": "10"}
+TRADEMARKS = re.compile(r"[™®©]|\(tm\)|\(r\)")
+NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(name: str) -> str:
+    # trademarks go first, NFKD would turn "™" into "TM"
+    name = TRADEMARKS.sub("", (name or "").lower())
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().replace("&", " and ")
+    words = NON_ALPHANUMERIC.sub(" ", name).split()
+    return " ".join(ROMAN_NUMERALS.get(word, word) for word in words)
+
+
+def trigrams(normalized: str) -> set[str]:
+    padded = f"  {normalized} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def read_steam_names(id_file: str) -> dict:
+    """
+    Returns:
+        dict: steamId -> name of every `appid<TAB>name` line of `id_file`
+    """
+    names = {}
+    with open(id_file, mode="r") as f:
+        for line in f:
+            app = line.rstrip("\n").split("\t")
+            if len(app) == 2 and app[1]:
+                names[int(app[0])] = app[1]
+    return names
+
+
+def read_steam_years(session) -> dict:
+    """
+    Returns:
+        dict: steamId -> release year, from GetItems (unix seconds) and else Gamalytic (ms)
+    """
+    years = {}
+    for steam_id, release_ms in session.execute(select(GamalyticsMain.steamId, GamalyticsMain.firstReleaseDate)):
+        if release_ms:
+            years[steam_id] = datetime.fromtimestamp(release_ms / 1000, timezone.utc).year
+    for appid, release in session.execute(select(SteamItem.appid, SteamItem.releaseDate)):
+        if release:
+            years[appid] = datetime.fromtimestamp(release, timezone.utc).year
+    return years
+
+
+class SteamNameIndex:
+    def __init__(self, names: dict, years: dict = None, max_posting: int = 2000):
+        """
+        Args:
+            names (dict): steamId -> Steam name
+            years (dict): steamId -> release year, for tie-breaks
+            max_posting (int): trigrams of more names than this are not used to generate candidates
+        """
+        self.max_posting = max_posting
+        self.steam_ids = np.asarray(list(names), dtype=np.int64)
+        years = years or {}
+        self.years = [years.get(steam_id) for steam_id in names]
+
+        self.normalized = [normalize(name) for name in names.values()]
+        self.grams = [trigrams(name) for name in self.normalized]
+        self.exact = defaultdict(list)  # normalized name -> entries
+        postings = defaultdict(list)  # trigram -> entries
+        for entry, (name, grams) in enumerate(zip(self.normalized, self.grams)):
+            self.exact[name].append(entry)
+            for gram in grams:
+                postings[gram].append(entry)
+        self.postings = {gram: np.asarray(entries, dtype=np.int32) for gram, entries in postings.items()}
+
+
+    def candidates(self, grams: set, limit: int) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: up to `limit` entries sharing the most selective trigrams with `grams`
+        """
+        lists = sorted((self.postings[gram] for gram in grams if gram in self.postings), key=len)
+        if not lists:
+            return np.zeros(0, dtype=np.int32)
+        selective = [entries for entries in lists if len(entries) <= self.max_posting] or lists[:3]
+        entries, shared = np.unique(np.concatenate(selective), return_counts=True)
+        if len(entries) > limit:
+            entries = entries[np.argpartition(-shared, limit - 1)[:limit]]
+        return entries
+
+
+    def year_delta(self, entry: int, year: int | None) -> int | None:
+        if year is None or self.years[entry] is None:
+            return None
+        return abs(self.years[entry] - year)
+
+
+    def best_of(self, scored: list, year: int | None, tolerance: float) -> tuple[int, float, int | None]:
+        """
+        Picks the closest release year among the entries scoring within `tolerance` of the best.
+        """
+        best_score = max(score for _, score in scored)
+        close = [(entry, score) for entry, score in scored if score >= best_score - tolerance]
+
+        def rank(candidate):
+            entry, score = candidate
+            delta = self.year_delta(entry, year)
+            return (delta if delta is not None else 1000, -score)
+
+        entry, score = min(close, key=rank)
+        return entry, score, self.year_delta(entry, year)
+
+
+    def match(self, name: str, year: int = None, min_score: float = 0.5, tolerance: float = 0.05, limit: int = 50) -> dict | None:
+        """
+        Returns:
+            dict: `{"steamId", "method", "score", "yearDelta"}` of the best match, None below `min_score`
+        """
+        normalized = normalize(name)
+        if not normalized:
+            return None
+
+        exact = self.exact.get(normalized)
+        if exact:
+            entry, score, delta = self.best_of([(entry, 1.0) for entry in exact], year, 0.0)
+            return {"steamId": int(self.steam_ids[entry]), "method": "exact", "score": score, "yearDelta": delta}
+
+        grams = trigrams(normalized)
+        scored = []
+        for entry in self.candidates(grams, limit):
+            shared = len(grams & self.grams[entry])
+            score = shared / (len(grams) + len(self.grams[entry]) - shared)
+            if score >= min_score:
+                scored.append((entry, score))
+        if not scored:
+            return None
+
+        entry, score, delta = self.best_of(scored, year, tolerance)
+        return {"steamId": int(self.steam_ids[entry]), "method": "fuzzy", "score": score, "yearDelta": delta}
+
+
+def match_games(session, index: SteamNameIndex, min_score: float = 0.5) -> list[dict]:
+    """
+    Returns:
+        list: `HLTBSteamMatch` rows of every matched HLTB game
+    """
+    rows = []
+    for game_id, name, steam_id, year in session.execute(
+        select(HLTBGame.gameId, HLTBGame.name, HLTBGame.steamId, HLTBGame.releaseYear)
+    ):
+        if steam_id:
+            rows.append({"gameId": game_id, "steamId": steam_id, "method": "profile_steam", "score": 1.0, "yearDelta": None})
+            continue
+        match = index.match(name, year, min_score)
+        if match:
+            rows.append({"gameId": game_id, **match})
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ids", default=GAME_ID_FILE, help="Steam id file in game_ids.txt format")
+    parser.add_argument("--min-score", type=float, default=0.5)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    log = logging.getLogger(__name__)
+
+    BASE.metadata.create_all(ENGINE, tables=[HLTBSteamMatch.__table__])
+    with Session(ENGINE) as session:
+        start = time.perf_counter()
+        index = SteamNameIndex(read_steam_names(args.ids), read_steam_years(session))
+        log.info(f"Indexed {len(index.steam_ids)} Steam names in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        rows = match_games(session, index, args.min_score)
+        session.execute(delete(HLTBSteamMatch))
+        if rows:
+            session.execute(HLTBSteamMatch.__table__.insert(), rows)
+        session.commit()
+
+    methods = defaultdict(int)
+    for row in rows:
+        methods[row["method"]] += 1
+    log.info(f"Matched {len(rows)} HLTB games ({dict(methods)}) in {time.perf_counter() - start:.1f}s")
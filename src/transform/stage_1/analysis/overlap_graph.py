@@ -0,0 +1,235 @@
+"""
+Compiles the `gamalytics_audience_overlap` rows into a compressed sparse row (CSR) graph,
+so neighbor, k-hop and ranking queries are array operations instead of SQLite self-joins.
+
+Edges go from `steamId` to `relatedSteamId` with the `link` weight. Games are renumbered
+0..n-1 in steam id order (`ids`), and the out-edges of node `i` are
+`indices[indptr[i] : indptr[i + 1]]` with `weights` at the same positions. The four arrays
+are saved as `.npy` files and loaded memory-mapped, so opening the graph costs nothing.
+
+Usage (from `src/transform/stage_1`):
+    python -m analysis.overlap_graph --type audience_overlap --output ./data/transformed/overlap_graph/
+"""
+import argparse
+import logging
+import os
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.db import ENGINE
+from models.gamalytics import GamalyticsAudienceOverlap
+
+DATA_TYPES = ("audience_overlap", "also_played")
+ARRAYS = ("ids", "indptr", "indices", "weights")
+
+
+def gather(indptr: np.ndarray, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns:
+        np.ndarray: edge positions of all out-edges of `nodes`, node by node
+        np.ndarray: index in `nodes` of the node each edge leaves from
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    owners = np.repeat(np.arange(len(nodes)), counts)
+    # position within the node's slice = global position - first position of that node
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    return positions, owners
+
+
+class OverlapGraph:
+    def __init__(self, ids: np.ndarray, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.log = logging.getLogger(__name__)
+
+
+    @classmethod
+    def from_edges(cls, sources, targets, weights) -> "OverlapGraph":
+        """
+        Builds the graph from edge arrays of steam ids. Duplicate edges keep their largest weight.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        weights = np.nan_to_num(np.asarray(weights, dtype=np.float32))
+
+        ids = np.unique(np.concatenate((sources, targets)))
+        rows = np.searchsorted(ids, sources)
+        cols = np.searchsorted(ids, targets)
+
+        # sort by (row, col, weight) so the last edge of each (row, col) has the largest weight
+        order = np.lexsort((weights, cols, rows))
+        rows, cols, weights = rows[order], cols[order], weights[order]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        rows, cols, weights = rows[last], cols[last], weights[last]
+
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(ids)), out=indptr[1:])
+        return cls(ids, indptr, cols.astype(np.int32), weights)
+
+
+    @classmethod
+    def from_database(cls, session, data_types: tuple = ("audience_overlap",)) -> "OverlapGraph":
+        rows = session.execute(
+            select(GamalyticsAudienceOverlap.steamId, GamalyticsAudienceOverlap.relatedSteamId, GamalyticsAudienceOverlap.link)
+            .where(GamalyticsAudienceOverlap.dataType.in_(data_types))
+        ).all()
+        sources, targets, weights = zip(*rows) if rows else ((), (), ())
+        weights = [np.nan if weight is None else weight for weight in weights]
+        return cls.from_edges(sources, targets, weights)
+
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "OverlapGraph":
+        mode = "r" if mmap else None
+        return cls(*(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS))
+
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+
+    def nodes_of(self, steam_ids) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: node of each steam id, -1 for games not in the graph
+        """
+        steam_ids = np.atleast_1d(np.asarray(steam_ids, dtype=np.int64))
+        if len(self.ids) == 0:
+            return np.full(len(steam_ids), -1)
+        nodes = np.searchsorted(self.ids, steam_ids)
+        nodes[nodes == len(self.ids)] = 0
+        return np.where(self.ids[nodes] == steam_ids, nodes, -1)
+
+
+    def neighbors(self, steam_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            np.ndarray: steam ids of the related games, by decreasing weight
+            np.ndarray: their weights
+        """
+        node = self.nodes_of(steam_id)[0]
+        if node < 0:
+            return np.zeros(0, dtype=self.ids.dtype), np.zeros(0, dtype=np.float32)
+        start, end = self.indptr[node], self.indptr[node + 1]
+        order = np.argsort(-self.weights[start:end], kind="stable")
+        return self.ids[self.indices[start:end][order]], np.asarray(self.weights[start:end][order])
+
+
+    def k_hop(self, steam_ids, k: int = 2) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Breadth-first expansion from `steam_ids`, one vectorized step per hop.
+
+        Returns:
+            np.ndarray: steam ids reachable in at most `k` hops (the seeds included)
+            np.ndarray: hop distance of each
+        """
+        nodes = self.nodes_of(steam_ids)
+        distance = np.full(self.num_nodes, -1, dtype=np.int32)
+        frontier = np.unique(nodes[nodes >= 0])
+        distance[frontier] = 0
+        for hop in range(1, k + 1):
+            if len(frontier) == 0:
+                break
+            positions, _ = gather(self.indptr, frontier)
+            reached = np.unique(self.indices[positions])
+            frontier = reached[distance[reached] < 0]
+            distance[frontier] = hop
+
+        found = np.flatnonzero(distance >= 0)
+        return self.ids[found], distance[found]
+
+
+    def similar(self, steam_id: int, top: int = 20) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Games sharing the most weighted two-hop paths with `steam_id`
+        (sum over related games `r` of `link(game, r) * link(r, other)`).
+
+        Returns:
+            np.ndarray: steam ids, by decreasing score (the game itself excluded)
+            np.ndarray: their scores
+        """
+        node = self.nodes_of(steam_id)[0]
+        if node < 0:
+            return np.zeros(0, dtype=self.ids.dtype), np.zeros(0)
+        first = np.arange(self.indptr[node], self.indptr[node + 1])
+        positions, owners = gather(self.indptr, self.indices[first].astype(np.int64))
+        path_weights = self.weights[first][owners].astype(np.float64) * self.weights[positions]
+        scores = np.bincount(self.indices[positions], weights=path_weights, minlength=self.num_nodes)
+        scores[node] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        best = candidates[np.argsort(-scores[candidates], kind="stable")[:top]]
+        return self.ids[best], scores[best]
+
+
+    def pagerank(self, damping: float = 0.85, weighted: bool = True, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+        """
+        PageRank by power iteration; the rank of nodes without out-edges is spread evenly.
+
+        Returns:
+            np.ndarray: rank of every node (in `ids` order), summing to 1
+        """
+        n = self.num_nodes
+        if n == 0:
+            return np.zeros(0)
+        degree = np.diff(self.indptr)
+        sources = np.repeat(np.arange(n), degree)
+        weights = np.asarray(self.weights, dtype=np.float64) if weighted else np.ones(self.num_edges)
+        out_weight = np.bincount(sources, weights=weights, minlength=n)
+        dangling = out_weight == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            edge_share = np.nan_to_num(weights / out_weight[sources])
+
+        rank = np.full(n, 1 / n)
+        for iteration in range(max_iter):
+            incoming = np.bincount(self.indices, weights=rank[sources] * edge_share, minlength=n)
+            new_rank = (1 - damping) / n + damping * (incoming + rank[dangling].sum() / n)
+            change = np.abs(new_rank - rank).sum()
+            rank = new_rank
+            if change < tol:
+                break
+        self.log.debug(f"PageRank converged after {iteration + 1} iterations (change {change:.2e})")
+        return rank
+
+
+    def top_ranked(self, rank: np.ndarray, top: int = 20) -> tuple[np.ndarray, np.ndarray]:
+        best = np.argsort(-rank, kind="stable")[:top]
+        return self.ids[best], rank[best]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--type", nargs="+", choices=DATA_TYPES, default=["audience_overlap"], dest="data_types")
+    parser.add_argument("--output", required=True, help="folder the .npy arrays are saved to")
+    parser.add_argument("--top", type=int, default=20, help="number of top PageRank games to log")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    log = logging.getLogger(__name__)
+
+    with Session(ENGINE) as session:
+        graph = OverlapGraph.from_database(session, tuple(args.data_types))
+    graph.save(args.output)
+    log.info(f"Saved a graph of {graph.num_nodes} games and {graph.num_edges} edges to {args.output}")
+
+    steam_ids, ranks = graph.top_ranked(graph.pagerank(), args.top)
+    for steam_id, rank in zip(steam_ids, ranks):
+        log.info(f"{steam_id}\t{rank:.6f}")
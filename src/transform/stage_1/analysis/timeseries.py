@@ -0,0 +1,274 @@
+"""
+Aligns the per-game time series of the three player/engagement sources on a common
+daily, weekly or monthly grid:
+    - steamcharts CCU (`steamcharts_ccu`, ms timestamps, hourly to daily points)
+    - Gamalytic `history` (`gamalytics_history_series`, or the `gamalytics_history` rows of
+      games without a series, ms timestamps, about daily)
+    - Steam review histograms (`steam_review_histograms`, unix seconds, weekly or monthly rollups)
+
+Every source is read into flat NumPy arrays for many games at once (the `readers.history`
+layout) and resampled with sort + `reduceat`, without a Python loop over games or points.
+The result is a long panel: one entry per (game, period) that any source has data for,
+with NaN where a source has none.
+
+Usage (from `src/transform/stage_1`):
+    python -m analysis.timeseries --freq week --output ./data/transformed/panel_week.npz
+"""
+import argparse
+import logging
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.db import ENGINE
+from models.gamalytics import GamalyticsHistory
+from models.steam import SteamReviewHistogram
+from models.steamcharts import SteamChartsCCU
+from readers.history import ID_CHUNK_SIZE, MISSING_INT, read_histories
+
+FREQS = ("day", "week", "month")
+
+# panel column -> (source, value column, aggregation within a period)
+# `players` is a level (averaged), `reviews` and `sales` are running totals (last value),
+# the review histogram counts are per rollup (summed)
+PANEL_COLUMNS = {
+    "ccu_mean": ("ccu", "players", "mean"),
+    "ccu_peak": ("ccu", "players", "max"),
+    "gamalytic_players": ("gamalytic", "players", "mean"),
+    "gamalytic_reviews": ("gamalytic", "reviews", "last"),
+    "gamalytic_sales": ("gamalytic", "sales", "last"),
+    "reviews_up": ("reviews", "recommendationsUp", "sum"),
+    "reviews_down": ("reviews", "recommendationsDown", "sum"),
+}
+
+
+def period_of(seconds: np.ndarray, freq: str) -> np.ndarray:
+    """
+    Returns:
+        np.ndarray: `datetime64[D]` start of the period of each unix timestamp (weeks start on Monday)
+    """
+    days = np.asarray(seconds, dtype=np.int64).astype("datetime64[s]").astype("datetime64[D]")
+    if freq == "day":
+        return days
+    if freq == "week":
+        # 1970-01-01 was a Thursday, day 4 the first Monday
+        day_numbers = days.astype(np.int64)
+        return ((day_numbers - 4) // 7 * 7 + 4).astype("datetime64[D]")
+    if freq == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unknown frequency: {freq}")
+
+
+def aggregate(keys: np.ndarray, times: np.ndarray, values: np.ndarray, how: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregates `values` per key, ignoring NaN values.
+
+    Args:
+        keys (np.ndarray): int64 (game, period) key of each point
+        times (np.ndarray): timestamp of each point, orders the points for "last"
+        values (np.ndarray): value of each point
+        how (str): "mean", "max", "sum" or "last"
+
+    Returns:
+        np.ndarray: sorted unique keys
+        np.ndarray: float64 aggregate of each key
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    keys, times, values = keys[valid], times[valid], values[valid]
+    if len(keys) == 0:
+        return keys, values
+
+    order = np.lexsort((times, keys))
+    keys, values = keys[order], values[order]
+    unique_keys, starts = np.unique(keys, return_index=True)
+    if how == "sum":
+        result = np.add.reduceat(values, starts)
+    elif how == "mean":
+        result = np.add.reduceat(values, starts) / np.diff(np.append(starts, len(keys)))
+    elif how == "max":
+        result = np.maximum.reduceat(values, starts)
+    elif how == "last":
+        result = values[np.append(starts[1:], len(keys)) - 1]
+    else:
+        raise ValueError(f"Unknown aggregation: {how}")
+    return unique_keys, result
+
+
+def read_table(session, table, id_column, columns: list, steam_ids: list = None) -> dict:
+    """
+    Reads `columns` of a row table for many games at once, as flat arrays sorted by game.
+    """
+    query = select(id_column, *columns).order_by(id_column)
+    if steam_ids is None:
+        rows = session.execute(query).all()
+    else:
+        steam_ids = sorted(set(steam_ids))
+        rows = []
+        for i in range(0, len(steam_ids), ID_CHUNK_SIZE):
+            rows += session.execute(query.where(id_column.in_(steam_ids[i : i + ID_CHUNK_SIZE]))).all()
+
+    arrays = {"steamId": np.asarray([row[0] for row in rows], dtype=np.int64)}
+    for i, column in enumerate(columns, start=1):
+        arrays[column.key] = np.asarray([row[i] for row in rows], dtype=np.float64)  # NULL -> NaN
+    return arrays
+
+
+def read_gamalytic(session, steam_ids: list = None) -> dict:
+    """
+    Reads the Gamalytic history from `gamalytics_history_series`, and from the
+    `gamalytics_history` rows for the games without a series (the "rows" history mode and
+    the DuckDB loader only fill the latter).
+    """
+    columns = ("players", "reviews", "sales")
+    history = read_histories(session, steam_ids, ["timeStamp", *columns])
+    gamalytic = {"steamId": history["steamId"], "seconds": history["timeStamp"] // 1000}
+    for column in columns:
+        values = history[column].astype(np.float64)
+        if history[column].dtype.kind == "i":
+            values[history[column] == MISSING_INT] = np.nan
+        gamalytic[column] = values
+
+    rows = read_table(session, GamalyticsHistory, GamalyticsHistory.steamId,
+                      [GamalyticsHistory.timeStamp, *(getattr(GamalyticsHistory, c) for c in columns)], steam_ids)
+    missing = ~np.isin(rows["steamId"], history["ids"])
+    rows["seconds"] = rows.pop("timeStamp") // 1000
+    if not missing.any():
+        return gamalytic
+
+    order = np.argsort(np.concatenate((gamalytic["steamId"], rows["steamId"][missing])), kind="stable")
+    return {name: np.concatenate((gamalytic[name], rows[name][missing]))[order] for name in gamalytic}
+
+
+def read_sources(session, steam_ids: list = None) -> dict:
+    """
+    Returns:
+        dict: source -> flat arrays with `steamId`, `seconds` (unix time) and the value columns
+    """
+    ccu = read_table(session, SteamChartsCCU, SteamChartsCCU.appid,
+                     [SteamChartsCCU.timeStamp, SteamChartsCCU.players], steam_ids)
+    ccu["seconds"] = ccu.pop("timeStamp") // 1000
+
+    reviews = read_table(session, SteamReviewHistogram, SteamReviewHistogram.appid,
+                         [SteamReviewHistogram.date, SteamReviewHistogram.recommendationsUp,
+                          SteamReviewHistogram.recommendationsDown], steam_ids)
+    reviews["seconds"] = reviews.pop("date")
+
+    return {"ccu": ccu, "gamalytic": read_gamalytic(session, steam_ids), "reviews": reviews}
+
+
+def align(sources: dict, freq: str = "week", columns: dict = None) -> dict:
+    """
+    Resamples every source onto the `freq` grid and joins them into a long panel.
+
+    Args:
+        sources (dict): output of `read_sources` (or arrays in the same layout)
+        freq (str): "day", "week" or "month"
+        columns (dict): panel columns to build (default: `PANEL_COLUMNS`)
+
+    Returns:
+        dict: name -> NumPy array, all of the same length and sorted by (`steamId`, `period`):
+            `steamId`, `period` (datetime64[D] period start) and one float64 array per column
+    """
+    columns = columns or PANEL_COLUMNS
+    if freq not in FREQS:
+        raise ValueError(f"Unknown frequency: {freq}")
+
+    # (game, period) -> one int64 key, periods counted in days from the earliest point
+    known_sources, periods = {}, {}
+    for name, arrays in sources.items():
+        known = ~np.isnan(np.asarray(arrays["seconds"], dtype=np.float64))
+        known_sources[name] = {column: np.asarray(values)[known] for column, values in arrays.items()}
+        periods[name] = period_of(known_sources[name]["seconds"], freq).astype(np.int64)
+    sources = known_sources
+
+    all_periods = np.concatenate([np.zeros(0, dtype=np.int64), *periods.values()])
+    if len(all_periods) == 0:
+        return {"steamId": np.zeros(0, dtype=np.int64), "period": np.zeros(0, dtype="datetime64[D]"),
+                **{column: np.zeros(0) for column in columns}}
+    first_period = all_periods.min()
+    span = all_periods.max() - first_period + 1
+
+    keys = {
+        name: arrays["steamId"].astype(np.int64) * span + (periods[name] - first_period)
+        for name, arrays in sources.items()
+    }
+    aggregates = {
+        column: aggregate(keys[source], sources[source]["seconds"], sources[source][value_column], how)
+        for column, (source, value_column, how) in columns.items()
+        if source in sources
+    }
+
+    panel_keys = np.unique(np.concatenate([column_keys for column_keys, _ in aggregates.values()]))
+    panel = {
+        "steamId": panel_keys // span,
+        "period": (panel_keys % span + first_period).astype("datetime64[D]"),
+    }
+    for column in columns:
+        values = np.full(len(panel_keys), np.nan)
+        if column in aggregates:
+            column_keys, column_values = aggregates[column]
+            values[np.searchsorted(panel_keys, column_keys)] = column_values
+        panel[column] = values
+    return panel
+
+
+def to_dense(panel: dict, column: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pivots one panel column into a games x periods matrix (NaN where missing). Meant for
+    subsets of games, the matrix spans every period of the panel.
+
+    Returns:
+        np.ndarray: steam ids (rows)
+        np.ndarray: periods (columns)
+        np.ndarray: float64 matrix
+    """
+    ids, rows = np.unique(panel["steamId"], return_inverse=True)
+    periods, cols = np.unique(panel["period"], return_inverse=True)
+    matrix = np.full((len(ids), len(periods)), np.nan)
+    matrix[rows, cols] = panel[column]
+    return ids, periods, matrix
+
+
+def per_game_correlation(panel: dict, x: str = "gamalytic_players", y: str = "ccu_mean") -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pearson correlation of two panel columns per game, over the periods where both are
+    known, e.g. to assess the Gamalytic player estimates against steamcharts.
+
+    Returns:
+        np.ndarray: steam ids
+        np.ndarray: correlation per game (NaN with fewer than 2 shared periods or no variance)
+        np.ndarray: number of shared periods per game
+    """
+    both = ~np.isnan(panel[x]) & ~np.isnan(panel[y])
+    ids, index = np.unique(panel["steamId"][both], return_inverse=True)
+    a, b = panel[x][both], panel[y][both]
+
+    n = np.bincount(index, minlength=len(ids)).astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_a = np.bincount(index, a, len(ids)) / n
+        mean_b = np.bincount(index, b, len(ids)) / n
+        da, db = a - mean_a[index], b - mean_b[index]
+        covariance = np.bincount(index, da * db, len(ids))
+        correlation = covariance / np.sqrt(np.bincount(index, da * da, len(ids)) * np.bincount(index, db * db, len(ids)))
+    correlation[n < 2] = np.nan
+    return ids, correlation, n.astype(np.int64)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--freq", choices=FREQS, default="week")
+    parser.add_argument("--output", required=True, help=".npz file the panel is saved to")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+    log = logging.getLogger(__name__)
+
+    with Session(ENGINE) as session:
+        sources = read_sources(session)
+    log.info("Read " + ", ".join(f"{len(arrays['steamId'])} {name} points" for name, arrays in sources.items()))
+
+    panel = align(sources, args.freq)
+    np.savez(args.output, **panel)
+    log.info(f"Saved {len(panel['steamId'])} (game, {args.freq}) rows of {len(np.unique(panel['steamId']))} games to {args.output}")
@@ -0,0 +1,104 @@
+"""
+Compares the SQLite and DuckDB stage_1 backends: bulk ingest of the same Gamalytic JSONL
+files, then the aggregation queries we run over history/overlap/attribute tables.
+
+Usage (from `src/transform/stage_1`):
+    python -m benchmarks.engines --games 5000 --history 150
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from models.db import get_engine
+from loaders.gamalytics import GamalyticsDataLoader
+from loaders.duckdb_gamalytics import DuckDBGamalyticsLoader
+from benchmarks.synthetic import GamalyticGenerator
+
+YEAR_MS = 31556952000
+MONTH_MS = 2629746000
+
+# plain SQL understood by both engines
+QUERIES = [
+    (
+        "avg players by release year",
+        "SELECT CAST(m.releaseDate / {YEAR_MS} AS INTEGER) AS year, avg(h.players) "
+        "FROM gamalytics_history h JOIN gamalytics_main m ON m.steamId = h.steamId GROUP BY 1 ORDER BY 1",
+    ),
+    (
+        "total sales per month",
+        "SELECT CAST(timeStamp / {MONTH_MS} AS INTEGER) AS month, sum(sales) "
+        "FROM gamalytics_history GROUP BY 1 ORDER BY 1",
+    ),
+    (
+        "peak players per game (top 100)",
+        "SELECT steamId, max(players) AS peak FROM gamalytics_history GROUP BY steamId ORDER BY peak DESC LIMIT 100",
+    ),
+    (
+        "most overlapped games (top 100)",
+        "SELECT relatedSteamId, count(*) AS n, avg(link) FROM gamalytics_audience_overlap "
+        "WHERE dataType = 'audience_overlap' GROUP BY relatedSteamId ORDER BY n DESC LIMIT 100",
+    ),
+    (
+        "revenue by tag",
+        "SELECT v.value, sum(m.revenue) FROM gamalytics_attributes a "
+        "JOIN gamalytics_attribute_values v ON v.attributeKey = a.attributeKey "
+        "JOIN gamalytics_main m ON m.steamId = a.steamId "
+        "WHERE v.attributeType = 'tag' GROUP BY v.value",
+    ),
+]
+
+
+def run_benchmark(n_games: int, history_length: int, repeats: int) -> None:
+    log = logging.getLogger(__name__)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_folder = os.path.join(tmp, "gamalytic")
+        GamalyticGenerator(history_median=history_length).write(data_folder, n_games)
+        log.info(f"Wrote {n_games} synthetic Gamalytic records")
+
+        results = {}
+        for backend, loader_class in (("sqlite", GamalyticsDataLoader), ("duckdb", DuckDBGamalyticsLoader)):
+            db_path = os.path.join(tmp, f"stage_1.{backend}")
+            engine = get_engine(backend, db_path)
+
+            start = time.perf_counter()
+            loader = loader_class(data_folder, engine=engine)
+            loader.load_data()
+            loader.close()
+            ingest = time.perf_counter() - start
+
+            timings = {}
+            with engine.connect() as connection:
+                for name, sql in QUERIES:
+                    sql = sql.format(YEAR_MS=YEAR_MS, MONTH_MS=MONTH_MS)
+                    start = time.perf_counter()
+                    for _ in range(repeats):
+                        connection.exec_driver_sql(sql).fetchall()
+                    timings[name] = (time.perf_counter() - start) / repeats
+            engine.dispose()
+
+            results[backend] = (ingest, os.path.getsize(db_path), timings)
+
+    for backend, (ingest, size, _) in results.items():
+        log.info(f"[{backend}] ingest {ingest:.1f}s, size {size / 2**20:.1f} MiB")
+    log.info(f"{'query':<40}{'sqlite (ms)':>14}{'duckdb (ms)':>14}{'speedup':>10}")
+    for name, _ in QUERIES:
+        sqlite_time, duckdb_time = results["sqlite"][2][name], results["duckdb"][2][name]
+        log.info(
+            f"{name:<40}{sqlite_time * 1000:>14.2f}{duckdb_time * 1000:>14.2f}"
+            + f"{sqlite_time / max(duckdb_time, 1e-9):>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--history", type=int, default=150, help="median history points per game")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    run_benchmark(args.games, args.history, args.repeats)
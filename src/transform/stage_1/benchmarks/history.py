@@ -0,0 +1,102 @@
+"""
+Compares DB size and read latency of Gamalytic history stored as rows
+(`gamalytics_history`) versus packed per-game arrays (`gamalytics_history_series`).
+
+Usage (from `src/transform/stage_1`):
+    python -m benchmarks.history --games 20000 --history 150
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+
+from models.db import BASE
+from models.gamalytics import GamalyticsHistory, GamalyticsHistorySeries
+from readers.history import pack_history, read_history, read_histories
+from benchmarks.queries import generate_rows
+
+
+def build_database(db_path: str, history_rows: list, packed: bool) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    BASE.metadata.create_all(engine, tables=[GamalyticsHistory.__table__, GamalyticsHistorySeries.__table__])
+    with Session(engine) as session:
+        if packed:
+            for steam_id, entries in itertools.groupby(history_rows, key=lambda row: row["steamId"]):
+                session.add(GamalyticsHistorySeries(**pack_history(steam_id, list(entries))))
+        else:
+            session.execute(GamalyticsHistory.__table__.insert(), history_rows)
+        session.commit()
+        session.execute(text("VACUUM"))
+    engine.dispose()
+
+
+def read_rows(session, steam_ids: list) -> dict:
+    rows = session.execute(
+        select(GamalyticsHistory.steamId, GamalyticsHistory.timeStamp, GamalyticsHistory.players)
+        .where(GamalyticsHistory.steamId.in_(steam_ids))
+        .order_by(GamalyticsHistory.steamId, GamalyticsHistory.timeStamp)
+    ).all()
+    steam_id, time_stamp, players = zip(*rows) if rows else ((), (), ())
+    return {
+        "steamId": np.asarray(steam_id), "timeStamp": np.asarray(time_stamp), "players": np.asarray(players)
+    }
+
+
+def run_benchmark(n_games: int, history_length: int, batch: int, repeats: int) -> None:
+    log = logging.getLogger(__name__)
+    history_rows = generate_rows(n_games, history_length)["gamalytics_history"]
+    ids = sorted({row["steamId"] for row in history_rows})
+    log.info(f"Generated {len(history_rows)} history points for {n_games} games")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for packed in (False, True):
+            name = "packed" if packed else "rows"
+            db_path = os.path.join(tmp, f"{name}.db")
+            start = time.perf_counter()
+            build_database(db_path, history_rows, packed)
+            log.info(f"[{name}] built in {time.perf_counter() - start:.1f}s, "
+                     + f"size {os.path.getsize(db_path) / 2**20:.1f} MiB")
+
+            random.seed(1)
+            engine = create_engine(f"sqlite:///{db_path}")
+            with Session(engine) as session:
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    steam_id = random.choice(ids)
+                    if packed:
+                        read_history(session, steam_id, ["timeStamp", "players"])
+                    else:
+                        read_rows(session, [steam_id])
+                single = (time.perf_counter() - start) / repeats
+
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    steam_ids = random.sample(ids, min(batch, len(ids)))
+                    if packed:
+                        read_histories(session, steam_ids, ["timeStamp", "players"])
+                    else:
+                        read_rows(session, steam_ids)
+                many = (time.perf_counter() - start) / repeats
+            engine.dispose()
+
+            log.info(f"[{name}] one game: {single * 1000:.2f} ms, {batch} games: {many * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--history", type=int, default=150, help="mean history points per game")
+    parser.add_argument("--batch", type=int, default=1000, help="games per multi-game read")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    run_benchmark(args.games, args.history, args.batch, args.repeats)
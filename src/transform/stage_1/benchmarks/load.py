@@ -0,0 +1,86 @@
+"""
+Loads synthetic Gamalytic JSONL into a scratch stage_1 database and reports records/sec,
+rows/sec per table, peak RSS and the final database size.
+
+Usage (from `src/transform/stage_1`):
+    python -m benchmarks.load --games 10000
+    python -m benchmarks.load --data ./data/synthetic/gamalytic/ --backend duckdb
+"""
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+
+from sqlalchemy import inspect, text
+
+from models.db import get_engine
+from loaders.gamalytics import GamalyticsDataLoader
+from loaders.duckdb_gamalytics import DuckDBGamalyticsLoader
+from benchmarks.synthetic import GamalyticGenerator
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_benchmark(data_folder: str, backend: str, history_mode: str) -> dict:
+    log = logging.getLogger(__name__)
+    n_records = 0
+    for file_name in os.listdir(data_folder):
+        if file_name.endswith(".jsonl"):
+            with open(os.path.join(data_folder, file_name), mode="r") as f:
+                n_records += sum(1 for _ in f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, f"stage_1.{backend}")
+        engine = get_engine(backend, db_path)
+
+        start = time.perf_counter()
+        if backend == "duckdb":
+            loader = DuckDBGamalyticsLoader(data_folder, engine)
+        else:
+            loader = GamalyticsDataLoader(data_folder, history_mode=history_mode, engine=engine)
+        loader.load_data()
+        loader.close()
+        elapsed = time.perf_counter() - start
+
+        with engine.connect() as connection:
+            row_counts = {
+                table: connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+                for table in sorted(inspect(engine).get_table_names())
+            }
+        engine.dispose()
+        db_size = os.path.getsize(db_path)
+
+    log.info(f"Loaded {n_records} records in {elapsed:.1f}s ({n_records / elapsed:.1f} records/s)")
+    for table, count in row_counts.items():
+        if count:
+            log.info(f"    {table:<32}{count:>12} rows {count / elapsed:>12.0f} rows/s")
+    log.info(f"Peak RSS {peak_rss_mib():.0f} MiB, database size {db_size / 2**20:.1f} MiB")
+
+    return {
+        "records": n_records, "seconds": elapsed, "row_counts": row_counts,
+        "peak_rss_mib": peak_rss_mib(), "db_size": db_size,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="existing folder of Gamalytic JSONL (default: generate into a temp folder)")
+    parser.add_argument("--games", type=int, default=10000, help="games to generate")
+    parser.add_argument("--history", type=float, default=150, help="median history points per generated game")
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"], default="sqlite")
+    parser.add_argument("--history-mode", choices=["rows", "packed"], default="rows")
+    args = parser.parse_args()
+
+    if args.data:
+        run_benchmark(args.data, args.backend, args.history_mode)
+    else:
+        with tempfile.TemporaryDirectory() as data_folder:
+            GamalyticGenerator(history_median=args.history).write(data_folder, args.games)
+            run_benchmark(data_folder, args.backend, args.history_mode)
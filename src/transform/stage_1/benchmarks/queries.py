@@ -0,0 +1,259 @@
+"""
+Compares typical dashboard queries on the original stage_1 schema (surrogate ids, no
+indexes, attribute strings per row) against the current one (clustered composite keys,
+covering indexes, dictionary-encoded attributes).
+
+Both databases are filled with the same synthetic rows so the numbers are comparable.
+
+Usage (from `src/transform/stage_1`):
+    python -m benchmarks.queries --games 20000 --history 150
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from models.db import BASE
+import models.gamalytics  # noqa: F401 (registers tables on BASE)
+
+
+# The stage_1 schema as it was before composite keys/indexes were introduced
+LEGACY_SCHEMA = """
+CREATE TABLE gamalytics_main (
+    steamId INTEGER PRIMARY KEY, name TEXT, description TEXT, price FLOAT, reviews INTEGER,
+    reviewsSteam INTEGER, followers INTEGER, avgPlaytime FLOAT, reviewScore INTEGER,
+    releaseDate INTEGER, EAReleaseDate INTEGER, firstReleaseDate INTEGER,
+    earlyAccessExitDate INTEGER, unreleased BOOLEAN, earlyAccess BOOLEAN, copiesSold INTEGER,
+    revenue FLOAT, totalRevenue FLOAT, players INTEGER, owners INTEGER, steamPercent FLOAT,
+    wishlists INTEGER, itemType TEXT, itemCode INTEGER
+);
+CREATE TABLE gamalytics_history (
+    historyId INTEGER PRIMARY KEY AUTOINCREMENT, steamId INTEGER, timeStamp INTEGER,
+    reviews INTEGER, price FLOAT, score FLOAT, players FLOAT, avgPlaytime FLOAT,
+    sales INTEGER, revenue FLOAT
+);
+CREATE TABLE gamalytics_audience_overlap (
+    overlapId INTEGER PRIMARY KEY AUTOINCREMENT, steamId INTEGER, dataType TEXT,
+    relatedSteamId INTEGER, link FLOAT, relatedName TEXT, relatedReleaseDate INTEGER,
+    relatedPrice FLOAT, relatedGenres TEXT, relatedCopiesSold INTEGER, relatedRevenue FLOAT
+);
+CREATE TABLE gamalytics_dlc (
+    dlcId INTEGER PRIMARY KEY AUTOINCREMENT, steamId INTEGER, dlcSteamId INTEGER, dlcName TEXT,
+    dlcReleaseDate INTEGER, dlcPrice FLOAT, dlcGenres TEXT, dlcCopiesSold INTEGER, dlcRevenue FLOAT
+);
+CREATE TABLE gamalytics_attributes (
+    attributeId INTEGER PRIMARY KEY AUTOINCREMENT, steamId INTEGER, attributeType TEXT, value TEXT
+);
+"""
+
+TAGS = [f"Tag {i}" for i in range(400)]
+DAY = 24 * 60 * 60 * 1000  # gamalytic timestamps are in ms
+
+# (name, legacy sql, current sql or None if unchanged, parameter generator)
+QUERIES = [
+    (
+        "history of one game",
+        "SELECT timeStamp, players, revenue FROM gamalytics_history "
+        "WHERE steamId = ? ORDER BY timeStamp",
+        None,
+        lambda ids: (random.choice(ids),),
+    ),
+    (
+        "top games with tag",
+        "SELECT m.steamId, m.name, m.revenue FROM gamalytics_attributes a "
+        "JOIN gamalytics_main m ON m.steamId = a.steamId "
+        "WHERE a.attributeType = 'tag' AND a.value = ? ORDER BY m.revenue DESC LIMIT 50",
+        "SELECT m.steamId, m.name, m.revenue FROM gamalytics_attribute_values v "
+        "JOIN gamalytics_attributes a ON a.attributeKey = v.attributeKey "
+        "JOIN gamalytics_main m ON m.steamId = a.steamId "
+        "WHERE v.attributeType = 'tag' AND v.value = ? ORDER BY m.revenue DESC LIMIT 50",
+        lambda ids: (random.choice(TAGS),),
+    ),
+    (
+        "game count per tag",
+        "SELECT value, count(*) FROM gamalytics_attributes "
+        "WHERE attributeType = 'tag' GROUP BY value",
+        "SELECT v.value, a.n FROM gamalytics_attribute_values v JOIN "
+        "(SELECT attributeKey, count(*) AS n FROM gamalytics_attributes GROUP BY attributeKey) a "
+        "ON a.attributeKey = v.attributeKey WHERE v.attributeType = 'tag'",
+        lambda ids: (),
+    ),
+    (
+        "audience overlap of one game",
+        "SELECT relatedSteamId, link FROM gamalytics_audience_overlap "
+        "WHERE steamId = ? AND dataType = 'audience_overlap' ORDER BY link DESC",
+        None,
+        lambda ids: (random.choice(ids),),
+    ),
+    (
+        "games overlapping with one game",
+        "SELECT steamId, link FROM gamalytics_audience_overlap "
+        "WHERE relatedSteamId = ? AND dataType = 'audience_overlap'",
+        None,
+        lambda ids: (random.choice(ids),),
+    ),
+    (
+        "DLC of one game",
+        "SELECT dlcSteamId, dlcName, dlcRevenue FROM gamalytics_dlc WHERE steamId = ?",
+        None,
+        lambda ids: (random.choice(ids),),
+    ),
+    (
+        "latest snapshot for games released in a window",
+        "SELECT h.steamId, h.timeStamp, h.players FROM gamalytics_main m "
+        "JOIN gamalytics_history h ON h.steamId = m.steamId "
+        "WHERE m.releaseDate BETWEEN ? AND ? "
+        "AND h.timeStamp = (SELECT max(timeStamp) FROM gamalytics_history WHERE steamId = m.steamId)",
+        None,
+        lambda ids: (1_500_000_000_000, 1_500_000_000_000 + 30 * DAY),
+    ),
+]
+
+
+def generate_rows(n_games: int, history_length: int, seed: int = 0) -> dict:
+    """
+    Generates synthetic rows for each benchmarked table.
+
+    Args:
+        n_games (int): number of games
+        history_length (int): mean number of history points per game
+        seed (int): random seed
+
+    Returns:
+        dict: table name -> list of row dicts
+    """
+    rng = random.Random(seed)
+    ids = rng.sample(range(10, 3_000_000), n_games)
+    rows = {
+        "gamalytics_main": [], "gamalytics_history": [], "gamalytics_audience_overlap": [],
+        "gamalytics_dlc": [], "gamalytics_attributes": [],
+    }
+
+    for steam_id in ids:
+        release = 1_300_000_000_000 + rng.randrange(0, 4000) * DAY
+        rows["gamalytics_main"].append({
+            "steamId": steam_id, "name": f"Game {steam_id}",
+            "releaseDate": release, "revenue": rng.lognormvariate(10, 3),
+        })
+
+        for t in range(rng.randint(1, 2 * history_length)):
+            rows["gamalytics_history"].append({
+                "steamId": steam_id, "timeStamp": release + t * DAY,
+                "reviews": rng.randrange(0, 10000), "price": 19.99, "score": rng.random() * 100,
+                "players": rng.random() * 1000, "avgPlaytime": rng.random() * 20,
+                "sales": rng.randrange(0, 100000), "revenue": rng.random() * 1e5,
+            })
+
+        for data_type in ("audience_overlap", "also_played"):
+            for related in rng.sample(ids, 20):
+                rows["gamalytics_audience_overlap"].append({
+                    "steamId": steam_id, "dataType": data_type,
+                    "relatedSteamId": related, "link": rng.random(),
+                })
+
+        for dlc in range(rng.choice([0, 0, 0, 1, 2, 5])):
+            rows["gamalytics_dlc"].append({
+                "steamId": steam_id, "dlcSteamId": steam_id + dlc + 1,
+                "dlcName": f"DLC {dlc}", "dlcRevenue": rng.random() * 1e4,
+            })
+
+        for tag in rng.sample(TAGS, 15):
+            rows["gamalytics_attributes"].append({
+                "steamId": steam_id, "attributeType": "tag", "value": tag,
+            })
+
+    return rows
+
+
+def encode_attributes(rows: dict) -> dict:
+    """
+    Converts the legacy `gamalytics_attributes` rows into dictionary + bridge rows.
+    """
+    keys = {}
+    bridge = []
+    for row in rows["gamalytics_attributes"]:
+        key = keys.setdefault((row["attributeType"], row["value"]), len(keys) + 1)
+        bridge.append({"steamId": row["steamId"], "attributeKey": key})
+
+    values = [
+        {"attributeKey": key, "attributeType": attribute_type, "value": value}
+        for (attribute_type, value), key in keys.items()
+    ]
+    return {**rows, "gamalytics_attribute_values": values, "gamalytics_attributes": bridge}
+
+
+def populate(db_path: str, rows: dict) -> None:
+    connection = sqlite3.connect(db_path)
+    for table, table_rows in rows.items():
+        columns = list(table_rows[0].keys())
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            + f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        connection.executemany(sql, (tuple(row[c] for c in columns) for row in table_rows))
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+
+def time_queries(db_path: str, ids: list, repeats: int, legacy: bool) -> dict:
+    connection = sqlite3.connect(db_path)
+    timings = {}
+    for name, legacy_sql, current_sql, make_params in QUERIES:
+        sql = legacy_sql if legacy or current_sql is None else current_sql
+        random.seed(1)  # same parameters for both schemas
+        start = time.perf_counter()
+        for _ in range(repeats):
+            connection.execute(sql, make_params(ids)).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeats
+    connection.close()
+    return timings
+
+
+def run_benchmark(n_games: int, history_length: int, repeats: int) -> None:
+    log = logging.getLogger(__name__)
+    rows = generate_rows(n_games, history_length)
+    ids = [row["steamId"] for row in rows["gamalytics_main"]]
+    log.info(f"Generated {sum(len(r) for r in rows.values())} rows for {n_games} games")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        current_path = os.path.join(tmp, "current.db")
+
+        connection = sqlite3.connect(legacy_path)
+        connection.executescript(LEGACY_SCHEMA)
+        connection.close()
+        BASE.metadata.create_all(create_engine(f"sqlite:///{current_path}"))
+
+        for path, schema_rows in ((legacy_path, rows), (current_path, encode_attributes(rows))):
+            start = time.perf_counter()
+            populate(path, schema_rows)
+            log.info(f"Populated {os.path.basename(path)} in {time.perf_counter() - start:.1f}s "
+                     + f"({os.path.getsize(path) / 2**20:.1f} MiB)")
+
+        legacy = time_queries(legacy_path, ids, repeats, legacy=True)
+        current = time_queries(current_path, ids, repeats, legacy=False)
+
+    log.info(f"{'query':<50}{'legacy (ms)':>14}{'current (ms)':>14}{'speedup':>10}")
+    for name, *_ in QUERIES:
+        log.info(
+            f"{name:<50}{legacy[name] * 1000:>14.2f}{current[name] * 1000:>14.2f}"
+            + f"{legacy[name] / max(current[name], 1e-9):>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--history", type=int, default=150, help="mean history points per game")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    run_benchmark(args.games, args.history, args.repeats)
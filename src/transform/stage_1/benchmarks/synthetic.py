@@ -0,0 +1,195 @@
+"""
+Writes synthetic Gamalytic-shaped JSONL (`data_{start}_{end}.jsonl` shards, like
+`GamalyticScraper`) for load benchmarks. Records use the API's field names (e.g. `steamId`,
+`name`, `genres` lists in the overlap and DLC entries), so loads go through the same
+field mapping as real data.
+
+Usage (from `src/transform/stage_1`):
+    python -m benchmarks.synthetic ./data/synthetic/gamalytic/ --games 100000
+"""
+import argparse
+import json
+import logging
+import os
+import random
+
+DAY_MS = 24 * 60 * 60 * 1000
+TAGS = [f"Tag {i}" for i in range(440)]
+GENRES = ["Action", "Adventure", "Casual", "Indie", "RPG", "Simulation", "Strategy", "Sports", "Racing"]
+FEATURES = ["Single-player", "Multi-player", "Co-op", "Steam Achievements", "Steam Cloud", "Full controller support"]
+LANGUAGES = ["English", "French", "German", "Spanish - Spain", "Japanese", "Korean", "Russian", "Simplified Chinese"]
+PLAYTIME_RANGES = ["0-1h", "1-2h", "2-5h", "5-10h", "10-20h", "20-50h", "50h+"]
+
+
+class GamalyticGenerator:
+    def __init__(
+        self,
+        history_median: float = 150,
+        history_sigma: float = 1.0,
+        overlap_count: int = 20,
+        also_played_count: int = 20,
+        dlc_mean: float = 0.8,
+        max_steam_id: int = 3_000_000,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            history_median (float): median number of history points per game (log-normal)
+            history_sigma (float): log-normal sigma of the history length
+            overlap_count (int): `audienceOverlap` entries per game
+            also_played_count (int): `alsoPlayed` entries per game
+            dlc_mean (float): mean DLC count per game (geometric)
+            max_steam_id (int): steam ids are drawn from [10, max_steam_id)
+            seed (int): random seed
+        """
+        self.history_median = history_median
+        self.history_sigma = history_sigma
+        self.overlap_count = overlap_count
+        self.also_played_count = also_played_count
+        self.dlc_mean = dlc_mean
+        self.max_steam_id = max_steam_id
+        self.random = random.Random(seed)
+
+
+    def steam_ids(self, n_games: int) -> list:
+        return sorted(self.random.sample(range(10, self.max_steam_id), n_games))
+
+
+    def related(self, steam_ids: list, count: int) -> list:
+        rng = self.random
+        return [
+            {
+                "steamId": str(related_id),
+                "link": round(rng.random(), 4),
+                "name": f"Game {related_id}",
+                "releaseDate": 1_300_000_000_000 + rng.randrange(0, 4000) * DAY_MS,
+                "price": rng.choice([0, 4.99, 9.99, 19.99, 29.99, 59.99]),
+                "genres": rng.sample(GENRES, 2),
+                "copiesSold": int(rng.lognormvariate(8, 2.5)),
+                "revenue": round(rng.lognormvariate(10, 3), 2),
+            }
+            for related_id in rng.sample(steam_ids, min(count, len(steam_ids)))
+        ]
+
+
+    def record(self, steam_id: int, steam_ids: list) -> dict:
+        rng = self.random
+        release = 1_300_000_000_000 + rng.randrange(0, 4000) * DAY_MS
+        price = rng.choice([0, 4.99, 9.99, 14.99, 19.99, 29.99, 59.99])
+        copies = int(rng.lognormvariate(8, 2.5))
+
+        history_length = max(1, int(rng.lognormvariate(0, self.history_sigma) * self.history_median))
+        history, reviews, sales = [], 0, 0
+        for t in range(history_length):
+            reviews += rng.randrange(0, 20)
+            sales += rng.randrange(0, 200)
+            history.append({
+                "timeStamp": release + t * DAY_MS,
+                "reviews": reviews,
+                "price": price,
+                "score": round(rng.uniform(40, 100), 1),
+                "players": round(rng.lognormvariate(4, 2), 1),
+                "avgPlaytime": round(rng.uniform(0, 40), 2),
+                "sales": sales,
+                "revenue": round(sales * price * 0.7, 2),
+            })
+
+        dlc_count = 0
+        while rng.random() < self.dlc_mean / (1 + self.dlc_mean):
+            dlc_count += 1
+
+        distribution = [rng.random() for _ in PLAYTIME_RANGES]
+        total = sum(distribution)
+
+        return {
+            "steamId": steam_id,
+            "name": f"Game {steam_id}",
+            "description": "Synthetic game " * rng.randrange(5, 40),
+            "price": price,
+            "reviews": reviews,
+            "reviewsSteam": reviews,
+            "followers": int(rng.lognormvariate(6, 2)),
+            "avgPlaytime": round(rng.uniform(0, 40), 2),
+            "reviewScore": rng.randrange(0, 100),
+            "releaseDate": release,
+            "firstReleaseDate": release,
+            "unreleased": False,
+            "earlyAccess": rng.random() < 0.1,
+            "copiesSold": copies,
+            "revenue": round(copies * price * 0.7, 2),
+            "totalRevenue": round(copies * price, 2),
+            "players": copies,
+            "owners": copies,
+            "steamPercent": round(rng.uniform(0.5, 1), 2),
+            "wishlists": int(rng.lognormvariate(7, 2)),
+            "itemType": "game",
+            "history": history,
+            "audienceOverlap": self.related(steam_ids, self.overlap_count),
+            "alsoPlayed": self.related(steam_ids, self.also_played_count),
+            "playtimeData": {
+                "median": rng.randrange(10, 3000),
+                "distribution": {r: round(p / total, 4) for r, p in zip(PLAYTIME_RANGES, distribution)},
+            },
+            "estimateDetails": {
+                "rankBased": rng.random() * copies,
+                "playtimeBased": rng.random() * copies,
+                "reviewBased": rng.random() * copies,
+            },
+            "dlc": [
+                {
+                    "steamId": str(steam_id + i + 1),
+                    "name": f"Game {steam_id} DLC {i + 1}",
+                    "releaseDate": release + rng.randrange(0, 1000) * DAY_MS,
+                    "price": rng.choice([1.99, 4.99, 9.99]),
+                    "genres": rng.sample(GENRES, 2),
+                    "copiesSold": int(rng.lognormvariate(6, 2)),
+                    "revenue": round(rng.lognormvariate(8, 2), 2),
+                }
+                for i in range(dlc_count)
+            ],
+            "tags": rng.sample(TAGS, rng.randrange(5, 20)),
+            "genres": rng.sample(GENRES, rng.randrange(1, 4)),
+            "features": rng.sample(FEATURES, rng.randrange(1, len(FEATURES))),
+            "languages": rng.sample(LANGUAGES, rng.randrange(1, len(LANGUAGES))),
+        }
+
+
+    def write(self, output_folder: str, n_games: int, records_per_file: int = 10000) -> list:
+        """
+        Writes `n_games` records, `records_per_file` per shard.
+
+        Returns:
+            list: paths of the written shards
+        """
+        os.makedirs(output_folder, exist_ok=True)
+        steam_ids = self.steam_ids(n_games)
+        file_paths = []
+        for start in range(0, n_games, records_per_file):
+            end = min(start + records_per_file, n_games) - 1
+            file_path = os.path.join(output_folder, f"data_{start}_{end}.jsonl")
+            with open(file_path, mode="w") as f:
+                for steam_id in steam_ids[start : end + 1]:
+                    f.write(json.dumps(self.record(steam_id, steam_ids)) + "\n")
+            file_paths.append(file_path)
+        return file_paths
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_folder")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--history", type=float, default=150, help="median history points per game")
+    parser.add_argument("--history-sigma", type=float, default=1.0)
+    parser.add_argument("--overlap", type=int, default=20, help="audienceOverlap/alsoPlayed entries per game")
+    parser.add_argument("--dlc", type=float, default=0.8, help="mean DLC per game")
+    parser.add_argument("--records-per-file", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generator = GamalyticGenerator(
+        args.history, args.history_sigma, args.overlap, args.overlap, args.dlc, seed=args.seed
+    )
+    files = generator.write(args.output_folder, args.games, args.records_per_file)
+    logging.getLogger(__name__).info(f"Wrote {args.games} records into {len(files)} files in {args.output_folder}")
@@ -0,0 +1,212 @@
+"""
+Streams stage_1 tables to Hive-partitioned Parquet datasets.
+
+Layout (one dataset per table):
+    {output_dir}/{table}/{partition}={value}/part-{n}.parquet
+    {output_dir}/{table}/_common_metadata
+    {output_dir}/{table}/_metadata
+
+`gamalytics_main` is partitioned by release year, every other table with a `steamId` or
+`appid` column by range of that id. Rows are read in sorted order with a server-side cursor, so
+at most one row group is held in memory and only one file is open at a time.
+
+Usage (from `src/transform/stage_1`):
+    python -m exporters.parquet
+"""
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from itertools import groupby
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from sqlalchemy import inspect, select, Integer, SmallInteger, BigInteger, Float, Boolean, Text, String, LargeBinary
+
+from models.db import BASE, ENGINE
+import models.gamalytics, models.steam, models.steamcharts, models.hltb  # noqa: F401 (registers tables on BASE)
+
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# app id columns tables are range-partitioned by, checked in order
+PARTITION_COLUMNS = ["steamId", "appid"]
+
+# SQLAlchemy column type -> Arrow type. Checked in order, so subclasses go first.
+ARROW_TYPES = [
+    (Boolean, pa.bool_()),
+    (SmallInteger, pa.int16()),
+    (BigInteger, pa.int64()),
+    (Integer, pa.int64()),
+    (Float, pa.float64()),
+    (LargeBinary, pa.binary()),
+    (Text, pa.string()),
+    (String, pa.string()),
+]
+
+
+def arrow_schema(table) -> pa.Schema:
+    fields = []
+    for column in table.columns:
+        arrow_type = next((t for sql_type, t in ARROW_TYPES if isinstance(column.type, sql_type)), None)
+        if arrow_type is None:
+            raise TypeError(f"No Arrow type for {table.name}.{column.name} ({column.type})")
+        fields.append(pa.field(column.name, arrow_type, nullable=not column.primary_key))
+    return pa.schema(fields)
+
+
+def read_dataset(table_dir: str, columns: list = None, filter=None) -> pa.Table:
+    """
+    Reads an exported table, using `_metadata` so only matching files/row groups are read.
+
+    Example:
+        read_dataset("data/transformed/parquet/gamalytics_history",
+                     columns=["steamId", "timeStamp", "players"],
+                     filter=pyarrow.dataset.field("steamId") == 730)
+
+    Args:
+        table_dir (str): `{output_dir}/{table}`
+        columns (list): columns to read (default: all)
+        filter: `pyarrow.dataset` expression, may reference partition columns
+
+    Returns:
+        pyarrow.Table: call `.to_pandas()` for a DataFrame
+    """
+    dataset = ds.parquet_dataset(
+        os.path.join(table_dir, "_metadata"),
+        partitioning=ds.partitioning(flavor="hive"),
+    )
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+class ParquetExporter:
+    def __init__(self, engine, output_dir: str, row_group_size: int = 100_000, steam_id_range: int = 100_000):
+        """
+        Args:
+            engine: SQLAlchemy engine of the stage_1 database
+            output_dir (str): root folder of the exported datasets
+            row_group_size (int): rows per Parquet row group (also rows fetched at a time)
+            steam_id_range (int): width of each `steamId`/`appid` partition
+        """
+        self.logger = logging.getLogger(__name__)
+        self.engine = engine
+        self.output_dir = output_dir
+        self.row_group_size = row_group_size
+        self.steam_id_range = steam_id_range
+
+
+    def partitioning(self, table) -> tuple:
+        """
+        Returns:
+            str: partition column name (None if the table is not partitioned)
+            column: column the rows must be sorted by
+            function: row -> partition value
+        """
+        if table.name == "gamalytics_main":
+            def release_year(row):
+                if row.releaseDate is None:
+                    return None
+                return datetime.fromtimestamp(row.releaseDate / 1000, tz=timezone.utc).year
+            return "releaseYear", table.c.releaseDate, release_year
+
+        for name in PARTITION_COLUMNS:
+            if name in table.c:
+                def id_range(row, name=name):
+                    value = getattr(row, name)
+                    return None if value is None else value // self.steam_id_range * self.steam_id_range
+                return f"{name}Range", table.c[name], id_range
+
+        return None, None, lambda row: None
+
+
+    def export_table(self, table) -> int:
+        """
+        Exports one table to `{output_dir}/{table.name}`, replacing any previous export.
+
+        Returns:
+            int: number of rows written
+        """
+        table_dir = os.path.join(self.output_dir, table.name)
+        shutil.rmtree(table_dir, ignore_errors=True)
+        os.makedirs(table_dir)
+
+        schema = arrow_schema(table)
+        partition_name, sort_column, partition_of = self.partitioning(table)
+        order_by = [sort_column] if sort_column is not None else []
+        order_by += [c for c in table.primary_key.columns if c is not sort_column]
+        query = select(table).order_by(*order_by)
+
+        metadata_collector = []
+        writer, writer_partition, file_count, row_count = None, object(), 0, 0
+
+        with self.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=self.row_group_size).execute(query)
+            for rows in result.partitions(self.row_group_size):
+                for partition, partition_rows in groupby(rows, key=partition_of):
+                    if partition != writer_partition:
+                        if writer:
+                            writer.close()
+
+                        partition_dir = table_dir
+                        if partition_name:
+                            value = NULL_PARTITION if partition is None else partition
+                            partition_dir = os.path.join(table_dir, f"{partition_name}={value}")
+                        os.makedirs(partition_dir, exist_ok=True)
+
+                        file_path = os.path.join(partition_dir, f"part-{file_count}.parquet")
+                        writer = pq.ParquetWriter(
+                            file_path, schema, compression="zstd", metadata_collector=metadata_collector
+                        )
+                        writer_partition = partition
+                        file_count += 1
+
+                    partition_rows = list(partition_rows)
+                    columns = list(zip(*partition_rows))
+                    writer.write_table(
+                        pa.Table.from_arrays(
+                            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                            schema=schema,
+                        ),
+                        row_group_size=self.row_group_size,
+                    )
+                    row_count += len(partition_rows)
+
+        if writer:
+            writer.close()
+
+        # `_metadata` needs each file's path relative to the dataset root
+        for file_metadata, file_path in zip(metadata_collector, self.dataset_files(table_dir)):
+            file_metadata.set_file_path(os.path.relpath(file_path, table_dir))
+        pq.write_metadata(schema, os.path.join(table_dir, "_common_metadata"))
+        pq.write_metadata(schema, os.path.join(table_dir, "_metadata"), metadata_collector=metadata_collector)
+
+        self.logger.info(f"Exported {row_count} rows of {table.name} into {file_count} files")
+        return row_count
+
+
+    def dataset_files(self, table_dir: str) -> list:
+        """
+        Returns the Parquet files of a dataset in the order they were written.
+        """
+        files = []
+        for root, _, names in os.walk(table_dir):
+            files.extend(os.path.join(root, name) for name in names if name.startswith("part-"))
+        return sorted(files, key=lambda path: int(os.path.basename(path)[len("part-"):-len(".parquet")]))
+
+
+    def export_all(self, tables: list = None) -> None:
+        """
+        Exports every stage_1 table that exists in the database (or only `tables`).
+        """
+        existing = set(inspect(self.engine).get_table_names())
+        tables = tables or [t for t in BASE.metadata.sorted_tables if t.name in existing]
+        for table in tables:
+            self.logger.info(f"Exporting {table.name}")
+            self.export_table(table)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    exporter = ParquetExporter(ENGINE, "./data/transformed/parquet/")
+    exporter.export_all()
@@ -1,15 +1,19 @@
+from abc import abstractmethod
 from sqlalchemy.orm import sessionmaker
-from ..models.db import ENGINE
+from models.db import BASE, ENGINE
 import logging
 
 class BaseLoader:
-    def __init__(self, data_folder: str):
+    def __init__(self, data_folder: str, engine=None):
         logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
         self.logger = logging.getLogger(__name__)
 
         self.data_folder = data_folder
+        self.engine = engine or ENGINE
 
-        Session = sessionmaker(bind=ENGINE)
+        # models register their tables (and indexes) on BASE when imported by the loaders
+        BASE.metadata.create_all(self.engine)
+        Session = sessionmaker(bind=self.engine)
         self.session = Session()
 
     @abstractmethod
@@ -0,0 +1,201 @@
+import json
+import os
+from sqlalchemy.dialects import postgresql, sqlite
+from tqdm import tqdm
+from models.db import BASE
+from .baseloader import BaseLoader
+
+
+def compile_path(path: str) -> tuple:
+    """
+    Splits a dotted JSON path ("release.steam_release_date", "points.0") into keys.
+    "$" refers to the element itself.
+    """
+    if path == "$":
+        return ()
+    return tuple(int(key) if key.isdigit() else key for key in path.split("."))
+
+
+def get_path(data, keys: tuple):
+    for key in keys:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return data
+
+
+class TableMapping:
+    """
+    Describes how one JSON record becomes rows of one table.
+    """
+    def __init__(self, model, columns: dict, path: str = None, parent: dict = None, constants: dict = None):
+        """
+        Args:
+            model: target model class
+            columns (dict): column -> JSON path relative to each row's element, or a
+                            function of the element
+            path (str): path to a list in the record; one row is produced per element
+                        (None: one row per record, elements are the record itself)
+            parent (dict): column -> JSON path relative to the record, for values shared
+                           by all rows of a record (usually the app id)
+            constants (dict): column -> constant value
+        """
+        self.model = model
+        self.path = compile_path(path) if path else None
+        self.columns = [
+            (column, source if callable(source) else compile_path(source))
+            for column, source in columns.items()
+        ]
+        self.parent = [(column, compile_path(source)) for column, source in (parent or {}).items()]
+        self.constants = constants or {}
+
+
+    def rows(self, record: dict) -> list:
+        shared = dict(self.constants)
+        for column, keys in self.parent:
+            shared[column] = get_path(record, keys)
+
+        elements = [record] if self.path is None else (get_path(record, self.path) or [])
+        rows = []
+        for element in elements:
+            row = dict(shared)
+            for column, source in self.columns:
+                row[column] = source(element) if callable(source) else get_path(element, source)
+            rows.append(row)
+        return rows
+
+
+class SourceSpec:
+    """
+    Describes a raw data source: which files to read, how to turn them into records,
+    and the tables each record maps into.
+    """
+    def __init__(self, name: str, file_prefix: str, tables: list, file_suffix: str = ".jsonl",
+                 parse_line=json.loads, records: str = None, prepare=None, whole_file: bool = False):
+        """
+        Args:
+            name (str): source name, used in logs
+            file_prefix (str): files in the data folder starting with this are read
+            tables (list): `TableMapping`s applied to every record
+            file_suffix (str): required file extension
+            parse_line (function): turns one line into a JSON document
+            records (str): path to the list of records inside each document
+                           (None: the document is the record)
+            prepare (function): record -> record, or None to skip it
+            whole_file (bool): the file is a single JSON document instead of JSON lines
+        """
+        self.name = name
+        self.file_prefix = file_prefix
+        self.file_suffix = file_suffix
+        self.tables = tables
+        self.parse_line = parse_line
+        self.records = compile_path(records) if records else None
+        self.prepare = prepare
+        self.whole_file = whole_file
+
+
+    def documents(self, file_handle):
+        if self.whole_file:
+            yield json.load(file_handle)
+            return
+        for line in file_handle:
+            if line.strip():
+                yield self.parse_line(line)
+
+
+    def iter_records(self, file_handle):
+        for document in self.documents(file_handle):
+            records = [document] if self.records is None else (get_path(document, self.records) or [])
+            for record in records:
+                if self.prepare:
+                    record = self.prepare(record)
+                if record is not None:
+                    yield record
+
+
+class DeclarativeLoader(BaseLoader):
+    """
+    Generic streaming loader for any `SourceSpec`.
+
+    Rows are buffered per table and written with one executemany upsert per table every
+    `batch_size` rows, instead of constructing an ORM object per row.
+
+    Files are read oldest first and a row whose primary key already exists is updated,
+    so re-scrapes, `_retry` files and work-list shards replace older values.
+    """
+    def __init__(self, data_folder: str, source: SourceSpec, engine=None, batch_size: int = 20000):
+        super().__init__(data_folder, engine)
+        self.source = source
+        self.batch_size = batch_size
+
+        self.buffers = {}
+        self.buffered_rows = 0
+        self.row_counts = {}
+        self.record_count = 0
+
+        # parents before children
+        table_order = {table: i for i, table in enumerate(BASE.metadata.sorted_tables)}
+        self.models = sorted({m.model for m in source.tables}, key=lambda model: table_order[model.__table__])
+        self.statements = {model: self.upsert(model) for model in self.models}
+        self.logger.info(f"Initializing the DeclarativeLoader for {source.name}")
+
+
+    def upsert(self, model):
+        """
+        `INSERT ... ON CONFLICT DO UPDATE` of the columns the source maps into `model`.
+        Columns it doesn't map (filled by other loaders) keep their values.
+        """
+        # duckdb_engine builds on the PostgreSQL dialect
+        dialect = sqlite if self.engine.dialect.name == "sqlite" else postgresql
+        statement = dialect.insert(model)
+
+        mapped = set()
+        for mapping in self.source.tables:
+            if mapping.model is model:
+                mapped.update(mapping.constants, (c for c, _ in mapping.parent), (c for c, _ in mapping.columns))
+        keys = [column.name for column in model.__table__.primary_key]
+        updates = {column: statement.excluded[column] for column in sorted(mapped) if column not in keys}
+        if not updates:
+            return statement.on_conflict_do_nothing(index_elements=keys)
+        return statement.on_conflict_do_update(index_elements=keys, set_=updates)
+
+
+    def flush(self) -> None:
+        for model in self.models:
+            rows = self.buffers.pop(model, None)
+            if rows:
+                self.session.execute(self.statements[model], rows)
+                self.row_counts[model.__tablename__] = self.row_counts.get(model.__tablename__, 0) + len(rows)
+        self.session.commit()
+        self.buffered_rows = 0
+
+
+    def load_data(self):
+        file_list = [
+            f for f in os.listdir(self.data_folder)
+            if f.startswith(self.source.file_prefix) and f.endswith(self.source.file_suffix)
+        ]
+        # newest last, so its rows win (names alone don't order work-list shards and re-scrapes)
+        file_list.sort(key=lambda f: (os.path.getmtime(os.path.join(self.data_folder, f)), f))
+        self.logger.info(f"Loading {self.source.name} from {len(file_list)} files in {self.data_folder}")
+
+        for file_name in tqdm(file_list, desc=self.source.name, unit="file"):
+            with open(os.path.join(self.data_folder, file_name), "r") as f:
+                for record in self.source.iter_records(f):
+                    self.record_count += 1
+                    for mapping in self.source.tables:
+                        rows = mapping.rows(record)
+                        self.buffers.setdefault(mapping.model, []).extend(rows)
+                        self.buffered_rows += len(rows)
+
+                    if self.buffered_rows >= self.batch_size:
+                        self.flush()
+        self.flush()
+
+        self.logger.info(f"Finished loading {self.record_count} {self.source.name} records: {self.row_counts}")
+
+
+    def close(self):
+        self.session.close()
+        self.logger.info(f"Database session closed for {self.source.name} data")
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+from sqlalchemy import select
+from models.gamalytics import GamalyticsAttributeValue
+
+
+class AttributeDimensions:
+    """
+    In-memory dictionary of `(attributeType, value) -> attributeKey` backed by
+    `gamalytics_attribute_values`.
+
+    New values are assigned the next free key and added to the session, so they are
+    written in the same transaction as the bridge rows that reference them. Call `committed`
+    or `rollback` after the transaction so the dictionary stays in line with the table.
+    """
+    def __init__(self, session):
+        self.logger = logging.getLogger(__name__)
+        self.session = session
+
+        self.keys = {}
+        self.steam_ids = {}  # (attributeType, value) -> official Steam id, see `reconcile_steam_ids`
+        rows = self.session.execute(
+            select(GamalyticsAttributeValue.attributeType,
+                   GamalyticsAttributeValue.value,
+                   GamalyticsAttributeValue.attributeKey)
+        )
+        for attribute_type, value, key in rows:
+            self.keys[(attribute_type, value)] = key
+        self.next_key = max(self.keys.values(), default=0) + 1
+        self.pending = []  # values created since the last commit
+        self.logger.info(f"Loaded {len(self.keys)} attribute values")
+
+
+    def get_key(self, attribute_type: str, value: str, steam_ref_id: int = None) -> int:
+        """
+        Returns the key of `(attribute_type, value)`, creating it if it does not exist yet.
+        """
+        key = self.keys.get((attribute_type, value))
+        if key is not None:
+            return key
+
+        key = self.next_key
+        self.next_key += 1
+        self.keys[(attribute_type, value)] = key
+        self.pending.append((attribute_type, value))
+        self.session.add(GamalyticsAttributeValue(
+            attributeKey=key, attributeType=attribute_type, value=value,
+            steamRefId=steam_ref_id or self.steam_ids.get((attribute_type, value))
+        ))
+        return key
+
+
+    def committed(self) -> None:
+        self.pending = []
+
+
+    def rollback(self) -> None:
+        """
+        Forgets the values created since the last commit, after the session was rolled back.
+        """
+        for attribute_type_value in self.pending:
+            del self.keys[attribute_type_value]
+        self.next_key -= len(self.pending)
+        self.pending = []
+
+
+    def reconcile_steam_ids(self, tag_file: str = None, category_file: str = None) -> None:
+        """
+        Seeds the dictionary with the official Steam tags/categories and fills in `steamRefId`
+        for existing values with a matching name. Tag ids are used for tags and genres,
+        category ids for features.
+
+        Args:
+            tag_file (str): `tags.json` written by `SteamCategoriesTags.get_tags`
+            category_file (str): `categories.json` written by `SteamCategoriesTags.get_categories`
+        """
+        steam_ids = self.steam_ids
+        if tag_file and os.path.exists(tag_file):
+            with open(tag_file, "r") as f:
+                tags = json.load(f).get("tags", [])
+            for tag in tags:
+                steam_ids[("tag", tag["name"])] = int(tag["tagid"])
+                steam_ids[("genre", tag["name"])] = int(tag["tagid"])
+        elif tag_file:
+            self.logger.warning(f"Tag file {tag_file} not found, skipping tag reconciliation")
+
+        if category_file and os.path.exists(category_file):
+            with open(category_file, "r") as f:
+                categories = json.load(f).get("response", {}).get("categories", [])
+            for category in categories:
+                steam_ids[("feature", category["display_name"])] = int(category["categoryid"])
+        elif category_file:
+            self.logger.warning(f"Category file {category_file} not found, skipping category reconciliation")
+
+        existing = {
+            (row.attributeType, row.value): row
+            for row in self.session.scalars(select(GamalyticsAttributeValue))
+        }
+        for (attribute_type, value), steam_ref_id in steam_ids.items():
+            if (attribute_type, value) in existing:
+                existing[(attribute_type, value)].steamRefId = steam_ref_id
+            elif attribute_type == "tag":
+                # genres/features are only created once a game actually uses them
+                self.get_key(attribute_type, value)
+
+        self.session.commit()
+        self.committed()
+        self.logger.info(f"Reconciled {len(steam_ids)} official Steam tag/category names")
@@ -0,0 +1,162 @@
+import os
+from models.gamalytics import (
+    GamalyticsMain, GamalyticsHistory, GamalyticsAudienceOverlap,
+    GamalyticsPlaytimeData, GamalyticsEstimateDetails, GamalyticsDLC
+)
+from .baseloader import BaseLoader
+from .dimensions import AttributeDimensions
+from .gamalytics import HISTORY_FIELDS, RELATED_FIELDS, DLC_FIELDS
+
+
+class DuckDBGamalyticsLoader(BaseLoader):
+    """
+    Loads the Gamalytic JSONL files into a DuckDB stage_1 database without going through
+    Python objects: DuckDB reads the files itself (`read_json`) and every table is filled
+    by a single `INSERT ... SELECT`, unnesting the nested lists in SQL.
+
+    Produces the same tables as `GamalyticsDataLoader` with `history_mode="rows"`.
+    """
+    def __init__(self, data_folder, engine, tag_file: str = None, category_file: str = None):
+        super().__init__(data_folder, engine)
+        if self.engine.dialect.name != "duckdb":
+            raise ValueError(f"DuckDBGamalyticsLoader needs a DuckDB engine, got {self.engine.dialect.name}")
+
+        self.logger.info("Initializing the DuckDBGamalyticsLoader")
+        self.tag_file = tag_file
+        self.category_file = category_file
+
+
+    def columns_of(self, connection, query: str) -> set:
+        return {row[0] for row in connection.exec_driver_sql(f"DESCRIBE {query}")}
+
+
+    def insert_select(self, connection, model_class, query: str, constants: dict = None) -> None:
+        """
+        Inserts the rows of `query` into `model_class`'s table. Only columns that exist in
+        both are copied, so fields missing from every JSON record simply end up NULL.
+        """
+        constants = constants or {}
+        available = self.columns_of(connection, query)
+        columns = [
+            c.name for c in model_class.__table__.columns
+            if c.name in available and c.name not in constants
+        ]
+        select_list = [f'"{c}"' for c in columns] + [f"'{value}'" for value in constants.values()]
+        target_list = [f'"{c}"' for c in columns + list(constants)]
+
+        connection.exec_driver_sql(
+            f"INSERT OR IGNORE INTO {model_class.__tablename__} ({', '.join(target_list)}) "
+            + f"SELECT {', '.join(select_list)} FROM ({query})"
+        )
+        self.log_row_count(connection, model_class.__tablename__)
+
+
+    def entries_query(self, connection, key: str, fields: dict) -> str:
+        """
+        Unnests the `key` list into one row per entry, its fields renamed to columns as in
+        `GamalyticsDataLoader` (lists comma-separated). Unknown fields are logged.
+        """
+        entries = f"SELECT steamId, unnest({key}) AS entry FROM raw_gamalytics"
+        entry_fields = {
+            row[0]: row[1] for row in connection.exec_driver_sql(f"DESCRIBE SELECT entry.* FROM ({entries})")
+        }
+        for field in sorted(entry_fields.keys() - fields.keys()):
+            self.logger.warning(f"Ignored unknown Gamalytic field `{field}` in `{key}` entries")
+
+        select_list = ["steamId"]
+        for field, column in fields.items():
+            if field in entry_fields:
+                value = f'entry."{field}"'
+                if entry_fields[field].endswith("[]"):
+                    value = f"array_to_string({value}, ',')"
+                select_list.append(f'{value} AS "{column}"')
+        return f"SELECT {', '.join(select_list)} FROM ({entries})"
+
+
+    def log_row_count(self, connection, table_name: str) -> None:
+        count = connection.exec_driver_sql(f"SELECT count(*) FROM {table_name}").scalar()
+        self.logger.info(f"{table_name} now has {count} rows")
+
+
+    def load_data(self):
+        pattern = os.path.join(self.data_folder, "*.jsonl")
+        self.logger.info(f"Starting to load data from {pattern}")
+
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(
+                "CREATE OR REPLACE TEMP TABLE raw_gamalytics AS SELECT * FROM read_json("
+                + f"'{pattern}', format = 'newline_delimited', union_by_name = true, sample_size = -1)"
+            )
+            raw_columns = self.columns_of(connection, "raw_gamalytics")
+
+            self.insert_select(connection, GamalyticsMain, "SELECT * FROM raw_gamalytics")
+
+            if "history" in raw_columns:
+                self.insert_select(
+                    connection, GamalyticsHistory, self.entries_query(connection, "history", HISTORY_FIELDS)
+                )
+            for key, data_type in (("audienceOverlap", "audience_overlap"), ("alsoPlayed", "also_played")):
+                if key in raw_columns:
+                    self.insert_select(
+                        connection, GamalyticsAudienceOverlap,
+                        self.entries_query(connection, key, RELATED_FIELDS),
+                        {"dataType": data_type},
+                    )
+            if "dlc" in raw_columns:
+                self.insert_select(connection, GamalyticsDLC, self.entries_query(connection, "dlc", DLC_FIELDS))
+            if "estimateDetails" in raw_columns:
+                self.insert_select(
+                    connection, GamalyticsEstimateDetails,
+                    "SELECT steamId, unnest(estimateDetails) FROM raw_gamalytics",
+                )
+            if "playtimeData" in raw_columns:
+                # the distribution's keys are the time ranges, so it is read as a map
+                self.insert_select(
+                    connection, GamalyticsPlaytimeData,
+                    "SELECT steamId, medianPlaytime, entry.key AS timeRange, entry.value AS percentage FROM ("
+                    + "SELECT steamId, playtimeData.median AS medianPlaytime, unnest(map_entries(json_transform("
+                    + "to_json(playtimeData.distribution), '\"MAP(VARCHAR, DOUBLE)\"'))) AS entry FROM raw_gamalytics)",
+                )
+
+            self.insert_attribute_data(connection, raw_columns)
+            connection.exec_driver_sql("DROP TABLE raw_gamalytics")
+
+        # fill in official Steam ids for the new dictionary values
+        AttributeDimensions(self.session).reconcile_steam_ids(self.tag_file, self.category_file)
+        self.logger.info("Finished loading Gamalytics data")
+
+
+    def insert_attribute_data(self, connection, raw_columns: set) -> None:
+        attribute_queries = [
+            f"SELECT steamId, '{attribute_type[:-1]}' AS attributeType, unnest({attribute_type}) AS value "
+            + "FROM raw_gamalytics"
+            for attribute_type in ["tags", "genres", "features", "languages"]
+            if attribute_type in raw_columns
+        ]
+        if not attribute_queries:
+            return
+
+        connection.exec_driver_sql(
+            "CREATE OR REPLACE TEMP TABLE raw_attributes AS "
+            + " UNION ".join(attribute_queries)
+        )
+        # new values get keys after the current maximum, as in `AttributeDimensions`
+        connection.exec_driver_sql(
+            "INSERT INTO gamalytics_attribute_values (attributeKey, attributeType, value) "
+            + "SELECT (SELECT coalesce(max(attributeKey), 0) FROM gamalytics_attribute_values) "
+            + "+ row_number() OVER (ORDER BY attributeType, value), attributeType, value FROM ("
+            + "SELECT DISTINCT attributeType, value FROM raw_attributes "
+            + "EXCEPT SELECT attributeType, value FROM gamalytics_attribute_values)"
+        )
+        connection.exec_driver_sql(
+            "INSERT OR IGNORE INTO gamalytics_attributes (steamId, attributeKey) "
+            + "SELECT r.steamId, v.attributeKey FROM raw_attributes r "
+            + "JOIN gamalytics_attribute_values v USING (attributeType, value)"
+        )
+        self.log_row_count(connection, "gamalytics_attributes")
+        connection.exec_driver_sql("DROP TABLE raw_attributes")
+
+
+    def close(self):
+        self.session.close()
+        self.logger.info("Database session closed for Gamalytics data")
@@ -1,45 +1,129 @@
 import json
 import os
-from sqlalchemy import create_engine
+from collections import Counter
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker
+from models.db import BASE as Base
 from models.gamalytics import (
-    GamalyticsMain, GamalyticsHistory, GamalyticsAudienceOverlap, 
+    GamalyticsMain, GamalyticsHistory, GamalyticsHistorySeries, GamalyticsAudienceOverlap,
     GamalyticsPlaytimeData, GamalyticsEstimateDetails, GamalyticsDLC, GamalyticsAttributes
 )
 import logging
 from tqdm import tqdm
 from .baseloader import BaseLoader
+from .dimensions import AttributeDimensions
+from readers.history import pack_history, HISTORY_DTYPES
+
+# Gamalytic JSON field -> column, for the entries of the nested lists. An entry's own
+# `steamId` is the related game's or the DLC's, the game's id comes from the record.
+HISTORY_FIELDS = {field: field for field in HISTORY_DTYPES}
+RELATED_FIELDS = {
+    "steamId": "relatedSteamId",
+    "link": "link",
+    "name": "relatedName",
+    "releaseDate": "relatedReleaseDate",
+    "price": "relatedPrice",
+    "genres": "relatedGenres",
+    "copiesSold": "relatedCopiesSold",
+    "revenue": "relatedRevenue",
+}
+DLC_FIELDS = {
+    "steamId": "dlcSteamId",
+    "name": "dlcName",
+    "releaseDate": "dlcReleaseDate",
+    "price": "dlcPrice",
+    "genres": "dlcGenres",
+    "copiesSold": "dlcCopiesSold",
+    "revenue": "dlcRevenue",
+}
+
+
+def map_entry(entry: dict, fields: dict) -> dict:
+    """
+    Renames the fields of a nested list entry to columns. Lists (genres) are stored comma-separated.
+    """
+    row = {}
+    for field, column in fields.items():
+        value = entry.get(field)
+        row[column] = ",".join(map(str, value)) if isinstance(value, list) else value
+    return row
+
 
 class GamalyticsDataLoader(BaseLoader):
-    def __init__(self, data_folder):
-        super().__init__(data_folder)
+    def __init__(self, data_folder, tag_file: str = None, category_file: str = None, history_mode: str = "rows",
+                 engine=None):
+        """
+        Args:
+            data_folder (str): folder with the Gamalytic `data_*.jsonl` files
+            tag_file (str): Steam `tags.json`, used to reconcile tag ids
+            category_file (str): Steam `categories.json`, used to reconcile feature ids
+            history_mode (str): "rows" stores one `gamalytics_history` row per data point,
+                                "packed" stores one `gamalytics_history_series` row per game
+            engine: stage_1 engine from `models.db.get_engine` (default: SQLite `ENGINE`)
+        """
+        super().__init__(data_folder, engine)
         self.logger.info("Initializing the GamalyticsDataLoader")
 
+        if history_mode not in ("rows", "packed"):
+            raise ValueError(f"Unknown history mode: {history_mode}")
+        self.history_mode = history_mode
+
+        self.dimensions = AttributeDimensions(self.session)
+        self.dimensions.reconcile_steam_ids(tag_file, category_file)
+
+        # rows of the current game, written per table with `INSERT OR IGNORE` like the DuckDB
+        # loader, so repeated rows (within a record, `_retry` files, overlapping shards) keep the first
+        self.rows = {}
+
+        # (list, field) -> number of entries with a Gamalytic field none of the mappings know,
+        # reported at the end of `load_data` (e.g. after a field is renamed upstream)
+        self.unknown_fields = Counter()
+
 
     def insert_data(self, model_class: Base, data: dict) -> None:
-        try:
-            record = model_class(**data)
-            self.session.add(record)
-            self.logger.debug(f"Successfully inserted data into {model_class.__tablename__}")
-        except Exception as e:
-            self.logger.exception(f"Failed to insert data for {model_class.__tableanme__}!\n{e}")
+        unknown = data.keys() - model_class.__table__.columns.keys()
+        if unknown:
+            raise ValueError(f"Unknown columns for {model_class.__tablename__}: {sorted(unknown)}")
+        self.rows.setdefault(model_class, []).append(data)
+
+
+    def flush(self) -> None:
+        """
+        Writes the buffered rows of the current game and commits them.
+        """
+        self.session.flush()  # new attribute values first, see `AttributeDimensions.get_key`
+        for model_class, rows in self.rows.items():
+            # one parameter set per column set, executemany needs the same keys in every row
+            columns = set().union(*rows)
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+            self.session.execute(insert(model_class).prefix_with("OR IGNORE"), rows)
+        self.rows = {}
+        self.session.commit()
+        self.dimensions.committed()
 
 
-    def insert_jsonlist_data(self, model_class: Base, data: dict, key: str, additional_data: dict = None) -> None:
-        for entry in data.get(key, []):
-            entry_data = {**entry, **(additional_data or {})}
-            self.insert_data(model_class, entry_data)
+    def count_unknown_fields(self, entries: list, key: str, fields: dict) -> None:
+        for entry in entries:
+            for field in entry.keys() - fields.keys():
+                self.unknown_fields[(key, field)] += 1
+
+
+    def insert_jsonlist_data(self, model_class: Base, data: dict, key: str, fields: dict,
+                             additional_data: dict = None) -> None:
+        entries = data.get(key) or []
+        self.count_unknown_fields(entries, key, fields)
+        for entry in entries:
+            self.insert_data(model_class, {**map_entry(entry, fields), **(additional_data or {})})
 
 
     def insert_attribute_data(self, data: dict) -> None:
+        attribute_keys = set()
         for attribute_type in ["tags", "genres", "features", "languages"]:
-            for val in data.get(attribute_type, []):
-                attribute_data = {
-                    "steamId": data["steamId"],
-                    "attributeType": attr_type[:-1],
-                    "value": value
-                }
-                self.insert_data(GamalyticsAttributes, attribute_data)
+            for value in data.get(attribute_type, []):
+                attribute_keys.add(self.dimensions.get_key(attribute_type[:-1], value))
+
+        for attribute_key in attribute_keys:
+            self.insert_data(GamalyticsAttributes, {"steamId": data["steamId"], "attributeKey": attribute_key})
 
 
     def insert_main_data(self, data):
@@ -75,10 +159,10 @@ class GamalyticsDataLoader(BaseLoader):
     def load_data(self):
         # Loop through JSONL files in the data directory and insert data into tables
         self.logger.info("Starting to load data from JSONL files.")
-        file_list = [f for f in sorted(os.listdir(self.data_dir)) if f.endswith('.jsonl')]
+        file_list = [f for f in sorted(os.listdir(self.data_folder)) if f.endswith('.jsonl')]
 
         for file_name in tqdm(file_list, desc="Files", unit="file", position=0):
-            file_path = os.path.join(self.data_dir, file_name)
+            file_path = os.path.join(self.data_folder, file_name)
 
             # Count lines in the file for inner progress bar
             with open(file_path, 'r') as file:
@@ -88,47 +172,62 @@ class GamalyticsDataLoader(BaseLoader):
                 for line in tqdm(f, desc=f"Processing records in {file_name}", total=total_lines, unit="record", position=1):
                     data = json.loads(line)
                     steamId = data["steamId"]
-
-                    self.insert_main_data(data)
-
-                    # insert inter-game relation data
-                    self.insert_jsonlist_data(GamalyticsHistory, data, "history", {"steamId": data["steamId"]})
-                    self.insert_jsonlist_data(GamalyticsAudienceOverlap, data, "audienceOverlap", {
-                        "steamId": steamId, "type": "audience_overlap"
-                    })
-                    self.insert_jsonlist_data(GamalyticsAudienceOverlap, data, "alsoPlayed", {
-                        "steamId": steamId, "type": "also_played"
-                    })
-
-                    # insert playtime data
-                    playtime_info = data.get("playtimeData", {})
-                    for time_range, percentage in playtime_info.get("distribution", {}).items():
-                        playtime_data = {
-                            "steamId": steamId,
-                            "medianPlaytime": playtime_info.get("median"),
-                            "timeRange": time_range,
-                            "percentage": percentage
-                        }
-                        self.insert_data(GamalyticsPlaytimeData, playtime_data)
+                    try:
+                        self.insert_main_data(data)
+
+                        # insert inter-game relation data
+                        if self.history_mode == "packed":
+                            history = data.get("history") or []
+                            self.count_unknown_fields(history, "history", HISTORY_FIELDS)
+                            self.insert_data(GamalyticsHistorySeries, pack_history(steamId, history))
+                        else:
+                            self.insert_jsonlist_data(GamalyticsHistory, data, "history", HISTORY_FIELDS, {
+                                "steamId": steamId
+                            })
+                        self.insert_jsonlist_data(GamalyticsAudienceOverlap, data, "audienceOverlap", RELATED_FIELDS, {
+                            "steamId": steamId, "dataType": "audience_overlap"
+                        })
+                        self.insert_jsonlist_data(GamalyticsAudienceOverlap, data, "alsoPlayed", RELATED_FIELDS, {
+                            "steamId": steamId, "dataType": "also_played"
+                        })
+
+                        # insert playtime data
+                        playtime_info = data.get("playtimeData", {})
+                        for time_range, percentage in playtime_info.get("distribution", {}).items():
+                            playtime_data = {
+                                "steamId": steamId,
+                                "medianPlaytime": playtime_info.get("median"),
+                                "timeRange": time_range,
+                                "percentage": percentage
+                            }
+                            self.insert_data(GamalyticsPlaytimeData, playtime_data)
                     
-                    # insert estimate details
-                    estimate_details = data.get('estimateDetails', {})
-                    estimate_data = {
-                        "steamId": data['steamId'],
-                        "rankBased": estimate_details.get('rankBased'),
-                        "playtimeBased": estimate_details.get('playtimeBased'),
-                        "reviewBased": estimate_details.get('reviewBased')
-                    }
-                    self.insert_data(GamalyticsEstimateDetails, estimate_data)
-
-                    # insert DLCs
-                    self.insert_related_data(GamalyticsDLC, data, 'dlc', {'steamId': data['steamId']})
-                    # insert attributes
-                    self.insert_attributes_data(data)
-
-                    # commit change for each game
-                    self.session.commit()
-        
+                        # insert estimate details
+                        estimate_details = data.get('estimateDetails', {})
+                        estimate_data = {
+                            "steamId": data['steamId'],
+                            "rankBased": estimate_details.get('rankBased'),
+                            "playtimeBased": estimate_details.get('playtimeBased'),
+                            "reviewBased": estimate_details.get('reviewBased')
+                        }
+                        self.insert_data(GamalyticsEstimateDetails, estimate_data)
+
+                        # insert DLCs
+                        self.insert_jsonlist_data(GamalyticsDLC, data, 'dlc', DLC_FIELDS, {'steamId': data['steamId']})
+                        # insert attributes
+                        self.insert_attribute_data(data)
+
+                        # commit change for each game
+                        self.flush()
+                    except Exception as e:
+                        # a broken record loses only its own game
+                        self.session.rollback()
+                        self.dimensions.rollback()
+                        self.rows = {}
+                        self.logger.exception(f"Failed to load game {steamId} from {file_name}, skipping it!\n{e}")
+
+        for (key, field), count in sorted(self.unknown_fields.items()):
+            self.logger.warning(f"Ignored unknown Gamalytic field `{field}` in {count} `{key}` entries")
         self.logger.info("Finished loading Gamalytics data")
             
 
@@ -0,0 +1,206 @@
+"""
+`SourceSpec`s for every raw extract output, loaded with `DeclarativeLoader`.
+"""
+import ast
+import json
+import logging
+from models.steam import (
+    SteamItem, SteamItemTag, SteamItemLanguage, SteamItemCreator,
+    SteamAppDetails, SteamAppCategory, SteamAppGenre,
+    SteamReviewSummary, SteamReviewHistogram, SteamTag, SteamCategory
+)
+from models.steamcharts import SteamChartsCCU
+from models.hltb import HLTBGame
+from .declarative import SourceSpec, TableMapping, compile_path, get_path
+
+log = logging.getLogger(__name__)
+
+
+def as_int(path: str):
+    """Column source that casts the value at `path` to int (Steam sends some numbers as strings)."""
+    keys = compile_path(path)
+    def convert(element):
+        value = get_path(element, keys)
+        return None if value in (None, "") else int(value)
+    return convert
+
+
+def require(*paths: str):
+    """`prepare` function that skips records missing any of `paths`."""
+    keys = [compile_path(path) for path in paths]
+    def prepare(record):
+        for path, key in zip(paths, keys):
+            if get_path(record, key) is None:
+                log.warning(f"Skipping record without `{path}`")
+                return None
+        return record
+    return prepare
+
+
+def unwrap_appdetails(record: dict) -> dict | None:
+    # {"<appid>": {"success": true, "data": {...}}}
+    for app_id, result in record.items():
+        if not result.get("success") or "data" not in result:
+            log.debug(f"Skipping unsuccessful appdetails response for {app_id}")
+            return None
+        return {**result["data"], "steam_appid": int(app_id)}
+    return None
+
+
+def parse_ccu_line(line: str) -> dict:
+    # "<appid>\t[[ms timestamp, players], ...]", older shards have the Python repr (None for null)
+    app_id, points = line.split("\t", 1)
+    try:
+        points = json.loads(points)
+    except json.JSONDecodeError:
+        points = ast.literal_eval(points)
+    return {"appid": int(app_id), "points": points}
+
+
+def hltb_release_year(game: dict) -> int | None:
+    release = game.get("release_world") or ""
+    return int(release[:4]) if release[:4].isdigit() else None
+
+
+GETITEMS = SourceSpec(
+    "getitems", "getitems_",
+    prepare=require("appid"),
+    tables=[
+        TableMapping(SteamItem, {
+            "appid": "appid",
+            "name": "name",
+            "type": "type",
+            "visible": "visible",
+            "releaseDate": "release.steam_release_date",
+            "isComingSoon": "release.is_coming_soon",
+            "isEarlyAccess": "release.is_early_access",
+            "windows": "platforms.windows",
+            "mac": "platforms.mac",
+            "linux": "platforms.steamos_linux",
+            "priceInCents": as_int("best_purchase_option.final_price_in_cents"),
+            "shortDescription": "basic_info.short_description",
+        }),
+        TableMapping(SteamItemTag, {"tagid": "tagid", "weight": as_int("weight")},
+                     path="tags", parent={"appid": "appid"}),
+        TableMapping(SteamItemLanguage, {
+            "language": "elanguage", "supported": "supported",
+            "fullAudio": "full_audio", "subtitles": "subtitles",
+        }, path="supported_languages", parent={"appid": "appid"}),
+        TableMapping(SteamItemCreator, {"name": "name"}, path="basic_info.developers",
+                     parent={"appid": "appid"}, constants={"role": "developer"}),
+        TableMapping(SteamItemCreator, {"name": "name"}, path="basic_info.publishers",
+                     parent={"appid": "appid"}, constants={"role": "publisher"}),
+    ],
+)
+
+APPDETAILS = SourceSpec(
+    "appdetails", "appdetails_",
+    prepare=unwrap_appdetails,
+    tables=[
+        TableMapping(SteamAppDetails, {
+            "appid": "steam_appid",
+            "type": "type",
+            "name": "name",
+            "requiredAge": as_int("required_age"),
+            "isFree": "is_free",
+            "shortDescription": "short_description",
+            "currency": "price_overview.currency",
+            "initialPrice": "price_overview.initial",
+            "finalPrice": "price_overview.final",
+            "discountPercent": "price_overview.discount_percent",
+            "windows": "platforms.windows",
+            "mac": "platforms.mac",
+            "linux": "platforms.linux",
+            "metacriticScore": "metacritic.score",
+            "recommendations": "recommendations.total",
+            "comingSoon": "release_date.coming_soon",
+            "releaseDateText": "release_date.date",
+        }),
+        TableMapping(SteamAppCategory, {"categoryId": "id"}, path="categories", parent={"appid": "steam_appid"}),
+        TableMapping(SteamAppGenre, {"genreId": as_int("id"), "description": "description"},
+                     path="genres", parent={"appid": "steam_appid"}),
+    ],
+)
+
+
+def review_summary_source(period: str) -> SourceSpec:
+    return SourceSpec(
+        f"review_summary_{period}", f"review_summary_{period}_",
+        prepare=require("id"),
+        tables=[
+            TableMapping(SteamReviewSummary, {
+                "appid": "id",
+                "numReviews": "query_summary.num_reviews",
+                "reviewScore": "query_summary.review_score",
+                "reviewScoreDesc": "query_summary.review_score_desc",
+                "totalPositive": "query_summary.total_positive",
+                "totalNegative": "query_summary.total_negative",
+                "totalReviews": "query_summary.total_reviews",
+            }, constants={"period": period}),
+        ],
+    )
+
+
+REVIEW_SUMMARY_ALL = review_summary_source("all")
+REVIEW_SUMMARY_EARLY = review_summary_source("early")
+
+# only files written since the scraper started recording `id` can be loaded
+REVIEW_HISTORY = SourceSpec(
+    "review_history", "review_history_",
+    prepare=require("id"),
+    tables=[
+        TableMapping(SteamReviewHistogram, {
+            "date": "date",
+            "recommendationsUp": "recommendations_up",
+            "recommendationsDown": "recommendations_down",
+        }, path="results.rollups", parent={"appid": "id", "rollupType": "results.rollup_type"}),
+    ],
+)
+
+CCU_HISTORY = SourceSpec(
+    "ccu_history", "ccu_history_",
+    parse_line=parse_ccu_line,
+    tables=[
+        TableMapping(SteamChartsCCU, {"timeStamp": "0", "players": "1"}, path="points", parent={"appid": "appid"}),
+    ],
+)
+
+HLTB = SourceSpec(
+    "hltb", "game_data",
+    records="props.pageProps.game.data.game",
+    tables=[
+        TableMapping(HLTBGame, {
+            "gameId": "game_id",
+            "name": "game_name",
+            "steamId": "profile_steam",
+            "releaseYear": hltb_release_year,
+            "compMain": "comp_main",
+            "compPlus": "comp_plus",
+            "comp100": "comp_100",
+            "compAll": "comp_all",
+        }),
+    ],
+)
+
+STEAM_TAGS = SourceSpec(
+    "steam_tags", "tags", file_suffix=".json", whole_file=True, records="tags",
+    tables=[TableMapping(SteamTag, {"tagid": as_int("tagid"), "name": "name"})],
+)
+
+STEAM_CATEGORIES = SourceSpec(
+    "steam_categories", "categories", file_suffix=".json", whole_file=True, records="response.categories",
+    tables=[
+        TableMapping(SteamCategory, {
+            "categoryid": "categoryid", "type": "type",
+            "internalName": "internal_name", "displayName": "display_name",
+        }),
+    ],
+)
+
+# data folder (relative to the repository root) -> sources found in it
+SOURCES = {
+    './data/raw/steam_apps/': [GETITEMS, APPDETAILS, REVIEW_SUMMARY_ALL, REVIEW_SUMMARY_EARLY, REVIEW_HISTORY],
+    './data/raw/steam_charts/': [CCU_HISTORY],
+    './data/raw/hltb/': [HLTB],
+    './data/raw/steam_ids/': [STEAM_TAGS, STEAM_CATEGORIES],
+}
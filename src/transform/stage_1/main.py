@@ -1,8 +1,24 @@
+from models.db import get_engine, DB_PATHS
 from loaders.gamalytics import GamalyticsDataLoader
+from loaders.duckdb_gamalytics import DuckDBGamalyticsLoader
+from loaders.declarative import DeclarativeLoader
+from loaders.sources import SOURCES
 
 if __name__ == "__main__":
-    db_path = './data/transformed/stage_1.db'
+    BACKEND = "sqlite"  # or "duckdb"
+    db_path = DB_PATHS[BACKEND]
     data_dir = './data/raw/gamalytic/'
-    loader = GamalyticsDataLoader(db_path, data_dir)
+    tag_file = './data/raw/steam_ids/tags.json'
+    category_file = './data/raw/steam_ids/categories.json'
+
+    engine = get_engine(BACKEND, db_path)
+    loader_class = DuckDBGamalyticsLoader if BACKEND == "duckdb" else GamalyticsDataLoader
+    loader = loader_class(data_dir, engine=engine, tag_file=tag_file, category_file=category_file)
     loader.load_data()
     loader.close()
+
+    for source_folder, sources in SOURCES.items():
+        for source in sources:
+            loader = DeclarativeLoader(source_folder, source, engine=engine)
+            loader.load_data()
+            loader.close()
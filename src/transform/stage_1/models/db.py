@@ -4,8 +4,29 @@ import os
 
 BASE = declarative_base()
 
-DB_PATH = './data/transformed/stage_1.db'
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+# SQLite is the default row store. DuckDB is an embedded columnar alternative for
+# scan/aggregation-heavy work; it needs the `duckdb` and `duckdb_engine` packages.
+DB_PATHS = {
+    'sqlite': './data/transformed/stage_1.db',
+    'duckdb': './data/transformed/stage_1.duckdb',
+}
+DB_PATH = DB_PATHS['sqlite']
 
-ENGINE = create_engine(f'sqlite:///{DB_PATH}')
-Base.metadata.create_all(ENGINE)
+
+def get_engine(backend: str = 'sqlite', db_path: str = None):
+    """
+    Creates an engine for the stage_1 database.
+
+    Args:
+        backend (str): "sqlite" or "duckdb"
+        db_path (str): database file (default: `DB_PATHS[backend]`)
+    """
+    if backend not in DB_PATHS:
+        raise ValueError(f"Unknown stage_1 backend: {backend}")
+
+    db_path = db_path or DB_PATHS[backend]
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    return create_engine(f'{backend}:///{db_path}')
+
+
+ENGINE = get_engine('sqlite', DB_PATH)
@@ -1,97 +1,146 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, Text, ForeignKey
-from sqlalchemy.orm import declarative_base, relationship
-import os
-
+from sqlalchemy import (
+    Column, Integer, SmallInteger, BigInteger, Double, Boolean, Text, LargeBinary, ForeignKey, Index, UniqueConstraint
+)
+from .db import BASE as Base
 
 
 class GamalyticsMain(Base):
     __tablename__ = 'gamalytics_main'
-    steamId = Column(Integer, primary_key=True)
+    steamId = Column(Integer, primary_key=True, autoincrement=False)
     name = Column(Text)
     description = Column(Text)
-    price = Column(Float)
+    price = Column(Double)
     reviews = Column(Integer)
     reviewsSteam = Column(Integer)
     followers = Column(Integer)
-    avgPlaytime = Column(Float)
+    avgPlaytime = Column(Double)
     reviewScore = Column(Integer)
-    releaseDate = Column(Integer)
-    EAReleaseDate = Column(Integer)
-    firstReleaseDate = Column(Integer)
-    earlyAccessExitDate = Column(Integer)
+    releaseDate = Column(BigInteger)
+    EAReleaseDate = Column(BigInteger)
+    firstReleaseDate = Column(BigInteger)
+    earlyAccessExitDate = Column(BigInteger)
     unreleased = Column(Boolean)
     earlyAccess = Column(Boolean)
     copiesSold = Column(Integer)
-    revenue = Column(Float)
-    totalRevenue = Column(Float)
+    revenue = Column(Double)
+    totalRevenue = Column(Double)
     players = Column(Integer)
     owners = Column(Integer)
-    steamPercent = Column(Float)
+    steamPercent = Column(Double)
     wishlists = Column(Integer)
     itemType = Column(Text)
     itemCode = Column(Integer)
 
+    __table_args__ = (
+        # dashboard filters/sorts are almost always by release date or revenue
+        Index('ix_gamalytics_main_releaseDate', 'releaseDate'),
+        Index('ix_gamalytics_main_revenue', 'revenue'),
+    )
+
 # Historical game data
+# Clustered on (steamId, timeStamp) so a game's whole series is one contiguous range scan
 class GamalyticsHistory(Base):
     __tablename__ = 'gamalytics_history'
-    historyId = Column(Integer, primary_key=True, autoincrement=True)
-    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'))
-    timeStamp = Column(Integer)
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True)
+    timeStamp = Column(BigInteger, primary_key=True)
     reviews = Column(Integer)
-    price = Column(Float)
-    score = Column(Float)
-    players = Column(Float)
-    avgPlaytime = Column(Float)
+    price = Column(Double)
+    score = Column(Double)
+    players = Column(Double)
+    avgPlaytime = Column(Double)
     sales = Column(Integer)
-    revenue = Column(Float)
+    revenue = Column(Double)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+# Alternative to `GamalyticsHistory`: one row per game, each column a packed little-endian array.
+# Written by `GamalyticsDataLoader(history_mode="packed")`, read with `readers.history`.
+class GamalyticsHistorySeries(Base):
+    __tablename__ = 'gamalytics_history_series'
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True, autoincrement=False)
+    length = Column(Integer)
+    timeStamp = Column(LargeBinary)  # int64
+    reviews = Column(LargeBinary)  # int32
+    price = Column(LargeBinary)  # float32
+    score = Column(LargeBinary)  # float32
+    players = Column(LargeBinary)  # float32
+    avgPlaytime = Column(LargeBinary)  # float32
+    sales = Column(LargeBinary)  # int32
+    revenue = Column(LargeBinary)  # float64
 
 class GamalyticsAudienceOverlap(Base):
     __tablename__ = 'gamalytics_audience_overlap'
-    overlapId = Column(Integer, primary_key=True, autoincrement=True)
-    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'))
-    dataType = Column(Text)  # "audience_overlap" or "also_played"
-    relatedSteamId = Column(Integer)
-    link = Column(Float)
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True)
+    dataType = Column(Text, primary_key=True)  # "audience_overlap" or "also_played"
+    relatedSteamId = Column(Integer, primary_key=True)
+    link = Column(Double)
     relatedName = Column(Text)
-    relatedReleaseDate = Column(Integer)
-    relatedPrice = Column(Float)
+    relatedReleaseDate = Column(BigInteger)
+    relatedPrice = Column(Double)
     relatedGenres = Column(Text)
     relatedCopiesSold = Column(Integer)
-    relatedRevenue = Column(Float)
+    relatedRevenue = Column(Double)
+
+    __table_args__ = (
+        # reverse lookups ("who overlaps with X?") without scanning the whole table
+        Index('ix_gamalytics_audience_overlap_related', 'relatedSteamId', 'dataType', 'steamId', 'link'),
+        {'sqlite_with_rowid': False},
+    )
 
 class GamalyticsPlaytimeData(Base):
     __tablename__ = 'gamalytics_playtime_data'
-    playtimeDataId = Column(Integer, primary_key=True, autoincrement=True)
-    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'))
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True)
+    timeRange = Column(Text, primary_key=True)
     medianPlaytime = Column(Integer)
-    timeRange = Column(Text)
-    percentage = Column(Float)
+    percentage = Column(Double)
+
+    __table_args__ = {'sqlite_with_rowid': False}
 
 class GamalyticsEstimateDetails(Base):
     __tablename__ = 'gamalytics_estimate_details'
-    estimateId = Column(Integer, primary_key=True, autoincrement=True)
-    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'))
-    rankBased = Column(Float)
-    playtimeBased = Column(Float)
-    reviewBased = Column(Float)
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True, autoincrement=False)  # one row per game
+    rankBased = Column(Double)
+    playtimeBased = Column(Double)
+    reviewBased = Column(Double)
 
 class GamalyticsDLC(Base):
     __tablename__ = 'gamalytics_dlc'
-    dlcId = Column(Integer, primary_key=True, autoincrement=True)
-    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'))
-    dlcSteamId = Column(Integer)
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True)
+    dlcSteamId = Column(Integer, primary_key=True)
     dlcName = Column(Text)
-    dlcReleaseDate = Column(Integer)
-    dlcPrice = Column(Float)
+    dlcReleaseDate = Column(BigInteger)
+    dlcPrice = Column(Double)
     dlcGenres = Column(Text)
     dlcCopiesSold = Column(Integer)
-    dlcRevenue = Column(Float)
+    dlcRevenue = Column(Double)
+
+    __table_args__ = (
+        Index('ix_gamalytics_dlc_dlcSteamId', 'dlcSteamId'),
+        {'sqlite_with_rowid': False},
+    )
+
+# Dictionary of every distinct tag/genre/feature/language value.
+# `steamRefId` is the official Steam tag id (tags, genres) or category id (features), if one matches.
+class GamalyticsAttributeValue(Base):
+    __tablename__ = 'gamalytics_attribute_values'
+    attributeKey = Column(SmallInteger, primary_key=True, autoincrement=False)
+    attributeType = Column(Text, nullable=False)  # "tag", "genre", "feature", or "language"
+    value = Column(Text, nullable=False)
+    steamRefId = Column(Integer)
+
+    __table_args__ = (
+        UniqueConstraint('attributeType', 'value', name='uq_gamalytics_attribute_values_type_value'),
+    )
 
+# Bridge between games and attribute values
 class GamalyticsAttributes(Base):
     __tablename__ = 'gamalytics_attributes'
-    attributeId = Column(Integer, primary_key=True, autoincrement=True)
-    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'))
-    attributeType = Column(Text)  # "tag", "genre", "feature", or "language"
-    value = Column(Text)
+    steamId = Column(Integer, ForeignKey('gamalytics_main.steamId'), primary_key=True)
+    attributeKey = Column(SmallInteger, ForeignKey('gamalytics_attribute_values.attributeKey'), primary_key=True)
 
+    __table_args__ = (
+        # covers "all games with tag X" filters and group-bys on attributeKey
+        Index('ix_gamalytics_attributes_attributeKey', 'attributeKey', 'steamId'),
+        {'sqlite_with_rowid': False},
+    )
 
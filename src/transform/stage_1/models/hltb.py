@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, Double, Text, Index
+from .db import BASE as Base
+
+
+# howlongtobeat.com `/game/{id}` __NEXT_DATA__ (`game_data.jsonl`)
+class HLTBGame(Base):
+    __tablename__ = 'hltb_games'
+    gameId = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(Text)
+    steamId = Column(Integer)  # `profile_steam`, 0/NULL when HLTB doesn't know it
+    releaseYear = Column(Integer)
+    compMain = Column(Integer)  # seconds
+    compPlus = Column(Integer)
+    comp100 = Column(Integer)
+    compAll = Column(Integer)
+
+    __table_args__ = (
+        Index('ix_hltb_games_steamId', 'steamId'),
+    )
+
+# HLTB game -> Steam app, written by `analysis.hltb_matching`
+class HLTBSteamMatch(Base):
+    __tablename__ = 'hltb_steam_matches'
+    gameId = Column(Integer, primary_key=True, autoincrement=False)
+    steamId = Column(Integer)
+    method = Column(Text)  # "profile_steam", "exact" or "fuzzy"
+    score = Column(Double)  # trigram Jaccard similarity of the normalized names, 1 for "profile_steam"
+    yearDelta = Column(Integer)  # |HLTB release year - Steam release year|, NULL if either is unknown
+
+    __table_args__ = (
+        Index('ix_hltb_steam_matches_steamId', 'steamId'),
+    )
@@ -0,0 +1,119 @@
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, Double, Boolean, Text, ForeignKey
+from .db import BASE as Base
+
+
+# IStoreBrowseService/GetItems (`getitems_*.jsonl`)
+class SteamItem(Base):
+    __tablename__ = 'steam_items'
+    appid = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(Text)
+    type = Column(SmallInteger)  # 0 = game, 4 = DLC
+    visible = Column(Boolean)
+    releaseDate = Column(BigInteger)  # unix seconds
+    isComingSoon = Column(Boolean)
+    isEarlyAccess = Column(Boolean)
+    windows = Column(Boolean)
+    mac = Column(Boolean)
+    linux = Column(Boolean)
+    priceInCents = Column(Integer)
+    shortDescription = Column(Text)
+
+class SteamItemTag(Base):
+    __tablename__ = 'steam_item_tags'
+    appid = Column(Integer, ForeignKey('steam_items.appid'), primary_key=True)
+    tagid = Column(Integer, primary_key=True)
+    weight = Column(Integer)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+class SteamItemLanguage(Base):
+    __tablename__ = 'steam_item_languages'
+    appid = Column(Integer, ForeignKey('steam_items.appid'), primary_key=True)
+    language = Column(Integer, primary_key=True)  # Steam `elanguage` id
+    supported = Column(Boolean)
+    fullAudio = Column(Boolean)
+    subtitles = Column(Boolean)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+class SteamItemCreator(Base):
+    __tablename__ = 'steam_item_creators'
+    appid = Column(Integer, ForeignKey('steam_items.appid'), primary_key=True)
+    role = Column(Text, primary_key=True)  # "developer" or "publisher"
+    name = Column(Text, primary_key=True)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+# store.steampowered.com/api/appdetails (`appdetails_*.jsonl`)
+class SteamAppDetails(Base):
+    __tablename__ = 'steam_app_details'
+    appid = Column(Integer, primary_key=True, autoincrement=False)
+    type = Column(Text)
+    name = Column(Text)
+    requiredAge = Column(Integer)
+    isFree = Column(Boolean)
+    shortDescription = Column(Text)
+    currency = Column(Text)
+    initialPrice = Column(Integer)  # cents
+    finalPrice = Column(Integer)  # cents
+    discountPercent = Column(Integer)
+    windows = Column(Boolean)
+    mac = Column(Boolean)
+    linux = Column(Boolean)
+    metacriticScore = Column(Integer)
+    recommendations = Column(Integer)
+    comingSoon = Column(Boolean)
+    releaseDateText = Column(Text)  # e.g. "21 Aug, 2012"
+
+class SteamAppCategory(Base):
+    __tablename__ = 'steam_app_categories'
+    appid = Column(Integer, ForeignKey('steam_app_details.appid'), primary_key=True)
+    categoryId = Column(Integer, primary_key=True)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+class SteamAppGenre(Base):
+    __tablename__ = 'steam_app_genres'
+    appid = Column(Integer, ForeignKey('steam_app_details.appid'), primary_key=True)
+    genreId = Column(Integer, primary_key=True)
+    description = Column(Text)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+# store.steampowered.com/appreviews (`review_summary_{all,early}_*.jsonl`)
+class SteamReviewSummary(Base):
+    __tablename__ = 'steam_review_summaries'
+    appid = Column(Integer, primary_key=True)
+    period = Column(Text, primary_key=True)  # "all" or "early" (first two weeks after release)
+    numReviews = Column(Integer)
+    reviewScore = Column(Integer)
+    reviewScoreDesc = Column(Text)
+    totalPositive = Column(Integer)
+    totalNegative = Column(Integer)
+    totalReviews = Column(Integer)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+# store.steampowered.com/appreviewhistogram (`review_history_*.jsonl`)
+class SteamReviewHistogram(Base):
+    __tablename__ = 'steam_review_histograms'
+    appid = Column(Integer, primary_key=True)
+    date = Column(BigInteger, primary_key=True)  # unix seconds, start of the rollup period
+    rollupType = Column(Text)  # "week" or "month"
+    recommendationsUp = Column(Integer)
+    recommendationsDown = Column(Integer)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+# ajaxgetstoretags / GetStoreCategories (`tags.json`, `categories.json`)
+class SteamTag(Base):
+    __tablename__ = 'steam_tags'
+    tagid = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(Text)
+
+class SteamCategory(Base):
+    __tablename__ = 'steam_categories'
+    categoryid = Column(Integer, primary_key=True, autoincrement=False)
+    type = Column(Integer)
+    internalName = Column(Text)
+    displayName = Column(Text)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, BigInteger
+from .db import BASE as Base
+
+
+# steamcharts.com chart-data.json (`ccu_history_*.jsonl`)
+class SteamChartsCCU(Base):
+    __tablename__ = 'steamcharts_ccu'
+    appid = Column(Integer, primary_key=True)
+    timeStamp = Column(BigInteger, primary_key=True)  # ms
+    players = Column(Integer)
+
+    __table_args__ = {'sqlite_with_rowid': False}
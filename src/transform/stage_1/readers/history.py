@@ -0,0 +1,131 @@
+import numpy as np
+from sqlalchemy import select
+from models.gamalytics import GamalyticsHistorySeries
+
+# Column dtypes of the packed history arrays. Revenue is cumulative and can exceed the
+# ~7 significant digits of float32, so it stays float64.
+HISTORY_DTYPES = {
+    "timeStamp": np.dtype("<i8"),
+    "reviews": np.dtype("<i4"),
+    "price": np.dtype("<f4"),
+    "score": np.dtype("<f4"),
+    "players": np.dtype("<f4"),
+    "avgPlaytime": np.dtype("<f4"),
+    "sales": np.dtype("<i4"),
+    "revenue": np.dtype("<f8"),
+}
+MISSING_INT = -1  # integer columns can't hold NaN, so missing values are stored as -1
+
+# SQLite's default limit on bound parameters is 32766
+ID_CHUNK_SIZE = 10000
+
+
+def pack_history(steam_id: int, entries: list) -> dict:
+    """
+    Packs a game's Gamalytic `history` list into `GamalyticsHistorySeries` column values,
+    sorted by timestamp. Of repeated timestamps the first entry is kept, like the
+    `gamalytics_history` primary key does in the "rows" mode.
+
+    Args:
+        steam_id (int): Steam app id
+        entries (list): list of history dicts as found in the Gamalytic JSON
+
+    Returns:
+        dict: keyword arguments for `GamalyticsHistorySeries`
+    """
+    # reversed, so the first entry of a timestamp is the one left in the dict
+    entries = {entry["timeStamp"]: entry for entry in reversed(entries)}.values()
+    entries = sorted(entries, key=lambda entry: entry["timeStamp"])
+    packed = {"steamId": steam_id, "length": len(entries)}
+    for column, dtype in HISTORY_DTYPES.items():
+        missing = MISSING_INT if dtype.kind == "i" else np.nan
+        values = [entry.get(column) for entry in entries]
+        values = [missing if value is None else value for value in values]
+        packed[column] = np.asarray(values, dtype=dtype).tobytes()
+    return packed
+
+
+def unpack_history(row, columns: list = None) -> dict:
+    """
+    Converts a `GamalyticsHistorySeries` row (or any row with the same attributes)
+    into a dict of column name -> NumPy array.
+    """
+    columns = columns or list(HISTORY_DTYPES)
+    return {
+        column: np.frombuffer(getattr(row, column), dtype=HISTORY_DTYPES[column])
+        for column in columns
+    }
+
+
+def read_history(session, steam_id: int, columns: list = None) -> dict | None:
+    """
+    Reads the history of one game.
+
+    Args:
+        session: SQLAlchemy session bound to the stage_1 database
+        steam_id (int): Steam app id
+        columns (list): columns to return (default: all of `HISTORY_DTYPES`)
+
+    Returns:
+        dict: column name -> NumPy array, or None if the game has no stored history
+    """
+    columns = columns or list(HISTORY_DTYPES)
+    row = session.execute(
+        select(*[getattr(GamalyticsHistorySeries, c) for c in columns])
+        .where(GamalyticsHistorySeries.steamId == steam_id)
+    ).first()
+    return unpack_history(row, columns) if row else None
+
+
+def read_histories(session, steam_ids: list = None, columns: list = None) -> dict:
+    """
+    Reads the histories of many games at once, concatenated into flat arrays.
+
+    The result has one array per requested column plus:
+        - `steamId`: the game of each element (same length as the column arrays)
+        - `ids`: the games that were found, in order
+        - `offsets`: game `ids[i]` occupies `[offsets[i], offsets[i + 1])`
+
+    Args:
+        session: SQLAlchemy session bound to the stage_1 database
+        steam_ids (list): games to read (default: every game)
+        columns (list): columns to return (default: all of `HISTORY_DTYPES`)
+
+    Returns:
+        dict: name -> NumPy array
+    """
+    columns = columns or list(HISTORY_DTYPES)
+    query = select(
+        GamalyticsHistorySeries.steamId, GamalyticsHistorySeries.length,
+        *[getattr(GamalyticsHistorySeries, c) for c in columns]
+    ).order_by(GamalyticsHistorySeries.steamId)
+
+    if steam_ids is None:
+        chunks = [session.execute(query)]
+    else:
+        steam_ids = sorted(set(steam_ids))
+        chunks = (
+            session.execute(query.where(
+                GamalyticsHistorySeries.steamId.in_(steam_ids[i : i + ID_CHUNK_SIZE])
+            ))
+            for i in range(0, len(steam_ids), ID_CHUNK_SIZE)
+        )
+
+    ids, lengths = [], []
+    buffers = {column: [] for column in columns}
+    for chunk in chunks:
+        for row in chunk:
+            ids.append(row.steamId)
+            lengths.append(row.length)
+            for column in columns:
+                buffers[column].append(getattr(row, column))
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    result = {
+        column: np.frombuffer(b"".join(buffers[column]), dtype=HISTORY_DTYPES[column])
+        for column in columns
+    }
+    result["ids"] = np.asarray(ids, dtype=np.int64)
+    result["offsets"] = np.concatenate(([0], np.cumsum(lengths)))
+    result["steamId"] = np.repeat(result["ids"], lengths)
+    return result
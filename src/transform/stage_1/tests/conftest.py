@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# the stage_1 modules import each other as top-level packages (run from `src/transform/stage_1`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# `models.db` creates `./data/transformed/` on import, keep it out of the working tree
+os.chdir(tempfile.mkdtemp(prefix="stage_1_tests_"))
@@ -0,0 +1,65 @@
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from loaders.dimensions import AttributeDimensions
+from models.db import BASE, get_engine
+from models.gamalytics import GamalyticsAttributeValue
+
+
+def values(session) -> list:
+    rows = session.execute(select(
+        GamalyticsAttributeValue.attributeKey, GamalyticsAttributeValue.attributeType,
+        GamalyticsAttributeValue.value, GamalyticsAttributeValue.steamRefId,
+    ).order_by(GamalyticsAttributeValue.attributeKey))
+    return [tuple(row) for row in rows]
+
+
+def test_keys_are_stable_across_sessions_and_rollbacks(tmp_path):
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    BASE.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        dimensions = AttributeDimensions(session)
+        assert dimensions.get_key("genre", "Action") == 1
+        assert dimensions.get_key("tag", "Action") == 2
+        assert dimensions.get_key("genre", "Action") == 1
+        session.commit()
+        dimensions.committed()
+
+        assert dimensions.get_key("language", "English") == 3
+        session.rollback()
+        dimensions.rollback()
+
+    with Session(engine) as session:
+        dimensions = AttributeDimensions(session)
+        assert dimensions.get_key("tag", "Action") == 2
+        assert dimensions.get_key("language", "French") == 3
+        session.commit()
+        assert values(session) == [(1, "genre", "Action", None), (2, "tag", "Action", None), (3, "language", "French", None)]
+
+
+def test_reconcile_fills_in_official_ids(tmp_path):
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    BASE.metadata.create_all(engine)
+    tag_file, category_file = tmp_path / "tags.json", tmp_path / "categories.json"
+    tag_file.write_text(json.dumps({"tags": [{"tagid": 19, "name": "Action"}, {"tagid": 9, "name": "Strategy"}]}))
+    category_file.write_text(json.dumps({"response": {"categories": [{"categoryid": 2, "display_name": "Single-player"}]}}))
+
+    with Session(engine) as session:
+        dimensions = AttributeDimensions(session)
+        dimensions.get_key("genre", "Action")
+        dimensions.get_key("feature", "Single-player")
+        session.commit()
+        dimensions.committed()
+
+        dimensions.reconcile_steam_ids(str(tag_file), str(category_file))
+        # official tags are seeded, genres and features only get their ids
+        assert values(session) == [
+            (1, "genre", "Action", 19), (2, "feature", "Single-player", 2),
+            (3, "tag", "Action", 19), (4, "tag", "Strategy", 9),
+        ]
+        assert dimensions.get_key("genre", "Strategy") == 5
+        session.commit()
+        assert values(session)[-1] == (5, "genre", "Strategy", 9)
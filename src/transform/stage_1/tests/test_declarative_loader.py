@@ -0,0 +1,48 @@
+import os
+
+from sqlalchemy import text
+
+from loaders.declarative import DeclarativeLoader
+from loaders.sources import CCU_HISTORY, GETITEMS
+from models.db import get_engine
+
+
+def write_shard(folder, name: str, lines: list, mtime: int) -> None:
+    path = folder / name
+    path.write_text("".join(line + "\n" for line in lines))
+    os.utime(path, (mtime, mtime))
+
+
+def load(folder, source, engine) -> None:
+    loader = DeclarativeLoader(str(folder), source, engine=engine)
+    loader.load_data()
+    loader.close()
+
+
+def test_newer_shard_updates_existing_rows(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    # the re-scrape sorts first by name but was written last
+    write_shard(raw, "ccu_history_900_999.jsonl", ["10\t[[1000, 5], [2000, 6]]"], mtime=1_000)
+    write_shard(raw, "ccu_history_2024-11-02_0_99.jsonl", ["10\t[[2000, 9], [3000, 4]]"], mtime=2_000)
+
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    load(raw, CCU_HISTORY, engine)
+
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT appid, timeStamp, players FROM steamcharts_ccu ORDER BY timeStamp"))
+        assert rows.fetchall() == [(10, 1000, 5), (10, 2000, 9), (10, 3000, 4)]
+
+
+def test_newer_record_replaces_all_its_columns(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    write_shard(raw, "getitems_0_99.jsonl", ['{"appid": 10, "name": "Old", "type": 0}'], mtime=1_000)
+    write_shard(raw, "getitems_0_99_retry.jsonl", ['{"appid": 10, "name": "New"}'], mtime=2_000)
+
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    load(raw, GETITEMS, engine)
+    load(raw, GETITEMS, engine)  # loading again is idempotent
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT appid, name, type FROM steam_items")).fetchall() == [(10, "New", None)]
@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+
+from analysis.feature_matrix import FeatureMatrix, seed_columns
+
+
+def test_seed_columns_follow_official_ids(tmp_path):
+    tag_file, category_file = tmp_path / "tags.json", tmp_path / "categories.json"
+    tag_file.write_text(json.dumps({"tags": [{"tagid": "19", "name": "Action"}, {"tagid": 9, "name": "Strategy"}]}))
+    category_file.write_text(json.dumps({"response": {"categories": [{"categoryid": 2, "display_name": "Single-player"}]}}))
+
+    assert seed_columns(str(tag_file), str(category_file)) == [
+        "steam_tag:9", "steam_tag:19", "tag:Strategy", "tag:Action", "feature:Single-player"
+    ]
+    assert seed_columns(None, str(tmp_path / "missing.json")) == []
+
+
+def test_appending_keeps_existing_rows_and_columns(tmp_path):
+    matrix = FeatureMatrix(["tag:Action", "tag:RPG"])
+    assert matrix.append([(30, "tag:RPG"), (30, "tag:Action"), (10, "genre:Indie")]) == 2
+    matrix.save(str(tmp_path))
+
+    matrix = FeatureMatrix.load(str(tmp_path), mmap=False)
+    # 30 is already in the matrix, new labels get new columns at the end
+    assert matrix.append([(20, "tag:Action"), (20, "feature:Co-op"), (30, "tag:Indie")]) == 1
+    assert matrix.columns == ["tag:Action", "tag:RPG", "genre:Indie", "feature:Co-op"]
+    assert matrix.shape == (3, 4)
+
+    assert matrix.rows_of([10, 20, 30, 40]).tolist() == [1, 2, 0, -1]
+    assert matrix.labels_of(30) == ["tag:Action", "tag:RPG"]
+    assert matrix.labels_of(20) == ["tag:Action", "feature:Co-op"]
+    assert matrix.labels_of(40) == []
+    assert matrix.column_counts().tolist() == [2, 1, 1, 1]
+
+    data, indices, indptr = matrix.to_csr()
+    dense = np.zeros(matrix.shape)
+    for row in range(matrix.shape[0]):
+        dense[row, indices[indptr[row] : indptr[row + 1]]] = data[indptr[row] : indptr[row + 1]]
+    assert dense.tolist() == [[1, 1, 0, 0], [0, 0, 1, 0], [1, 0, 0, 1]]
+
+
+def test_empty_matrix_has_no_rows():
+    matrix = FeatureMatrix([])
+    assert matrix.rows_of([10]).tolist() == [-1]
+    assert matrix.shape == (0, 0)
+    assert [len(array) for array in matrix.to_csr()] == [0, 0, 1]
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from loaders.duckdb_gamalytics import DuckDBGamalyticsLoader
+from loaders.gamalytics import GamalyticsDataLoader
+from models.db import get_engine
+
+# shaped like a `https://api.gamalytic.com/game/<appid>` response
+RECORD = {
+    "steamId": "10",
+    "name": "Counter-Strike",
+    "price": 9.99,
+    "history": [
+        {"timeStamp": 1000, "reviews": 5, "price": 9.99, "sales": 50, "rank": 3},
+        {"timeStamp": 2000, "reviews": 8, "price": 9.99, "sales": 90, "rank": 2},
+    ],
+    "audienceOverlap": [
+        {"steamId": "20", "link": 0.5, "name": "Half-Life", "releaseDate": 1000, "price": 4.99,
+         "genres": ["Action", "FPS"], "copiesSold": 100, "revenue": 499.0},
+    ],
+    "alsoPlayed": [{"steamId": "30", "link": 0.25, "name": "Portal"}],
+    "dlc": [{"steamId": "11", "name": "Soundtrack", "price": 1.99, "genres": ["Action"]}],
+    "genres": ["Action"],
+}
+
+QUERIES = {
+    "gamalytics_history": "SELECT steamId, timeStamp, reviews, sales FROM gamalytics_history ORDER BY timeStamp",
+    "gamalytics_audience_overlap": "SELECT steamId, dataType, relatedSteamId, link, relatedName, relatedGenres "
+                                   "FROM gamalytics_audience_overlap ORDER BY relatedSteamId",
+    "gamalytics_dlc": "SELECT steamId, dlcSteamId, dlcName, dlcPrice, dlcGenres FROM gamalytics_dlc",
+}
+EXPECTED = {
+    "gamalytics_history": [(10, 1000, 5, 50), (10, 2000, 8, 90)],
+    "gamalytics_audience_overlap": [
+        (10, "audience_overlap", 20, 0.5, "Half-Life", "Action,FPS"),
+        (10, "also_played", 30, 0.25, "Portal", None),
+    ],
+    "gamalytics_dlc": [(10, 11, "Soundtrack", 1.99, "Action")],
+}
+
+
+@pytest.fixture
+def raw(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "data_0_0.jsonl").write_text(json.dumps(RECORD) + "\n")
+    return raw
+
+
+def fetch_all(engine) -> dict:
+    with engine.connect() as connection:
+        return {table: [tuple(row) for row in connection.execute(text(query))] for table, query in QUERIES.items()}
+
+
+def test_nested_entries_are_mapped_to_columns(tmp_path, raw):
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    loader = GamalyticsDataLoader(str(raw), engine=engine)
+    loader.load_data()
+    loader.close()
+
+    assert fetch_all(engine) == EXPECTED
+    assert dict(loader.unknown_fields) == {("history", "rank"): 2}
+
+
+def test_duckdb_loader_maps_the_same_fields(tmp_path, raw):
+    pytest.importorskip("duckdb_engine")
+    engine = get_engine("duckdb", str(tmp_path / "stage_1.duckdb"))
+    loader = DuckDBGamalyticsLoader(str(raw), engine)
+    loader.load_data()
+    loader.close()
+
+    assert fetch_all(engine) == EXPECTED
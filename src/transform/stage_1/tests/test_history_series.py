@@ -0,0 +1,59 @@
+import json
+import math
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import readers.history
+from loaders.gamalytics import GamalyticsDataLoader
+from models.db import get_engine
+from readers.history import MISSING_INT, pack_history, read_histories, read_history, unpack_history
+
+
+class Row:
+    def __init__(self, packed: dict):
+        self.__dict__.update(packed)
+
+
+def test_pack_sorts_keeps_the_first_duplicate_and_marks_missing_values():
+    packed = pack_history(10, [
+        {"timeStamp": 3000, "reviews": 3, "price": 1.5, "revenue": 1e9 + 0.25},
+        {"timeStamp": 1000, "reviews": 1},
+        {"timeStamp": 3000, "reviews": 99},
+    ])
+    assert (packed["steamId"], packed["length"]) == (10, 2)
+
+    history = unpack_history(Row(packed))
+    assert history["timeStamp"].tolist() == [1000, 3000]
+    assert history["reviews"].tolist() == [1, 3]
+    assert history["sales"].tolist() == [MISSING_INT, MISSING_INT]
+    assert math.isnan(history["price"][0]) and history["price"][1] == np.float32(1.5)
+    assert history["revenue"][1] == 1e9 + 0.25  # float64 keeps the cents
+    assert unpack_history(Row(pack_history(10, [])))["timeStamp"].tolist() == []
+
+
+def test_packed_histories_are_read_per_game_and_in_bulk(tmp_path, monkeypatch):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    records = [
+        {"steamId": steam_id, "history": [{"timeStamp": t, "reviews": steam_id + t} for t in range(steam_id % 4)]}
+        for steam_id in (40, 10, 31, 22, 53)
+    ]
+    (raw / "data_0_4.jsonl").write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    loader = GamalyticsDataLoader(str(raw), engine=engine, history_mode="packed")
+    loader.load_data()
+    loader.close()
+
+    monkeypatch.setattr(readers.history, "ID_CHUNK_SIZE", 2)
+    with Session(engine) as session:
+        assert read_history(session, 31, ["reviews"])["reviews"].tolist() == [31, 32, 33]
+        assert read_history(session, 99) is None
+
+        histories = read_histories(session, [53, 10, 31, 40, 99], ["timeStamp", "reviews"])
+        assert histories["ids"].tolist() == [10, 31, 40, 53]
+        assert histories["offsets"].tolist() == [0, 2, 5, 5, 6]
+        assert histories["steamId"].tolist() == [10, 10, 31, 31, 31, 53]
+        assert histories["reviews"].tolist() == [10, 11, 31, 32, 33, 53]
+        assert read_histories(session)["ids"].tolist() == [10, 22, 31, 40, 53]
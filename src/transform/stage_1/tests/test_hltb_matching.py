@@ -0,0 +1,62 @@
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from analysis.hltb_matching import SteamNameIndex, match_games, normalize, read_steam_names, trigrams
+from models.db import BASE, get_engine
+from models.hltb import HLTBGame
+
+NAMES = {
+    10: "Counter-Strike",
+    220: "Half-Life 2",
+    400: "Portal",
+    620: "Portal 2",
+    1000: "Pokémon™ Adventures & Friends",
+    2000: "Doom",
+    3000: "DOOM",
+}
+YEARS = {2000: 1993, 3000: 2016}
+
+
+def test_normalize():
+    assert normalize("Pokémon™ Adventures & Friends") == "pokemon adventures and friends"
+    assert normalize("Final Fantasy VII (R)") == "final fantasy 7"
+    assert normalize("  S.T.A.L.K.E.R.: Shadow of Chernobyl ") == "s t a l k e r shadow of chernobyl"
+    assert normalize(None) == ""
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+def test_exact_fuzzy_and_year_tie_breaks():
+    index = SteamNameIndex(NAMES, YEARS)
+    assert index.match("Pokemon Adventures and Friends") == {"steamId": 1000, "method": "exact", "score": 1.0, "yearDelta": None}
+    assert index.match("Doom", 2015)["steamId"] == 3000
+    assert index.match("Doom", 1994)["steamId"] == 2000
+
+    fuzzy = index.match("Half-Life II: Episode")
+    assert (fuzzy["steamId"], fuzzy["method"]) == (220, "fuzzy") and 0.5 <= fuzzy["score"] < 1
+    assert index.match("Portal II")["method"] == "exact"
+    assert index.match("Something Else Entirely") is None
+    assert index.match("™") is None
+
+
+def test_unselective_trigrams_still_find_candidates():
+    # the known trigrams of "portall" are all in more than `max_posting` names
+    index = SteamNameIndex({i: "Portal" if i else "Portal Stories" for i in range(5)}, max_posting=2)
+    match = index.match("Portall")
+    assert match["steamId"] in (1, 2, 3, 4) and match["score"] == 6 / 9
+
+
+def test_match_games_keeps_profile_steam_ids(tmp_path):
+    id_file = tmp_path / "game_ids.txt"
+    id_file.write_text("".join(f"{steam_id}\t{name}\n" for steam_id, name in NAMES.items()) + "5000\n")
+    assert read_steam_names(str(id_file)) == NAMES
+
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    BASE.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(HLTBGame), [
+            {"gameId": 1, "name": "Portal", "steamId": 999},
+            {"gameId": 2, "name": "Portal 2", "steamId": 0},
+            {"gameId": 3, "name": "Unknown Game", "steamId": None},
+        ])
+        rows = match_games(session, SteamNameIndex(read_steam_names(str(id_file))))
+    assert [(row["gameId"], row["steamId"], row["method"]) for row in rows] == [(1, 999, "profile_steam"), (2, 620, "exact")]
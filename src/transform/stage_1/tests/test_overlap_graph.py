@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from analysis.overlap_graph import OverlapGraph
+
+# 10 -> 20 -> 30 -> 40, 10 -> 30, 50 has no out-edges
+EDGES = [(10, 20, 0.5), (10, 30, 0.25), (10, 20, 0.75), (20, 30, 1.0), (30, 40, 0.5), (40, 50, np.nan)]
+
+
+@pytest.fixture
+def graph() -> OverlapGraph:
+    return OverlapGraph.from_edges(*zip(*EDGES))
+
+
+def dense_pagerank(graph: OverlapGraph, damping: float = 0.85) -> np.ndarray:
+    n = graph.num_nodes
+    matrix = np.zeros((n, n))
+    for node in range(n):
+        start, end = graph.indptr[node], graph.indptr[node + 1]
+        matrix[node, graph.indices[start:end]] = graph.weights[start:end]
+    out_weight = matrix.sum(axis=1)
+    rank = np.full(n, 1 / n)
+    for _ in range(1000):
+        shared = np.divide(matrix, out_weight[:, None], out=np.zeros_like(matrix), where=out_weight[:, None] > 0)
+        rank = (1 - damping) / n + damping * (rank @ shared + rank[out_weight == 0].sum() / n)
+    return rank
+
+
+def test_duplicate_edges_keep_the_largest_weight(graph):
+    assert (graph.num_nodes, graph.num_edges) == (5, 5)
+    steam_ids, weights = graph.neighbors(10)
+    assert steam_ids.tolist() == [20, 30] and weights.tolist() == [0.75, 0.25]
+    assert graph.neighbors(40)[1].tolist() == [0.0]  # NULL links weigh nothing
+    assert graph.neighbors(99)[0].tolist() == []
+
+
+def test_k_hop_distances(graph):
+    steam_ids, distances = graph.k_hop([10, 99], k=2)
+    assert dict(zip(steam_ids.tolist(), distances.tolist())) == {10: 0, 20: 1, 30: 1, 40: 2}
+    assert graph.k_hop([50], k=3)[0].tolist() == [50]
+
+
+def test_similar_sums_two_hop_paths(graph):
+    steam_ids, scores = graph.similar(10)
+    # 10 -> 20 -> 30 (0.75 * 1.0) and 10 -> 30 -> 40 (0.25 * 0.5)
+    assert steam_ids.tolist() == [30, 40]
+    assert scores.tolist() == pytest.approx([0.75, 0.125])
+
+
+def test_pagerank_matches_the_dense_computation(graph):
+    rank = graph.pagerank(tol=1e-14, max_iter=1000)
+    assert rank.sum() == pytest.approx(1.0)
+    assert rank == pytest.approx(dense_pagerank(graph))
+    assert graph.top_ranked(rank, 1)[0].tolist() == [int(graph.ids[np.argmax(rank)])]
+
+
+def test_saved_graph_loads_memory_mapped(tmp_path, graph):
+    graph.save(str(tmp_path))
+    loaded = OverlapGraph.load(str(tmp_path))
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.neighbors(10)[0].tolist() == [20, 30]
+
+
+def test_empty_graph():
+    graph = OverlapGraph.from_edges([], [], [])
+    assert graph.num_nodes == 0
+    assert graph.nodes_of([10, 20]).tolist() == [-1, -1]
+    assert graph.k_hop([10])[0].tolist() == []
+    assert graph.pagerank().tolist() == []
@@ -0,0 +1,32 @@
+import os
+
+import pyarrow.dataset as ds
+from sqlalchemy import insert
+
+from exporters.parquet import ParquetExporter, read_dataset
+from models.db import BASE, get_engine
+from models.gamalytics import GamalyticsMain
+from models.hltb import HLTBGame
+from models.steam import SteamItem, SteamTag
+
+
+def test_exports_every_table_with_its_partitioning(tmp_path):
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    BASE.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(GamalyticsMain), [{"steamId": 10, "releaseDate": 1_300_000_000_000}])
+        connection.execute(insert(SteamItem), [{"appid": 10, "name": "A"}, {"appid": 250_000, "name": "B"}])
+        connection.execute(insert(HLTBGame), [{"gameId": 1, "steamId": 10}, {"gameId": 2, "steamId": None}])
+        connection.execute(insert(SteamTag), [{"tagid": 19, "name": "Action"}])
+
+    output_dir = tmp_path / "parquet"
+    ParquetExporter(engine, str(output_dir)).export_all()
+
+    assert {t.name for t in BASE.metadata.sorted_tables} <= set(os.listdir(output_dir))
+    assert sorted(os.listdir(output_dir / "gamalytics_main")) == ["_common_metadata", "_metadata", "releaseYear=2011"]
+    assert sorted(os.listdir(output_dir / "steam_items"))[2:] == ["appidRange=0", "appidRange=200000"]
+    assert "steamIdRange=__HIVE_DEFAULT_PARTITION__" in os.listdir(output_dir / "hltb_games")
+    assert sorted(os.listdir(output_dir / "steam_tags")) == ["_common_metadata", "_metadata", "part-0.parquet"]
+
+    items = read_dataset(str(output_dir / "steam_items"), ["appid", "name"], ds.field("appidRange") == 200000)
+    assert items.to_pylist() == [{"appid": 250_000, "name": "B"}]
@@ -0,0 +1,25 @@
+from sqlalchemy import text
+
+from benchmarks.synthetic import GamalyticGenerator
+from loaders.gamalytics import GamalyticsDataLoader
+from models.db import get_engine
+
+
+def test_synthetic_records_load_without_unknown_fields(tmp_path):
+    generator = GamalyticGenerator(history_median=5, overlap_count=3, also_played_count=2, dlc_mean=2, seed=1)
+    files = generator.write(str(tmp_path / "raw"), 20, records_per_file=8)
+    assert [path.rsplit("/", 1)[1] for path in files] == ["data_0_7.jsonl", "data_8_15.jsonl", "data_16_19.jsonl"]
+
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    loader = GamalyticsDataLoader(str(tmp_path / "raw"), engine=engine)
+    loader.load_data()
+    loader.close()
+
+    assert not loader.unknown_fields
+    with engine.connect() as connection:
+        count = lambda query: connection.execute(text(query)).scalar()
+        assert count("SELECT count(*) FROM gamalytics_main") == 20
+        assert count("SELECT count(*) FROM gamalytics_audience_overlap") == 20 * 5
+        assert count("SELECT count(*) FROM gamalytics_audience_overlap WHERE relatedGenres LIKE '%,%'") == 20 * 5
+        assert count("SELECT count(*) FROM gamalytics_dlc WHERE dlcName IS NULL") == 0
+        assert count("SELECT count(*) FROM gamalytics_dlc") > 0
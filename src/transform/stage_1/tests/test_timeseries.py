@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from analysis.timeseries import aggregate, align, per_game_correlation, period_of, read_gamalytic, to_dense
+from loaders.gamalytics import GamalyticsDataLoader
+from models.db import get_engine
+
+DAY = 24 * 60 * 60
+
+
+def seconds(*dates: str) -> np.ndarray:
+    return np.array(dates, dtype="datetime64[s]").astype(np.int64)
+
+
+def test_periods_start_on_mondays_and_first_days():
+    times = seconds("2024-11-03T23:00", "2024-11-04T01:00", "2024-12-31T12:00")
+    assert period_of(times, "day").astype(str).tolist() == ["2024-11-03", "2024-11-04", "2024-12-31"]
+    assert period_of(times, "week").astype(str).tolist() == ["2024-10-28", "2024-11-04", "2024-12-30"]
+    assert period_of(times, "month").astype(str).tolist() == ["2024-11-01", "2024-11-01", "2024-12-01"]
+    with pytest.raises(ValueError):
+        period_of(times, "year")
+
+
+@pytest.mark.parametrize("how, expected", [("mean", [2.0, 10.0]), ("max", [3.0, 10.0]), ("sum", [4.0, 10.0]),
+                                           ("last", [1.0, 10.0])])
+def test_aggregate_skips_nan_values(how, expected):
+    keys = np.array([7, 5, 5, 5, 7], dtype=np.int64)
+    times = np.array([1, 3, 1, 2, 2])
+    values = np.array([np.nan, 1.0, 3.0, np.nan, 10.0])
+    unique_keys, result = aggregate(keys, times, values, how)
+    assert unique_keys.tolist() == [5, 7]
+    assert result.tolist() == expected
+
+
+def test_align_joins_the_sources_on_one_grid():
+    monday = seconds("2024-11-04")[0]
+    sources = {
+        "ccu": {"steamId": np.array([10, 10, 10]), "seconds": np.array([monday, monday + DAY, monday + 7 * DAY]),
+                "players": np.array([100.0, 300.0, 50.0])},
+        "gamalytic": {"steamId": np.array([20]), "seconds": np.array([monday + 2 * DAY]),
+                      "players": np.array([5.0]), "reviews": np.array([1.0]), "sales": np.array([np.nan])},
+    }
+    panel = align(sources, "week")
+    assert panel["steamId"].tolist() == [10, 10, 20]
+    assert panel["period"].astype(str).tolist() == ["2024-11-04", "2024-11-11", "2024-11-04"]
+    assert panel["ccu_mean"].tolist()[:2] == [200.0, 50.0]
+    assert panel["ccu_peak"].tolist()[:2] == [300.0, 50.0]
+    assert np.isnan(panel["ccu_mean"][2]) and panel["gamalytic_players"][2] == 5.0
+    assert np.isnan(panel["reviews_up"]).all()
+
+    ids, periods, matrix = to_dense(panel, "ccu_mean")
+    assert ids.tolist() == [10, 20] and len(periods) == 2
+    assert matrix[0].tolist() == [200.0, 50.0] and np.isnan(matrix[1]).all()
+
+    empty = align({"ccu": {"steamId": np.zeros(0), "seconds": np.zeros(0), "players": np.zeros(0)}}, "day")
+    assert len(empty["steamId"]) == 0 and len(empty["ccu_mean"]) == 0
+
+
+def test_per_game_correlation_uses_shared_periods():
+    panel = {
+        "steamId": np.array([1, 1, 1, 2, 2, 3]),
+        "x": np.array([1.0, 2.0, 3.0, 1.0, np.nan, 4.0]),
+        "y": np.array([2.0, 4.0, 6.0, 5.0, 6.0, 4.0]),
+    }
+    ids, correlation, n = per_game_correlation(panel, "x", "y")
+    assert ids.tolist() == [1, 2, 3]
+    assert correlation[0] == pytest.approx(1.0) and np.isnan(correlation[1:]).all()
+    assert n.tolist() == [3, 1, 1]
+
+
+def test_gamalytic_history_is_read_from_series_and_rows(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    engine = get_engine("sqlite", str(tmp_path / "stage_1.db"))
+    for mode, steam_id in (("packed", 20), ("rows", 10)):
+        record = {"steamId": steam_id, "history": [{"timeStamp": 86_400_000, "players": steam_id, "sales": None}]}
+        (raw / "data_0_0.jsonl").write_text(json.dumps(record) + "\n")
+        loader = GamalyticsDataLoader(str(raw), engine=engine, history_mode=mode)
+        loader.load_data()
+        loader.close()
+
+    with Session(engine) as session:
+        gamalytic = read_gamalytic(session)
+    assert gamalytic["steamId"].tolist() == [10, 20]
+    assert gamalytic["seconds"].tolist() == [86_400, 86_400]
+    assert gamalytic["players"].tolist() == [10.0, 20.0]
+    assert np.isnan(gamalytic["sales"]).all()